@@ -11,6 +11,12 @@ const nextConfig = {
     // Temporarily disable TypeScript type checking during build for deployment
     ignoreBuildErrors: true,
   },
+  experimental: {
+    // Chunking worker threads load the compiled worker from disk at runtime
+    outputFileTracingIncludes: {
+      '/api/**/*': ['./dist/workers/**/*'],
+    },
+  },
   webpack: (config, { isServer }) => {
     // Handle PDF.js worker
     if (!isServer) {
@@ -0,0 +1,137 @@
+#!/usr/bin/env node
+
+/**
+ * Pipeline benchmark runner
+ * Fails when a stage is slower than the committed baseline allows, or when
+ * there is no baseline to compare against
+ *
+ * Stage timings are compared relative to a reference workload timed in the
+ * same run, so a baseline recorded on one machine can gate runs on another:
+ * the baseline is scaled by how much slower or faster the reference ran.
+ * Only p50 is gated; with a handful of iterations p95 is close to the slowest
+ * run, and shared CI runners make that too noisy to fail a build on.
+ *
+ * Usage: npm run benchmark [-- --iterations 10 --tolerance 0.5 --min-delta 5]
+ *        npm run benchmark:update-baseline   (then commit benchmarks/baseline.json)
+ */
+
+import * as fs from 'fs';
+import * as path from 'path';
+import { REFERENCE_STAGE, runPipelineBenchmark } from '../src/lib/benchmarks/pipelineBenchmark';
+import { LatencyBaseline, MetricsSnapshot, findLatencyRegressions } from '../src/lib/metrics';
+
+const BASELINE_PATH = path.join(__dirname, '..', 'benchmarks', 'baseline.json');
+
+interface BaselineFile {
+  // p50 of the reference workload on the machine that recorded the baseline
+  referenceMs: number;
+  stages: LatencyBaseline;
+}
+
+// Colors for console output
+const colors = {
+  reset: '\x1b[0m',
+  bright: '\x1b[1m',
+  red: '\x1b[31m',
+  green: '\x1b[32m',
+  yellow: '\x1b[33m',
+  cyan: '\x1b[36m'
+};
+
+function log(message: string, color: string = colors.reset) {
+  console.log(`${color}${message}${colors.reset}`);
+}
+
+function getArg(name: string): string | undefined {
+  const index = process.argv.indexOf(name);
+  return index === -1 ? undefined : process.argv[index + 1];
+}
+
+function printResults(results: MetricsSnapshot) {
+  log(`${'Stage'.padEnd(40)}${'p50'.padStart(10)}${'p95'.padStart(10)}${'p99'.padStart(10)}`, colors.bright);
+  Object.entries(results).forEach(([stage, summary]) => {
+    console.log(
+      `${stage.padEnd(40)}${summary.p50.toFixed(2).padStart(10)}` +
+      `${summary.p95.toFixed(2).padStart(10)}${summary.p99.toFixed(2).padStart(10)}`
+    );
+  });
+  console.log('');
+}
+
+function writeBaseline(results: MetricsSnapshot) {
+  const baseline: BaselineFile = { referenceMs: results[REFERENCE_STAGE].p50, stages: {} };
+  Object.entries(results).forEach(([stage, summary]) => {
+    if (stage !== REFERENCE_STAGE) {
+      baseline.stages[stage] = { p50: summary.p50 };
+    }
+  });
+
+  fs.mkdirSync(path.dirname(BASELINE_PATH), { recursive: true });
+  fs.writeFileSync(BASELINE_PATH, JSON.stringify(baseline, null, 2) + '\n');
+  log(`✓ Baseline written to ${path.relative(process.cwd(), BASELINE_PATH)}`, colors.green);
+}
+
+// Expected timings on this machine: baseline timings scaled by the reference ratio
+function scaleBaseline(stages: LatencyBaseline, factor: number): LatencyBaseline {
+  const scaled: LatencyBaseline = {};
+  Object.entries(stages).forEach(([stage, percentiles]) => {
+    scaled[stage] = {};
+    Object.entries(percentiles).forEach(([percentile, ms]) => {
+      scaled[stage][percentile as keyof typeof percentiles] = (ms as number) * factor;
+    });
+  });
+  return scaled;
+}
+
+function main() {
+  const updateBaseline = process.argv.includes('--update-baseline');
+  const iterations = Number(getArg('--iterations') || 10);
+  // Stage p50s vary by up to ~1.4x between runs on one machine, so only
+  // larger slowdowns are reported
+  const tolerance = Number(getArg('--tolerance') || 0.5);
+  // Differences of a few milliseconds are run-to-run noise, not regressions
+  const minDeltaMs = Number(getArg('--min-delta') || 5);
+
+  log('=== PIPELINE BENCHMARK ===', colors.cyan);
+  log(`Iterations per manual size: ${iterations}\n`, colors.cyan);
+
+  const results = runPipelineBenchmark({ iterations });
+  printResults(results);
+
+  if (updateBaseline) {
+    writeBaseline(results);
+    return;
+  }
+
+  if (!fs.existsSync(BASELINE_PATH)) {
+    log(`✗ No baseline at ${path.relative(process.cwd(), BASELINE_PATH)}`, colors.red);
+    log('  Run npm run benchmark:update-baseline and commit the file.', colors.red);
+    process.exit(1);
+  }
+
+  const baseline: BaselineFile = JSON.parse(fs.readFileSync(BASELINE_PATH, 'utf8'));
+  const factor = results[REFERENCE_STAGE].p50 / baseline.referenceMs;
+  log(`Reference workload: ${factor.toFixed(2)}x the baseline machine's time\n`, colors.cyan);
+
+  const regressions = findLatencyRegressions(results, scaleBaseline(baseline.stages, factor), {
+    tolerance,
+    minDeltaMs,
+    percentiles: ['p50']
+  });
+
+  if (regressions.length === 0) {
+    log(`✓ No stage regressed more than ${(tolerance * 100).toFixed(0)}% from the baseline`, colors.green);
+    return;
+  }
+
+  log(`✗ ${regressions.length} stage percentile(s) regressed:`, colors.red);
+  regressions.forEach((r) => {
+    log(
+      `  ${r.stage} ${r.percentile}: ${r.currentMs.toFixed(2)}ms vs ${r.baselineMs.toFixed(2)}ms expected (${r.ratio.toFixed(2)}x)`,
+      colors.red
+    );
+  });
+  process.exit(1);
+}
+
+main();
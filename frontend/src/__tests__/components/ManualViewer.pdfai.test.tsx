@@ -2,6 +2,7 @@ import '@testing-library/jest-dom';
 import React from 'react';
 import { render, screen, fireEvent, waitFor } from '@testing-library/react';
 import { ManualViewer } from '../../components/ManualViewer';
+import { supabase } from '../../lib/supabaseClient';
 
 jest.mock('../../lib/supabaseClient', () => {
   const docs: unknown[] = [
@@ -37,9 +38,20 @@ jest.mock('../../lib/supabaseClient', () => {
     then: (cb: (result: { data: unknown[]; error: null }) => unknown) =>
       cb({ data: docs, error: null }),
   };
+  const hits: unknown[] = [
+    {
+      ...(docs[0] as object),
+      extracted_text: undefined,
+      page_number: 3,
+      snippet: 'Test PDF content for <mark>AI</mark> <mark>search</mark>',
+      rank: 0.5,
+      total_count: 1,
+    },
+  ];
   return {
     supabase: {
       from: jest.fn(() => queryMock),
+      rpc: jest.fn(() => Promise.resolve({ data: hits, error: null })),
     },
   };
 });
@@ -60,6 +72,10 @@ jest.mock('pdfjs-dist/build/pdf', () => ({
 jest.mock('pdfjs-dist/build/pdf.worker.entry', () => {});
 
 describe('ManualViewer PDF/AI', () => {
+  beforeEach(() => {
+    jest.clearAllMocks();
+  });
+
   it('searches by extracted PDF text', async () => {
     render(
       <ManualViewer
@@ -70,6 +86,28 @@ describe('ManualViewer PDF/AI', () => {
     );
     const searchInput = screen.getByPlaceholderText(/Search documentation/i);
     fireEvent.change(searchInput, { target: { value: 'AI search' } });
-    await waitFor(() => expect(screen.getByText('manual.pdf')).toBeInTheDocument());
+    await waitFor(() => expect(screen.getByText(/page 3/)).toBeInTheDocument());
+    expect(screen.getByText('manual.pdf')).toBeInTheDocument();
+    expect(screen.getByText('search', { selector: 'mark' })).toBeInTheDocument();
+    expect(supabase.rpc).toHaveBeenCalledWith(
+      'search_manuals',
+      expect.objectContaining({ p_machine_id: '1', search_text: 'AI search' }),
+    );
+  });
+
+  it('searches once typing pauses', async () => {
+    render(
+      <ManualViewer
+        machine={{ id: '1', name: 'Test Machine' }}
+        onSelectManual={jest.fn()}
+        onBack={jest.fn()}
+      />,
+    );
+    const searchInput = screen.getByPlaceholderText(/Search documentation/i);
+    ['A', 'AI', 'AI s', 'AI search'].forEach((value) =>
+      fireEvent.change(searchInput, { target: { value } }),
+    );
+    await waitFor(() => expect(screen.getByText(/page 3/)).toBeInTheDocument());
+    expect(supabase.rpc).toHaveBeenCalledTimes(1);
   });
 });
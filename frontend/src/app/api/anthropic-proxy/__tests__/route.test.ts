@@ -0,0 +1,282 @@
+/**
+ * @jest-environment node
+ */
+
+/**
+ * Tests for the Anthropic proxy route, run against a local stand-in for the upstream API
+ */
+
+import http from 'http';
+import { AddressInfo } from 'net';
+import { NextRequest } from 'next/server';
+import { POST } from '../route';
+import { sendMessageToAI, streamMessageToAI } from '../../../../lib/api';
+
+jest.mock('../../../../lib/supabaseClient', () => ({
+  supabase: {
+    from: jest.fn(),
+    auth: {
+      getSession: jest.fn(async () => ({ data: { session: { access_token: 'user-token' } } })),
+    },
+  },
+  createSupabaseServerClient: jest.fn(() => ({
+    auth: {
+      getUser: jest.fn(async (token: string) =>
+        token === 'user-token'
+          ? { data: { user: { id: 'user-1' } }, error: null }
+          : { data: { user: null }, error: { message: 'invalid JWT' } },
+      ),
+    },
+  })),
+}));
+
+jest.mock('../../../../lib/contextService', () => ({
+  ContextService: {
+    getContextForQuery: jest.fn(async () => ({
+      manualExcerpts: [
+        {
+          documentId: 'doc-1',
+          filename: 'press.pdf',
+          excerpt: 'Replace the pump seal.',
+          relevanceScore: 60,
+        },
+      ],
+      chatHistory: [],
+      relevanceScore: 60,
+    })),
+    formatContextForAI: jest.fn((context) =>
+      context.manualExcerpts.length > 0 ? '## CONTEXT INFORMATION: Replace the pump seal.' : '',
+    ),
+  },
+}));
+
+interface Upstream {
+  url: string;
+  requests: { headers: http.IncomingHttpHeaders; body: any }[];
+  /** Lets the stand-in send everything after the first text delta */
+  release: () => void;
+  close: () => Promise<void>;
+}
+
+function sse(type: string, data: object): string {
+  return `event: ${type}\ndata: ${JSON.stringify({ type, ...data })}\n\n`;
+}
+
+function textDelta(text: string): string {
+  return sse('content_block_delta', { index: 0, delta: { type: 'text_delta', text } });
+}
+
+/**
+ * Starts an HTTP server that answers like the Messages API
+ *
+ * Streaming responses pause after the first text delta until release() is
+ * called, so a test can observe that tokens reach the client before the
+ * upstream response is complete.
+ */
+async function startUpstream(status = 200): Promise<Upstream> {
+  let release: () => void = () => undefined;
+  const released = new Promise<void>((resolve) => {
+    release = resolve;
+  });
+  const requests: Upstream['requests'] = [];
+
+  const server = http.createServer((req, res) => {
+    let raw = '';
+    req.on('data', (chunk) => (raw += chunk));
+    req.on('end', async () => {
+      const body = JSON.parse(raw);
+      requests.push({ headers: req.headers, body });
+
+      if (status !== 200) {
+        res.writeHead(status, { 'Content-Type': 'application/json' });
+        res.end(JSON.stringify({ type: 'error', error: { message: 'Overloaded' } }));
+        return;
+      }
+
+      if (!body.stream) {
+        res.writeHead(200, { 'Content-Type': 'application/json' });
+        res.end(JSON.stringify({ content: [{ type: 'text', text: 'Check the pump seal.' }] }));
+        return;
+      }
+
+      res.writeHead(200, { 'Content-Type': 'text/event-stream' });
+      res.write(sse('message_start', { message: { id: 'msg_1', content: [] } }));
+      res.write(
+        sse('content_block_start', { index: 0, content_block: { type: 'text', text: '' } }),
+      );
+      res.write(textDelta('Check'));
+      await released;
+      res.write(sse('ping', {}));
+      res.write(textDelta(' the pump'));
+      res.write(textDelta(' seal.'));
+      res.write(sse('content_block_stop', { index: 0 }));
+      res.write(sse('message_delta', { delta: { stop_reason: 'end_turn' } }));
+      res.end(sse('message_stop', {}));
+    });
+  });
+
+  await new Promise<void>((resolve) => server.listen(0, '127.0.0.1', resolve));
+  const { port } = server.address() as AddressInfo;
+
+  return {
+    url: `http://127.0.0.1:${port}/v1/messages`,
+    requests,
+    release: () => release(),
+    close: () =>
+      new Promise((resolve) => {
+        server.close(() => resolve());
+        // Kept-alive client sockets would otherwise hold the server open
+        server.closeAllConnections();
+      }),
+  };
+}
+
+describe('anthropic-proxy route', () => {
+  const realFetch = global.fetch;
+  const machine = { id: 'machine-1', name: 'Press 4' };
+  let upstream: Upstream;
+  let consoleError: jest.SpyInstance;
+
+  const useUpstream = async (status?: number) => {
+    upstream = await startUpstream(status);
+    process.env.ANTHROPIC_API_URL = upstream.url;
+  };
+
+  beforeEach(() => {
+    process.env.ANTHROPIC_API_KEY = 'test-key';
+    consoleError = jest.spyOn(console, 'error').mockImplementation(() => undefined);
+
+    // Route client calls to the proxy handler; the proxy's own calls reach the stand-in
+    global.fetch = jest.fn((input: RequestInfo | URL, init?: RequestInit) =>
+      input === '/api/anthropic-proxy'
+        ? POST(new NextRequest('http://localhost/api/anthropic-proxy', init as any))
+        : realFetch(input, init),
+    ) as typeof fetch;
+  });
+
+  afterEach(async () => {
+    global.fetch = realFetch;
+    consoleError.mockRestore();
+    delete process.env.ANTHROPIC_API_URL;
+    await upstream?.close();
+  });
+
+  it('should render tokens before the upstream response is complete', async () => {
+    await useUpstream();
+    const tokens: string[] = [];
+
+    const response = await streamMessageToAI({
+      userMessage: 'The press lost pressure',
+      machine,
+      conversation: [],
+      onToken: (token) => {
+        tokens.push(token);
+        upstream.release();
+      },
+    });
+
+    expect(tokens).toEqual(['Check', ' the pump', ' seal.']);
+    expect(response).toEqual({
+      text: 'Check the pump seal.',
+      confidence: 'high',
+      sources: ['press.pdf'],
+    });
+  });
+
+  it('should send the system prompt and stream flag upstream', async () => {
+    await useUpstream();
+    upstream.release();
+
+    await streamMessageToAI({
+      userMessage: 'The press lost pressure',
+      machine,
+      conversation: [
+        { sender: 'ai', text: 'Hello, how can I help?' },
+        { sender: 'user', text: 'The press lost pressure' },
+      ],
+      onToken: () => undefined,
+    });
+
+    const [{ headers, body }] = upstream.requests;
+    expect(headers['x-api-key']).toBe('test-key');
+    expect(headers.authorization).toBeUndefined();
+    expect(body.stream).toBe(true);
+    expect(body.system).toContain('Press 4');
+    expect(body.system).toContain('Replace the pump seal.');
+    expect(body.messages).toEqual([{ role: 'user', content: 'The press lost pressure' }]);
+  });
+
+  it('should still answer non-streaming requests with JSON', async () => {
+    await useUpstream();
+
+    const response = await sendMessageToAI({
+      userMessage: 'The press lost pressure',
+      machine,
+      conversation: [],
+    });
+
+    expect(upstream.requests[0].body.stream).toBe(false);
+    expect(response.text).toBe('Check the pump seal.');
+  });
+
+  it('should fall back to the apology message when upstream fails', async () => {
+    await useUpstream(529);
+    const tokens: string[] = [];
+
+    const response = await streamMessageToAI({
+      userMessage: 'The press lost pressure',
+      machine,
+      conversation: [],
+      onToken: (token) => tokens.push(token),
+    });
+
+    expect(tokens).toEqual([]);
+    expect(response.confidence).toBe('low');
+    expect(response.text).toContain('trouble connecting');
+  });
+
+  describe('request checks', () => {
+    const post = (body: object, token: string | null = 'user-token') =>
+      POST(
+        new NextRequest('http://localhost/api/anthropic-proxy', {
+          method: 'POST',
+          headers: token ? { Authorization: `Bearer ${token}` } : {},
+          body: JSON.stringify(body),
+        }),
+      );
+    const messages = [{ role: 'user', content: 'The press lost pressure' }];
+
+    beforeEach(async () => {
+      await useUpstream();
+    });
+
+    it('should reject requests without a valid session', async () => {
+      expect((await post({ messages }, null)).status).toBe(401);
+      expect((await post({ messages }, 'forged-token')).status).toBe(401);
+      expect(upstream.requests).toHaveLength(0);
+    });
+
+    it('should reject requests without a messages array', async () => {
+      const response = await post({ prompt: 'hi' });
+
+      expect(response.status).toBe(400);
+      expect(upstream.requests).toHaveLength(0);
+    });
+
+    it('should reject models outside the allowlist', async () => {
+      const response = await post({ messages, model: 'claude-opus-4-20250514' });
+
+      expect(response.status).toBe(400);
+      expect(upstream.requests).toHaveLength(0);
+    });
+
+    it('should reject oversized prompts', async () => {
+      const tooManyMessages = await post({ messages: new Array(101).fill(messages[0]) });
+      const tooLong = await post({ messages, system: 'x'.repeat(100_001) });
+
+      expect(tooManyMessages.status).toBe(400);
+      expect(tooLong.status).toBe(413);
+      expect(upstream.requests).toHaveLength(0);
+    });
+  });
+});
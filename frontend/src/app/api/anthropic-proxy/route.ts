@@ -0,0 +1,166 @@
+import { NextRequest, NextResponse } from 'next/server';
+import { createSupabaseServerClient } from '../../../lib/supabaseClient';
+
+const DEFAULT_API_URL = 'https://api.anthropic.com/v1/messages';
+const DEFAULT_MODEL = 'claude-sonnet-4-20250514';
+// Models callers may request; anything else is rejected rather than billed
+const ALLOWED_MODELS = new Set([DEFAULT_MODEL]);
+const MAX_TOKENS_LIMIT = 4096;
+// Bounds on what a caller can send upstream. Prompts packed with the default
+// budget are around 25k characters, so these leave room for larger budgets.
+const MAX_MESSAGES = 100;
+const MAX_INPUT_CHARS = 100_000;
+
+interface ProxyMessage {
+  role: string;
+  content: string;
+}
+
+/**
+ * Moves leading 'system' messages into the top-level system field the Messages API expects
+ */
+function splitSystemMessages(
+  messages: ProxyMessage[],
+  system?: string,
+): { system?: string; messages: ProxyMessage[] } {
+  const systemParts = system ? [system] : [];
+  const rest: ProxyMessage[] = [];
+  for (const message of messages) {
+    if (message.role === 'system') {
+      systemParts.push(message.content);
+    } else {
+      rest.push(message);
+    }
+  }
+  return {
+    system: systemParts.length > 0 ? systemParts.join('\n\n') : undefined,
+    messages: rest,
+  };
+}
+
+/**
+ * Whether the request carries the access token of a signed-in Supabase user
+ */
+async function isAuthenticated(req: NextRequest): Promise<boolean> {
+  const token = req.headers.get('authorization')?.replace(/^Bearer\s+/i, '');
+  if (!token) {
+    return false;
+  }
+  const { data, error } = await createSupabaseServerClient().auth.getUser(token);
+  return !error && !!data.user;
+}
+
+/**
+ * Checks message shapes and size limits
+ * @returns The error response to send, or null if the request may be forwarded
+ */
+function validateInput(system: unknown, messages: unknown[]): NextResponse | null {
+  if (messages.length === 0 || messages.length > MAX_MESSAGES) {
+    return NextResponse.json(
+      { error: `Between 1 and ${MAX_MESSAGES} messages are required` },
+      { status: 400 },
+    );
+  }
+  if (system !== undefined && typeof system !== 'string') {
+    return NextResponse.json({ error: 'Invalid system prompt' }, { status: 400 });
+  }
+
+  let chars = typeof system === 'string' ? system.length : 0;
+  for (const message of messages as Partial<ProxyMessage>[]) {
+    if (
+      !message ||
+      !['user', 'assistant', 'system'].includes(message.role as string) ||
+      typeof message.content !== 'string'
+    ) {
+      return NextResponse.json({ error: 'Invalid messages format' }, { status: 400 });
+    }
+    chars += message.content.length;
+  }
+  if (chars > MAX_INPUT_CHARS) {
+    return NextResponse.json({ error: 'Request too large' }, { status: 413 });
+  }
+  return null;
+}
+
+/**
+ * Forwards chat requests from signed-in users to the Anthropic Messages API
+ *
+ * With `stream: true` the upstream server-sent events are piped straight
+ * through to the browser, so the first tokens are shown as soon as they are
+ * generated instead of after the whole answer is complete.
+ */
+export async function POST(req: NextRequest) {
+  try {
+    const apiKey = process.env.ANTHROPIC_API_KEY;
+    if (!apiKey) {
+      console.error('ANTHROPIC_API_KEY is not configured');
+      return NextResponse.json({ error: 'AI service not configured' }, { status: 500 });
+    }
+
+    if (!(await isAuthenticated(req))) {
+      return NextResponse.json({ error: 'Unauthorized' }, { status: 401 });
+    }
+
+    const body = await req.json();
+    if (!body || !Array.isArray(body.messages)) {
+      return NextResponse.json({ error: 'Invalid messages format' }, { status: 400 });
+    }
+    const invalid = validateInput(body.system, body.messages);
+    if (invalid) {
+      return invalid;
+    }
+    const model = body.model ?? DEFAULT_MODEL;
+    if (!ALLOWED_MODELS.has(model)) {
+      return NextResponse.json({ error: 'Model not allowed' }, { status: 400 });
+    }
+
+    const { system, messages } = splitSystemMessages(body.messages, body.system);
+    const stream = body.stream === true;
+
+    const response = await fetch(process.env.ANTHROPIC_API_URL || DEFAULT_API_URL, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+        'X-API-Key': apiKey,
+        'anthropic-version': '2023-06-01',
+      },
+      body: JSON.stringify({
+        model,
+        system,
+        messages,
+        max_tokens: Math.min(Number(body.max_tokens) || 1024, MAX_TOKENS_LIMIT),
+        temperature: body.temperature,
+        stream,
+      }),
+      signal: req.signal,
+    });
+
+    if (!response.ok) {
+      const error = await response.text();
+      console.error('Anthropic API error:', error);
+      return NextResponse.json(
+        { error: 'AI service temporarily unavailable' },
+        { status: response.status },
+      );
+    }
+
+    if (stream && response.body) {
+      return new Response(response.body, {
+        status: 200,
+        headers: {
+          'Content-Type': 'text/event-stream',
+          'Cache-Control': 'no-cache, no-transform',
+          Connection: 'keep-alive',
+          // Stops reverse proxies from buffering the stream
+          'X-Accel-Buffering': 'no',
+        },
+      });
+    }
+
+    const data = await response.json();
+    return NextResponse.json(data);
+  } catch (error) {
+    console.error('Proxy error:', error);
+    return NextResponse.json({ error: 'Internal server error' }, { status: 500 });
+  }
+}
@@ -14,7 +14,8 @@ import {
   createChatSession,
   getChatMessages,
   addChatMessage,
-  sendMessageToAI,
+  streamMessageToAI,
+  prefetchChatContext,
   Machine,
   ChatSession,
   ChatMessage,
@@ -34,12 +35,17 @@ export const ChatInterface: React.FC<ChatInterfaceProps> = ({ machine, onBack })
   const [audioEnabled, setAudioEnabled] = useState(false);
   const [error, setError] = useState<string | null>(null);
   const [contextSources, setContextSources] = useState<string[]>([]);
+  // Text of the AI answer while it is still streaming in
+  const [streamingText, setStreamingText] = useState<string | null>(null);
   const messagesEndRef = useRef<HTMLDivElement | null>(null);
+  const abortRef = useRef<AbortController | null>(null);
 
   // Load or create chat session and fetch messages
   useEffect(() => {
     if (!machine) return;
     let isMounted = true;
+    // Build the manual index while the session loads and the user types
+    prefetchChatContext(machine.id || '').catch(() => undefined);
     (async () => {
       setError(null);
       try {
@@ -61,6 +67,7 @@ export const ChatInterface: React.FC<ChatInterfaceProps> = ({ machine, onBack })
     })();
     return () => {
       isMounted = false;
+      abortRef.current?.abort();
     };
   }, [machine]);
 
@@ -69,30 +76,46 @@ export const ChatInterface: React.FC<ChatInterfaceProps> = ({ machine, onBack })
     if (messagesEndRef.current) {
       messagesEndRef.current.scrollIntoView({ behavior: 'smooth' });
     }
-  }, [messages]);
+  }, [messages, streamingText]);
 
   const handleSend = async (e: React.FormEvent) => {
     e.preventDefault();
     if (!inputValue.trim() || !session) return;
     setIsProcessing(true);
     setError(null);
+    const text = inputValue;
+    const controller = new AbortController();
+    abortRef.current = controller;
     try {
-      // Add user message
       const userMsg: Omit<ChatMessage, 'id' | 'timestamp'> = {
         session_id: session.id,
         sender: 'user',
-        text: inputValue,
+        text,
       };
-      const savedUserMsg = await addChatMessage(userMsg);
-      setMessages((prev) => [...prev, savedUserMsg]);
       setInputValue('');
-      // Call AI API with session context
-      const aiResponse = await sendMessageToAI({
-        userMessage: savedUserMsg.text,
+
+      // Start retrieval and the AI request while the user message is being saved
+      const aiResponsePromise = streamMessageToAI({
+        userMessage: text,
         machine,
-        conversation: [...messages, savedUserMsg].map((m) => ({ sender: m.sender, text: m.text })),
+        conversation: messages.map((m) => ({ sender: m.sender, text: m.text })),
         sessionId: session.id,
+        signal: controller.signal,
+        onToken: (token) => setStreamingText((prev) => (prev ?? '') + token),
       });
+
+      let savedUserMsg: ChatMessage;
+      try {
+        savedUserMsg = await addChatMessage(userMsg);
+      } catch (err) {
+        controller.abort();
+        throw err;
+      }
+      setMessages((prev) => [...prev, savedUserMsg]);
+
+      const aiResponse = await aiResponsePromise;
+      if (controller.signal.aborted) return;
+
       // Add AI message
       const aiMsg: Omit<ChatMessage, 'id' | 'timestamp'> = {
         session_id: session.id,
@@ -116,6 +139,7 @@ export const ChatInterface: React.FC<ChatInterfaceProps> = ({ machine, onBack })
     } catch (err) {
       setError('Failed to send message.');
     } finally {
+      setStreamingText(null);
       setIsProcessing(false);
     }
   };
@@ -263,7 +287,14 @@ export const ChatInterface: React.FC<ChatInterfaceProps> = ({ machine, onBack })
             </div>
           ))
         )}
-        {isProcessing && (
+        {streamingText !== null && (
+          <div className="mb-4 flex justify-start">
+            <div className="max-w-[80%] rounded-lg p-3 bg-white text-gray-800 border border-gray-200 shadow-sm">
+              <p aria-live="polite">{streamingText}</p>
+            </div>
+          </div>
+        )}
+        {isProcessing && streamingText === null && (
           <div className="flex justify-start mb-4">
             <div className="bg-white rounded-lg p-3 border border-gray-200 shadow-sm flex items-center">
               <LoadingSpinner />
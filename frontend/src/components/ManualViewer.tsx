@@ -1,14 +1,18 @@
-import React, { useState, useEffect, useMemo } from 'react';
+import React, { useState, useEffect } from 'react';
 import { ArrowLeftIcon, SearchIcon, FolderIcon, UploadIcon } from 'lucide-react';
 import { LoadingSpinner } from './ui/LoadingSpinner';
 import { supabase } from '../lib/supabaseClient';
-import { Document } from '../types/document';
+import { Document, ManualSearchHit } from '../types/document';
 import { processPDFDocument } from '../lib/api';
+import { listMachineDocuments, searchManuals, splitHighlights } from '../lib/manualSearch';
 // import * as pdfjsLib from 'pdfjs-dist/build/pdf';
 
 // Configure PDF.js worker
 // pdfjsLib.GlobalWorkerOptions.workerSrc = `//cdnjs.cloudflare.com/ajax/libs/pdf.js/5.3.31/pdf.worker.min.js`;
 
+// Wait for a pause in typing before querying
+const SEARCH_DEBOUNCE_MS = 300;
+
 interface ManualViewerProps {
   machine: { id: string; name: string };
   onSelectManual: (doc: Document) => void;
@@ -29,16 +33,16 @@ function highlightMatch(text: string, term: string) {
   );
 }
 
-function getSnippet(text: string, term: string, length = 80) {
-  if (!text || !term) return '';
-  const idx = text.toLowerCase().indexOf(term.toLowerCase());
-  if (idx === -1) return '';
-  const start = Math.max(0, idx - length / 2);
-  const end = Math.min(text.length, idx + length / 2);
-  let snippet = text.substring(start, end);
-  if (start > 0) snippet = '...' + snippet;
-  if (end < text.length) snippet = snippet + '...';
-  return snippet;
+function renderSnippet(snippet: string) {
+  return splitHighlights(snippet).map((segment, i) =>
+    segment.match ? (
+      <mark key={i} className="bg-yellow-200 px-0.5 rounded">
+        {segment.text}
+      </mark>
+    ) : (
+      segment.text
+    ),
+  );
 }
 
 function withTimeout<T>(promise: Promise<T>, ms: number): Promise<T> {
@@ -51,7 +55,11 @@ function withTimeout<T>(promise: Promise<T>, ms: number): Promise<T> {
 export const ManualViewer = ({ machine, onSelectManual, onBack }: ManualViewerProps) => {
   const [isLoading, setIsLoading] = useState(false);
   const [searchTerm, setSearchTerm] = useState('');
+  const [debouncedTerm, setDebouncedTerm] = useState('');
   const [documents, setDocuments] = useState<Document[]>([]);
+  const [hits, setHits] = useState<ManualSearchHit[]>([]);
+  const [totalHits, setTotalHits] = useState(0);
+  const [reloadKey, setReloadKey] = useState(0);
   const [uploading, setUploading] = useState(false);
   const [uploadError, setUploadError] = useState<string | null>(null);
   const [processing, setProcessing] = useState(false);
@@ -73,43 +81,74 @@ export const ManualViewer = ({ machine, onSelectManual, onBack }: ManualViewerPr
     );
   }
 
-  // Fetch documents for this machine
+  useEffect(() => {
+    const timer = setTimeout(() => setDebouncedTerm(searchTerm.trim()), SEARCH_DEBOUNCE_MS);
+    return () => clearTimeout(timer);
+  }, [searchTerm]);
+
+  // List documents, or search them once the user pauses typing
   useEffect(() => {
     if (!machine) return;
+    let cancelled = false;
+    const filters = { uploadedAfter: dateFilter, fileType: fileTypeFilter };
     const fetchDocuments = async () => {
-      let query = supabase
-        .from('documents')
-        .select('*')
-        .eq('machine_id', machine.id)
-        .order('uploaded_at', { ascending: false });
-      if (dateFilter) query = query.gte('uploaded_at', dateFilter);
-      if (fileTypeFilter) query = query.ilike('filename', `%${fileTypeFilter}`);
-      if (searchTerm) {
-        // Use full-text search for extracted_text
-        query = query.or(`filename.ilike.%${searchTerm}%,extracted_text.fts.${searchTerm}`);
-      }
-      const { data, error } = await query;
-      if (error) setUploadError(error.message);
-      else setDocuments(data || []);
-      // Update suggestions for autocomplete
-      if (data && searchTerm) {
-        setSuggestions(
-          data
-            .map((doc: Document) => doc.filename)
-            .filter((name: string) => name.toLowerCase().includes(searchTerm.toLowerCase()))
-            .slice(0, 5),
-        );
-      } else {
-        setSuggestions([]);
+      setIsLoading(true);
+      try {
+        if (debouncedTerm) {
+          const results = await searchManuals(machine.id, debouncedTerm, filters);
+          if (cancelled) return;
+          setHits(results.hits);
+          setTotalHits(results.total);
+          // Update suggestions for autocomplete
+          const term = debouncedTerm.toLowerCase();
+          setSuggestions(
+            results.hits
+              .map((hit) => hit.filename)
+              .filter((name) => name.toLowerCase().includes(term) && name.toLowerCase() !== term)
+              .slice(0, 5),
+          );
+        } else {
+          const docs = await listMachineDocuments(machine.id, filters);
+          if (cancelled) return;
+          setDocuments(docs);
+          setHits([]);
+          setTotalHits(0);
+          setSuggestions([]);
+        }
+      } catch (err: any) {
+        if (!cancelled) setUploadError(err.message);
+      } finally {
+        if (!cancelled) setIsLoading(false);
       }
     };
     fetchDocuments();
-  }, [machine, dateFilter, fileTypeFilter, searchTerm]);
+    return () => {
+      cancelled = true;
+    };
+  }, [machine, dateFilter, fileTypeFilter, debouncedTerm, reloadKey]);
 
   const handleSearch = (e: React.FormEvent<HTMLFormElement>) => {
     e.preventDefault();
+    // Search right away instead of waiting for the debounce
+    setDebouncedTerm(searchTerm.trim());
+  };
+
+  const handleLoadMore = async () => {
     setIsLoading(true);
-    setTimeout(() => setIsLoading(false), 500);
+    try {
+      const results = await searchManuals(
+        machine.id,
+        debouncedTerm,
+        { uploadedAfter: dateFilter, fileType: fileTypeFilter },
+        hits.length,
+      );
+      setHits((prev) => [...prev, ...results.hits]);
+      setTotalHits(results.total);
+    } catch (err: any) {
+      setUploadError(err.message);
+    } finally {
+      setIsLoading(false);
+    }
   };
 
   const handleUploadDocuments = async (e: React.ChangeEvent<HTMLInputElement>) => {
@@ -174,12 +213,7 @@ export const ManualViewer = ({ machine, onSelectManual, onBack }: ManualViewerPr
       }
       setProcessingStatus('All PDFs processed.');
       // Refresh document list
-      const { data } = await supabase
-        .from('documents')
-        .select('*')
-        .eq('machine_id', machine.id)
-        .order('uploaded_at', { ascending: false });
-      setDocuments(data || []);
+      setReloadKey((key) => key + 1);
     } catch (err: any) {
       setUploadError(err.message || 'Upload failed');
     } finally {
@@ -197,12 +231,7 @@ export const ManualViewer = ({ machine, onSelectManual, onBack }: ManualViewerPr
       await withTimeout(processPDFDocument(doc.id, doc.storage_path), 60000);
       setProcessingStatus('PDF processed successfully.');
       // Refresh document list
-      const { data } = await supabase
-        .from('documents')
-        .select('*')
-        .eq('machine_id', machine.id)
-        .order('uploaded_at', { ascending: false });
-      setDocuments(data || []);
+      setReloadKey((key) => key + 1);
     } catch (err: any) {
       setProcessingStatus('PDF processing failed: ' + (err.message || 'Unknown error'));
     } finally {
@@ -210,11 +239,7 @@ export const ManualViewer = ({ machine, onSelectManual, onBack }: ManualViewerPr
     }
   };
 
-  const filteredDocuments = documents.filter(
-    (doc) =>
-      doc.filename.toLowerCase().includes(searchTerm.toLowerCase()) ||
-      (doc.extracted_text && doc.extracted_text.toLowerCase().includes(searchTerm.toLowerCase())),
-  );
+  const results: (Document | ManualSearchHit)[] = debouncedTerm ? hits : documents;
 
   return (
     <div className="max-w-4xl mx-auto p-4">
@@ -297,18 +322,14 @@ export const ManualViewer = ({ machine, onSelectManual, onBack }: ManualViewerPr
         <div className="mb-3">
           <h2 className="font-semibold">{machine.name} - Documentation</h2>
         </div>
-        {filteredDocuments.length === 0 ? (
+        {results.length === 0 ? (
           <div className="text-center py-8">
             <p className="text-gray-500">No documents found matching your search.</p>
           </div>
         ) : (
           <div className="space-y-3">
-            {filteredDocuments.map((doc) => {
-              const matchInTitle = doc.filename.toLowerCase().includes(searchTerm.toLowerCase());
-              const matchInText =
-                doc.extracted_text &&
-                doc.extracted_text.toLowerCase().includes(searchTerm.toLowerCase());
-              const snippet = matchInText ? getSnippet(doc.extracted_text!, searchTerm) : '';
+            {results.map((doc) => {
+              const hit = debouncedTerm ? (doc as ManualSearchHit) : null;
               return (
                 <button
                   key={doc.id}
@@ -320,14 +341,16 @@ export const ManualViewer = ({ machine, onSelectManual, onBack }: ManualViewerPr
                       <FolderIcon size={24} />
                     </div>
                     <div className="flex-1">
-                      <h3 className="font-medium">{highlightMatch(doc.filename, searchTerm)}</h3>
+                      <h3 className="font-medium">{highlightMatch(doc.filename, debouncedTerm)}</h3>
                       <p className="text-sm text-gray-500 mt-1">
                         Uploaded: {new Date(doc.uploaded_at).toLocaleDateString()}
                       </p>
-                      {snippet && (
+                      {hit?.snippet && (
                         <p className="text-xs text-gray-700 mt-1">
-                          <span className="font-semibold">Excerpt:</span>{' '}
-                          {highlightMatch(snippet, searchTerm)}
+                          <span className="font-semibold">
+                            Excerpt{hit.page_number ? ` (page ${hit.page_number})` : ''}:
+                          </span>{' '}
+                          {renderSnippet(hit.snippet)}
                         </p>
                       )}
                       {doc.processing_status && (
@@ -372,6 +395,15 @@ export const ManualViewer = ({ machine, onSelectManual, onBack }: ManualViewerPr
                 </button>
               );
             })}
+            {hits.length < totalHits && (
+              <button
+                onClick={handleLoadMore}
+                disabled={isLoading}
+                className="block w-full p-2 text-sm text-blue-600 hover:bg-blue-50 rounded-lg disabled:opacity-50"
+              >
+                Show more results ({hits.length} of {totalHits})
+              </button>
+            )}
           </div>
         )}
       </div>
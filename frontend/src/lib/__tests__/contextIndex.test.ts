@@ -0,0 +1,134 @@
+/**
+ * Tests for chat context BM25 indexes
+ */
+
+import { Bm25Index, LruCache, ManualIndex, documentSignature, tokenize } from '../contextIndex';
+
+describe('tokenize', () => {
+  it('should lowercase terms, drop stop words and short words, and keep offsets', () => {
+    const text = 'Check the Hydraulic pump, it is at 40 PSI';
+
+    expect(tokenize(text)).toEqual([
+      { term: 'check', offset: 0 },
+      { term: 'hydraulic', offset: 10 },
+      { term: 'pump', offset: 20 },
+      { term: 'psi', offset: 38 },
+    ]);
+  });
+});
+
+describe('Bm25Index', () => {
+  it('should rank items by term relevance', () => {
+    const index = new Bm25Index<string>();
+    index.addText('pump', 'Hydraulic pump pressure low. Replace pump seal.');
+    index.addText('belt', 'Conveyor belt tension and belt alignment.');
+    index.addText('mixed', 'Check belt before the pump.');
+
+    const hits = index.search(['pump']);
+
+    expect(hits.map((hit) => hit.item)).toEqual(['pump', 'mixed']);
+    expect(hits[0].score).toBeGreaterThan(hits[1].score);
+  });
+
+  it('should weight rare terms above common ones', () => {
+    const index = new Bm25Index<string>();
+    index.addText('a', 'motor error code');
+    index.addText('b', 'motor overheating');
+    index.addText('c', 'motor noise');
+
+    const [best] = index.search(['motor', 'error']);
+
+    expect(best.item).toBe('a');
+  });
+
+  it('should return nothing for unknown terms or an empty index', () => {
+    const index = new Bm25Index<string>();
+    expect(index.search(['pump'])).toEqual([]);
+
+    index.addText('a', 'motor noise');
+    expect(index.search(['pump'])).toEqual([]);
+  });
+});
+
+describe('ManualIndex', () => {
+  const filler = (words: number) => Array.from({ length: words }, () => 'lorem').join(' ');
+
+  it('should locate passages and return their original text', () => {
+    const text = `${filler(100)} Replace the Hydraulic Filter every month. ${filler(100)}`;
+    const index = new ManualIndex(
+      [{ id: 'doc-1', filename: 'manual.pdf', extracted_text: text }],
+      'sig',
+      200,
+    );
+
+    const hits = index.search(['hydraulic', 'filter']);
+
+    expect(hits.length).toBeGreaterThan(0);
+    expect(hits[0].item.documentId).toBe('doc-1');
+    expect(index.getText(hits[0].item)).toContain('Hydraulic Filter');
+    hits.forEach((hit) => expect(hit.item.end - hit.item.start).toBeLessThanOrEqual(200));
+  });
+
+  it('should cover the whole text with overlapping passages', () => {
+    const text = `${filler(50)} needle`;
+    const index = new ManualIndex(
+      [{ id: 'doc-1', filename: 'a.pdf', extracted_text: text }],
+      '',
+      100,
+    );
+
+    const [hit] = index.search(['needle']);
+
+    expect(hit.item.end).toBe(text.length);
+  });
+
+  it('should index short documents as a single passage', () => {
+    const index = new ManualIndex(
+      [{ id: 'doc-1', filename: 'a.pdf', extracted_text: 'Short pump note' }],
+      '',
+      500,
+    );
+
+    const hits = index.search(['pump']);
+
+    expect(hits).toHaveLength(1);
+    expect(index.getText(hits[0].item)).toBe('Short pump note');
+  });
+});
+
+describe('documentSignature', () => {
+  it('should ignore order and change when processed_at changes', () => {
+    const first = documentSignature([
+      { id: 'a', processed_at: '2025-01-01' },
+      { id: 'b', processed_at: '2025-01-02' },
+    ]);
+
+    expect(
+      documentSignature([
+        { id: 'b', processed_at: '2025-01-02' },
+        { id: 'a', processed_at: '2025-01-01' },
+      ]),
+    ).toBe(first);
+    expect(
+      documentSignature([
+        { id: 'a', processed_at: '2025-01-03' },
+        { id: 'b', processed_at: '2025-01-02' },
+      ]),
+    ).not.toBe(first);
+  });
+});
+
+describe('LruCache', () => {
+  it('should evict the least recently used entry', () => {
+    const cache = new LruCache<string, number>(2);
+    cache.set('a', 1);
+    cache.set('b', 2);
+    cache.get('a');
+    cache.set('c', 3);
+
+    expect(cache.get('a')).toBe(1);
+    expect(cache.get('b')).toBeUndefined();
+    expect(cache.get('c')).toBe(3);
+    expect(cache.size).toBe(2);
+  });
+});
@@ -0,0 +1,190 @@
+/**
+ * Tests for chat context retrieval
+ */
+
+import { ContextService } from '../contextService';
+import { PIPELINE_STAGES, pipelineMetrics } from '../metrics';
+import { supabase } from '../supabaseClient';
+
+jest.mock('../supabaseClient', () => ({
+  supabase: { from: jest.fn() },
+}));
+
+/**
+ * Chainable query builder that resolves to the given result
+ */
+function queryResult(result: { data: any; error: any }) {
+  const builder: any = {};
+  ['select', 'eq', 'neq', 'not', 'in', 'order', 'limit'].forEach((method) => {
+    builder[method] = jest.fn(() => builder);
+  });
+  builder.then = (resolve: (value: any) => any, reject: (reason: any) => any) =>
+    Promise.resolve(result).then(resolve, reject);
+  return builder;
+}
+
+describe('ContextService', () => {
+  const mockFrom = supabase.from as jest.Mock;
+
+  const manualText =
+    'General safety instructions. '.repeat(40) +
+    'If the hydraulic pressure drops, replace the pump seal. ' +
+    'Routine cleaning steps. '.repeat(40);
+
+  let documentRows: { id: string; processed_at: string }[];
+  let sessionRows: any[];
+  let textQueries: number;
+  let messageQueries: number;
+  let messageBuilder: any;
+
+  beforeEach(() => {
+    jest.clearAllMocks();
+    ContextService.invalidateCache();
+
+    documentRows = [{ id: 'doc-1', processed_at: '2025-01-01T00:00:00Z' }];
+    sessionRows = [
+      {
+        id: 'session-2',
+        machine_id: 'machine-1',
+        created_at: '2025-01-03T00:00:00Z',
+        chat_messages: [{ timestamp: '2025-01-03T00:05:00Z' }],
+      },
+      {
+        id: 'session-1',
+        machine_id: 'machine-1',
+        created_at: '2025-01-02T00:00:00Z',
+        chat_messages: [{ timestamp: '2025-01-02T00:05:00Z' }],
+      },
+    ];
+    textQueries = 0;
+    messageQueries = 0;
+
+    mockFrom.mockImplementation((table: string) => {
+      if (table === 'documents') {
+        const builder = queryResult({ data: documentRows, error: null });
+        builder.select = jest.fn((columns: string) => {
+          if (columns.includes('extracted_text')) {
+            textQueries++;
+            return queryResult({
+              data: [{ id: 'doc-1', filename: 'press.pdf', extracted_text: manualText }],
+              error: null,
+            });
+          }
+          return builder;
+        });
+        return builder;
+      }
+
+      if (table === 'chat_sessions') {
+        return queryResult({ data: sessionRows, error: null });
+      }
+
+      messageQueries++;
+      messageBuilder = queryResult({
+        data: [
+          { id: 'm1', session_id: 'session-1', sender: 'user', text: 'Hydraulic pressure low' },
+          { id: 'm2', session_id: 'session-1', sender: 'ai', text: 'Replace the pump seal' },
+          { id: 'm3', session_id: 'session-2', sender: 'user', text: 'Belt is squeaking' },
+        ],
+        error: null,
+      });
+      return messageBuilder;
+    });
+  });
+
+  it('should return the passage that matches the question', async () => {
+    const context = await ContextService.getContextForQuery(
+      'machine-1',
+      'hydraulic pressure drops',
+    );
+
+    expect(context.manualExcerpts.length).toBeGreaterThan(0);
+    expect(context.manualExcerpts[0].filename).toBe('press.pdf');
+    expect(context.manualExcerpts[0].excerpt).toContain('hydraulic pressure drops');
+  });
+
+  it('should not return overlapping excerpts from the same document', async () => {
+    const { manualExcerpts } = await ContextService.getContextForQuery('machine-1', 'pump seal');
+
+    const texts = manualExcerpts.map((excerpt) => excerpt.excerpt);
+    expect(texts.filter((text) => text.includes('pump seal'))).toHaveLength(1);
+  });
+
+  it('should reuse the cached index until processed_at changes', async () => {
+    await ContextService.getContextForQuery('machine-1', 'hydraulic');
+    await ContextService.getContextForQuery('machine-1', 'pump');
+    expect(textQueries).toBe(1);
+
+    documentRows = [{ id: 'doc-1', processed_at: '2025-02-01T00:00:00Z' }];
+    await ContextService.getContextForQuery('machine-1', 'pump');
+    expect(textQueries).toBe(2);
+  });
+
+  it('should record a failed retrieval step as an error and keep the other', async () => {
+    jest.spyOn(console, 'error').mockImplementation(() => undefined);
+    pipelineMetrics.reset();
+    const defaultTables = mockFrom.getMockImplementation()!;
+    mockFrom.mockImplementation((table: string) =>
+      table === 'chat_sessions'
+        ? queryResult({ data: null, error: { message: 'connection reset' } })
+        : defaultTables(table),
+    );
+
+    const context = await ContextService.getContextForQuery('machine-1', 'pump seal');
+
+    expect(context.chatHistory).toEqual([]);
+    expect(context.manualExcerpts.length).toBeGreaterThan(0);
+    const snapshot = pipelineMetrics.snapshot();
+    expect(snapshot[PIPELINE_STAGES.contextChatHistory].errors).toBe(1);
+    expect(snapshot[PIPELINE_STAGES.contextManualExcerpts].errors).toBe(0);
+    (console.error as jest.Mock).mockRestore();
+  });
+
+  it('should fetch history messages for all sessions in one query', async () => {
+    const context = await ContextService.getContextForQuery('machine-1', 'hydraulic pressure');
+
+    expect(messageQueries).toBe(1);
+    expect(context.chatHistory).toHaveLength(1);
+    expect(context.chatHistory[0].sessionId).toBe('session-1');
+    expect(context.chatHistory[0].resolution).toBe('Replace the pump seal');
+  });
+
+  it('should reuse the cached history index until a session gets new messages', async () => {
+    await ContextService.getContextForQuery('machine-1', 'hydraulic pressure');
+    await ContextService.getContextForQuery('machine-1', 'pump seal');
+    expect(messageQueries).toBe(1);
+
+    sessionRows[0].chat_messages = [{ timestamp: '2025-01-03T00:09:00Z' }];
+    const context = await ContextService.getContextForQuery('machine-1', 'hydraulic pressure');
+
+    expect(messageQueries).toBe(2);
+    expect(messageBuilder.in).toHaveBeenCalledWith('session_id', ['session-2']);
+    expect(context.chatHistory.map((summary) => summary.sessionId)).toEqual(['session-1']);
+  });
+
+  it('should leave the current session out of the history', async () => {
+    const context = await ContextService.getContextForQuery(
+      'machine-1',
+      'hydraulic pressure',
+      'session-1',
+    );
+
+    expect(context.chatHistory).toEqual([]);
+  });
+
+  it('should score excerpts by keyword matches', async () => {
+    const { manualExcerpts } = await ContextService.getContextForQuery('machine-1', 'pump seal');
+
+    // "pump" and "seal" each occur once in the matching passage
+    expect(manualExcerpts[0].relevanceScore).toBe(20);
+  });
+
+  it('should return no manual excerpts when the machine has no documents', async () => {
+    documentRows = [];
+
+    const context = await ContextService.getContextForQuery('machine-1', 'hydraulic');
+
+    expect(context.manualExcerpts).toEqual([]);
+    expect(textQueries).toBe(0);
+  });
+});
@@ -0,0 +1,85 @@
+/**
+ * Tests for streaming extracted document pages
+ */
+
+import { streamDocumentPages } from '../documentPages';
+import { supabase } from '../supabaseClient';
+
+jest.mock('../supabaseClient', () => ({
+  supabase: { from: jest.fn() },
+}));
+
+describe('streamDocumentPages', () => {
+  const mockFrom = supabase.from as jest.Mock;
+  const storedPages = Array.from({ length: 7 }, (_, i) => ({
+    page_number: i + 1,
+    text: `Page ${i + 1} text`,
+  }));
+  let requestedFrom: number[];
+
+  beforeEach(() => {
+    requestedFrom = [];
+    mockFrom.mockImplementation(() => {
+      let fromPage = 1;
+      let limit = Infinity;
+      const builder: any = {
+        select: jest.fn(() => builder),
+        eq: jest.fn(() => builder),
+        gte: jest.fn((_column: string, value: number) => {
+          fromPage = value;
+          requestedFrom.push(value);
+          return builder;
+        }),
+        order: jest.fn(() => builder),
+        limit: jest.fn((value: number) => {
+          limit = value;
+          return builder;
+        }),
+        then: (resolve: (value: any) => any) =>
+          resolve({
+            data: storedPages.filter((p) => p.page_number >= fromPage).slice(0, limit),
+            error: null,
+          }),
+      };
+      return builder;
+    });
+  });
+
+  it('should yield every page in order, fetching a window at a time', async () => {
+    const pages = [];
+    for await (const page of streamDocumentPages('doc-1', 1, 3)) {
+      pages.push(page);
+    }
+
+    expect(pages.map((page) => page.pageNumber)).toEqual([1, 2, 3, 4, 5, 6, 7]);
+    expect(pages[0]).toEqual({ text: 'Page 1 text', pageNumber: 1 });
+    expect(requestedFrom).toEqual([1, 4, 7]);
+  });
+
+  it('should resume from a given page', async () => {
+    const pages = [];
+    for await (const page of streamDocumentPages('doc-1', 6)) {
+      pages.push(page.pageNumber);
+    }
+
+    expect(pages).toEqual([6, 7]);
+  });
+
+  it('should surface query errors', async () => {
+    mockFrom.mockImplementation(() => {
+      const builder: any = {};
+      ['select', 'eq', 'gte', 'order', 'limit'].forEach((method) => {
+        builder[method] = jest.fn(() => builder);
+      });
+      builder.then = (resolve: (value: any) => any) =>
+        resolve({ data: null, error: { message: 'permission denied' } });
+      return builder;
+    });
+
+    const iterator = streamDocumentPages('doc-1');
+
+    await expect(iterator.next()).rejects.toThrow(
+      'Failed to fetch document pages: permission denied',
+    );
+  });
+});
@@ -0,0 +1,116 @@
+/**
+ * Tests for indexed manual search
+ */
+
+import { listMachineDocuments, searchManuals, splitHighlights } from '../manualSearch';
+import { supabase } from '../supabaseClient';
+
+jest.mock('../supabaseClient', () => ({
+  supabase: { from: jest.fn(), rpc: jest.fn() },
+}));
+
+const mockFrom = supabase.from as jest.Mock;
+const mockRpc = supabase.rpc as jest.Mock;
+
+/**
+ * Chainable query builder that resolves to the given result
+ */
+function queryResult(result: { data: any; error: any }) {
+  const builder: any = {};
+  ['select', 'eq', 'order', 'gte', 'ilike'].forEach((method) => {
+    builder[method] = jest.fn(() => builder);
+  });
+  builder.then = (resolve: (value: any) => any, reject: (reason: any) => any) =>
+    Promise.resolve(result).then(resolve, reject);
+  return builder;
+}
+
+describe('manualSearch', () => {
+  beforeEach(() => {
+    jest.clearAllMocks();
+  });
+
+  describe('listMachineDocuments', () => {
+    it('should not fetch extracted text', async () => {
+      const builder = queryResult({ data: [{ id: 'doc-1' }], error: null });
+      mockFrom.mockReturnValue(builder);
+
+      const docs = await listMachineDocuments('machine-1', { fileType: '.pdf' });
+
+      expect(docs).toEqual([{ id: 'doc-1' }]);
+      expect(builder.select.mock.calls[0][0]).not.toContain('extracted_text');
+      expect(builder.eq).toHaveBeenCalledWith('machine_id', 'machine-1');
+      expect(builder.ilike).toHaveBeenCalledWith('filename', '%.pdf');
+      expect(builder.gte).not.toHaveBeenCalled();
+    });
+
+    it('should throw when the query fails', async () => {
+      mockFrom.mockReturnValue(queryResult({ data: null, error: { message: 'boom' } }));
+
+      await expect(listMachineDocuments('machine-1')).rejects.toThrow(
+        'Failed to fetch documents: boom',
+      );
+    });
+  });
+
+  describe('searchManuals', () => {
+    it('should pass filters and pagination to the search RPC', async () => {
+      mockRpc.mockResolvedValue({
+        data: [
+          { id: 'doc-2', filename: 'press.pdf', page_number: 12, snippet: 'x', total_count: 41 },
+        ],
+        error: null,
+      });
+
+      const results = await searchManuals('machine-1', 'seal', { uploadedAfter: '2025-01-01' }, 20);
+
+      expect(mockRpc).toHaveBeenCalledWith('search_manuals', {
+        p_machine_id: 'machine-1',
+        search_text: 'seal',
+        match_limit: 20,
+        match_offset: 20,
+        uploaded_after: '2025-01-01',
+        filename_suffix: null,
+      });
+      expect(results.total).toBe(41);
+      expect(results.hits.map((hit) => hit.page_number)).toEqual([12]);
+    });
+
+    it('should not search for blank input', async () => {
+      const results = await searchManuals('machine-1', '   ');
+
+      expect(results).toEqual({ hits: [], total: 0 });
+      expect(mockRpc).not.toHaveBeenCalled();
+    });
+
+    it('should report no hits as a total of zero', async () => {
+      mockRpc.mockResolvedValue({ data: [], error: null });
+
+      await expect(searchManuals('machine-1', 'seal')).resolves.toEqual({ hits: [], total: 0 });
+    });
+
+    it('should throw when the RPC fails', async () => {
+      mockRpc.mockResolvedValue({ data: null, error: { message: 'timeout' } });
+
+      await expect(searchManuals('machine-1', 'seal')).rejects.toThrow(
+        'Failed to search manuals: timeout',
+      );
+    });
+  });
+
+  describe('splitHighlights', () => {
+    it('should split marked terms from plain text', () => {
+      expect(splitHighlights('Replace the <mark>seal</mark> and <mark>pump</mark>.')).toEqual([
+        { text: 'Replace the ', match: false },
+        { text: 'seal', match: true },
+        { text: ' and ', match: false },
+        { text: 'pump', match: true },
+        { text: '.', match: false },
+      ]);
+    });
+
+    it('should keep other markup as plain text', () => {
+      expect(splitHighlights('<b>Warning</b>')).toEqual([{ text: '<b>Warning</b>', match: false }]);
+    });
+  });
+});
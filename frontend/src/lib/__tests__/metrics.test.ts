@@ -0,0 +1,174 @@
+/**
+ * Tests for pipeline latency metrics
+ */
+
+import {
+  LatencyHistogram,
+  MetricsRegistry,
+  findLatencyRegressions,
+  instrumentMethods,
+} from '../metrics';
+
+describe('metrics', () => {
+  describe('LatencyHistogram', () => {
+    it('should report percentiles within bucket precision', () => {
+      const histogram = new LatencyHistogram();
+      for (let ms = 1; ms <= 1000; ms++) {
+        histogram.record(ms);
+      }
+
+      expect(histogram.count).toBe(1000);
+      expect(histogram.percentile(50)).toBeGreaterThanOrEqual(500);
+      expect(histogram.percentile(50)).toBeLessThanOrEqual(500 * 1.05);
+      expect(histogram.percentile(95)).toBeGreaterThanOrEqual(950);
+      expect(histogram.percentile(95)).toBeLessThanOrEqual(950 * 1.05);
+      expect(histogram.percentile(99)).toBeLessThanOrEqual(1000);
+    });
+
+    it('should clamp percentiles to the recorded range', () => {
+      const histogram = new LatencyHistogram();
+      histogram.record(42);
+
+      expect(histogram.percentile(50)).toBe(42);
+      expect(histogram.percentile(99)).toBe(42);
+      expect(new LatencyHistogram().percentile(50)).toBe(0);
+    });
+
+    it('should merge counts from another histogram', () => {
+      const a = new LatencyHistogram();
+      const b = new LatencyHistogram();
+      a.record(10);
+      b.record(1000);
+      b.record(1000);
+
+      a.merge(b);
+
+      expect(a.count).toBe(3);
+      expect(a.max).toBe(1000);
+      expect(a.percentile(50)).toBeGreaterThan(900);
+    });
+  });
+
+  describe('MetricsRegistry', () => {
+    it('should time sync and async work per stage', async () => {
+      const registry = new MetricsRegistry();
+
+      expect(registry.time('sync', () => 1 + 1)).toBe(2);
+      await expect(registry.time('async', async () => 'done')).resolves.toBe('done');
+
+      const snapshot = registry.snapshot();
+      expect(snapshot.sync.count).toBe(1);
+      expect(snapshot.async.count).toBe(1);
+      expect(snapshot.async.errors).toBe(0);
+    });
+
+    it('should count failures as errors and rethrow them', async () => {
+      const registry = new MetricsRegistry();
+
+      expect(() =>
+        registry.time('sync', () => {
+          throw new Error('boom');
+        }),
+      ).toThrow('boom');
+      await expect(
+        registry.time('async', async () => {
+          throw new Error('timeout');
+        }),
+      ).rejects.toThrow('timeout');
+
+      const snapshot = registry.snapshot();
+      expect(snapshot.sync.errors).toBe(1);
+      expect(snapshot.async.errors).toBe(1);
+    });
+
+    it('should export one structured record per stage', () => {
+      const registry = new MetricsRegistry();
+      registry.record('vector.searchSimilar', 12);
+      registry.record('vector.searchSimilar', 30, false);
+      const stop = registry.startTimer('ai.response');
+      stop();
+
+      const records = registry.exportMetrics();
+
+      expect(records.map((r) => r.stage).sort()).toEqual(['ai.response', 'vector.searchSimilar']);
+      const search = records.find((r) => r.stage === 'vector.searchSimilar')!;
+      expect(search).toMatchObject({
+        metric: 'pipeline.stage.latency_ms',
+        count: 2,
+        errors: 1,
+        min: 12,
+        max: 30,
+        mean: 21,
+      });
+      expect(JSON.parse(JSON.stringify(records))).toEqual(records);
+    });
+  });
+
+  describe('instrumentMethods', () => {
+    it('should time calls from outside but not calls between methods', async () => {
+      const registry = new MetricsRegistry();
+      const operations = {
+        async insert(rows: number[]): Promise<number> {
+          return rows.length;
+        },
+        async insertAll(rows: number[]): Promise<number> {
+          return this.insert(rows);
+        },
+      };
+      const db = instrumentMethods('vector', operations, registry);
+
+      await expect(db.insertAll([1, 2, 3])).resolves.toBe(3);
+
+      const snapshot = registry.snapshot();
+      expect(snapshot['vector.insertAll'].count).toBe(1);
+      expect(snapshot['vector.insert']).toBeUndefined();
+
+      await db.insert([1]);
+      expect(registry.snapshot()['vector.insert'].count).toBe(1);
+    });
+  });
+
+  describe('findLatencyRegressions', () => {
+    const summary = (p50: number, p95: number) => ({
+      count: 10,
+      errors: 0,
+      mean: p50,
+      min: p50,
+      max: p95,
+      p50,
+      p95,
+      p99: p95,
+    });
+
+    it('should flag percentiles slower than the tolerance allows', () => {
+      const regressions = findLatencyRegressions(
+        { 'chunking.total@500p': summary(100, 400) },
+        { 'chunking.total@500p': { p50: 100, p95: 200 } },
+        { tolerance: 0.25 },
+      );
+
+      expect(regressions).toEqual([
+        {
+          stage: 'chunking.total@500p',
+          percentile: 'p95',
+          baselineMs: 200,
+          currentMs: 400,
+          ratio: 2,
+        },
+      ]);
+    });
+
+    it('should ignore small absolute changes and stages without samples', () => {
+      expect(
+        findLatencyRegressions(
+          { 'context.index_search@50p': summary(0.2, 0.4) },
+          {
+            'context.index_search@50p': { p50: 0.1, p95: 0.1 },
+            'chunking.total@500p': { p50: 100 },
+          },
+          { minDeltaMs: 1 },
+        ),
+      ).toEqual([]);
+    });
+  });
+});
@@ -0,0 +1,138 @@
+/**
+ * Tests for token-budgeted prompt packing
+ */
+
+import { ContextData, ContextService } from '../contextService';
+import { estimateTokens, packContext, packPrompt, truncateToTokens } from '../promptPacker';
+
+jest.mock('../supabaseClient', () => ({
+  supabase: { from: jest.fn() },
+}));
+
+const formatContext = (context: ContextData) => ContextService.formatContextForAI(context);
+const scoreContext = (context: ContextData) =>
+  ContextService.calculateRelevanceScore(context.manualExcerpts, context.chatHistory);
+
+function createContext(excerptLengths: number[]): ContextData {
+  const context: ContextData = {
+    manualExcerpts: excerptLengths.map((length, i) => ({
+      documentId: `doc-${i}`,
+      filename: `manual-${i}.pdf`,
+      excerpt: 'word '.repeat(length / 5),
+      relevanceScore: 10 - i,
+    })),
+    chatHistory: [
+      {
+        sessionId: 'session-1',
+        date: '2025-01-01T00:00:00Z',
+        summary: 'Pump seal replaced',
+        relevantMessages: ['The pump seal was leaking'],
+      },
+    ],
+    relevanceScore: 0,
+  };
+  return { ...context, relevanceScore: scoreContext(context) };
+}
+
+describe('truncateToTokens', () => {
+  it('should cut long text at a word boundary', () => {
+    const text = 'check the hydraulic pressure gauge before restarting';
+    const truncated = truncateToTokens(text, 5);
+
+    expect(truncated.length).toBeLessThanOrEqual(20);
+    expect(truncated.endsWith('…')).toBe(true);
+    expect(text.startsWith(truncated.slice(0, -1))).toBe(true);
+  });
+
+  it('should leave short text alone', () => {
+    expect(truncateToTokens('short', 10)).toBe('short');
+  });
+});
+
+describe('packContext', () => {
+  it('should keep context within budget, preferring higher ranked excerpts', () => {
+    const context = createContext([3000, 3000, 3000]);
+
+    const packed = packContext(context, 1200, formatContext, scoreContext);
+
+    expect(estimateTokens(formatContext(packed))).toBeLessThanOrEqual(1200);
+    expect(packed.manualExcerpts[0]).toEqual(context.manualExcerpts[0]);
+    expect(packed.manualExcerpts.map((e) => e.filename)).toEqual([
+      'manual-0.pdf',
+      'manual-1.pdf',
+    ]);
+    expect(packed.manualExcerpts[1].excerpt.endsWith('…')).toBe(true);
+    expect(packed.relevanceScore).toBe(scoreContext(packed));
+  });
+
+  it('should score only the excerpts that were packed', () => {
+    const context = createContext([3000, 3000, 3000]);
+
+    const packed = packContext(context, 600, formatContext, scoreContext);
+
+    expect(packed.manualExcerpts).toHaveLength(1);
+    expect(packed.relevanceScore).toBeLessThan(context.relevanceScore);
+    expect(packed.relevanceScore).toBe(10 + packed.chatHistory.length * 20);
+  });
+
+  it('should keep everything when it fits', () => {
+    const context = createContext([400]);
+
+    expect(packContext(context, 2000, formatContext, scoreContext)).toEqual(context);
+  });
+});
+
+describe('packPrompt', () => {
+  const conversation = Array.from({ length: 200 }, (_, i) => ({
+    sender: i % 2 === 0 ? 'user' : 'ai',
+    text: `Turn ${i}: ` + 'details '.repeat(50),
+  }));
+
+  it('should keep the prompt size flat as the conversation grows', () => {
+    const options = {
+      systemPrompt: 'You are an expert troubleshooting assistant.',
+      context: createContext([2000, 2000]),
+      userMessage: 'What next?',
+      formatContext,
+      scoreContext,
+      budget: { maxInputTokens: 3000, maxContextTokens: 1000 },
+    };
+
+    const short = packPrompt({ ...options, conversation: conversation.slice(0, 10) });
+    const long = packPrompt({ ...options, conversation });
+
+    expect(short.droppedTurns).toBe(0);
+    expect(long.droppedTurns).toBeGreaterThan(150);
+    expect(long.estimatedTokens).toBeLessThanOrEqual(3000);
+    expect(long.messages[long.messages.length - 1]).toEqual({
+      role: 'user',
+      content: 'What next?',
+    });
+    // Only the most recent turns are kept
+    expect(long.messages.some((m) => m.content.startsWith('Turn 199:'))).toBe(true);
+    expect(long.messages.some((m) => m.content.startsWith('Turn 0:'))).toBe(false);
+  });
+
+  it('should start with a user message and not repeat the message being sent', () => {
+    const packed = packPrompt({
+      systemPrompt: 'System',
+      context: { manualExcerpts: [], chatHistory: [], relevanceScore: 0 },
+      conversation: [
+        { sender: 'ai', text: 'Hello, how can I help?' },
+        { sender: 'user', text: 'Pump is loud' },
+        { sender: 'ai', text: 'Check the seal.' },
+        { sender: 'user', text: 'Seal looks fine' },
+      ],
+      userMessage: 'Seal looks fine',
+      formatContext,
+      scoreContext,
+    });
+
+    expect(packed.system).toBe('System');
+    expect(packed.messages).toEqual([
+      { role: 'user', content: 'Pump is loud' },
+      { role: 'assistant', content: 'Check the seal.' },
+      { role: 'user', content: 'Seal looks fine' },
+    ]);
+  });
+});
@@ -0,0 +1,86 @@
+/**
+ * @jest-environment node
+ */
+
+/**
+ * Tests for server-sent event parsing
+ */
+
+import { ServerSentEvent, readMessageStream, readServerSentEvents } from '../streaming';
+
+function streamOf(chunks: (string | Uint8Array)[]): ReadableStream<Uint8Array> {
+  const encoder = new TextEncoder();
+  return new ReadableStream({
+    start(controller) {
+      chunks.forEach((chunk) =>
+        controller.enqueue(typeof chunk === 'string' ? encoder.encode(chunk) : chunk),
+      );
+      controller.close();
+    },
+  });
+}
+
+function delta(text: string): string {
+  const data = { type: 'content_block_delta', index: 0, delta: { type: 'text_delta', text } };
+  return `event: content_block_delta\ndata: ${JSON.stringify(data)}\n\n`;
+}
+
+describe('readServerSentEvents', () => {
+  it('should reassemble events split across chunks', async () => {
+    const events: ServerSentEvent[] = [];
+    const payload =
+      'event: ping\ndata: {}\n\nevent: message\r\ndata: line one\r\ndata: line two\r\n\r\n';
+
+    await readServerSentEvents(
+      streamOf([payload.slice(0, 7), payload.slice(7, 30), payload.slice(30)]),
+      (event) => events.push(event),
+    );
+
+    expect(events).toEqual([
+      { event: 'ping', data: '{}' },
+      { event: 'message', data: 'line one\nline two' },
+    ]);
+  });
+
+  it('should decode characters split between chunks', async () => {
+    const bytes = new TextEncoder().encode('data: Drück\n\n');
+    const events: ServerSentEvent[] = [];
+
+    // 'ü' is two bytes; split between them
+    await readServerSentEvents(streamOf([bytes.slice(0, 9), bytes.slice(9)]), (event) =>
+      events.push(event),
+    );
+
+    expect(events).toEqual([{ event: undefined, data: 'Drück' }]);
+  });
+});
+
+describe('readMessageStream', () => {
+  it('should report text deltas in order and return the full text', async () => {
+    const tokens: string[] = [];
+    const text = await readMessageStream(
+      streamOf([
+        'event: message_start\ndata: {"type":"message_start","message":{}}\n\n',
+        delta('Check '),
+        'event: ping\ndata: {"type": "ping"}\n\n',
+        delta('the seal.'),
+        'event: message_stop\ndata: {"type":"message_stop"}\n\n',
+      ]),
+      (token) => tokens.push(token),
+    );
+
+    expect(tokens).toEqual(['Check ', 'the seal.']);
+    expect(text).toBe('Check the seal.');
+  });
+
+  it('should throw on an error event', async () => {
+    const error = { type: 'error', error: { type: 'overloaded_error', message: 'Overloaded' } };
+
+    await expect(
+      readMessageStream(
+        streamOf([delta('Check'), `event: error\ndata: ${JSON.stringify(error)}\n\n`]),
+        () => undefined,
+      ),
+    ).rejects.toThrow('Stream error: Overloaded');
+  });
+});
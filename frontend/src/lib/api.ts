@@ -1,6 +1,9 @@
 import axios from 'axios';
 import { API_BASE_URL } from './utils';
 import { supabase } from './supabaseClient';
+import { ConversationTurn, PackedPrompt, PromptBudget, packPrompt } from './promptPacker';
+import { readMessageStream } from './streaming';
+import { PIPELINE_STAGES, pipelineMetrics } from './metrics';
 
 const api = axios.create({
   baseURL: API_BASE_URL,
@@ -183,25 +186,42 @@ export async function addChatMessage(
   return data as ChatMessage;
 }
 
-// Send a message to the AI API (Anthropic Claude) with enhanced context
-export async function sendMessageToAI({
+const AI_MODEL = 'claude-sonnet-4-20250514';
+const AI_MAX_TOKENS = 1024;
+const AI_UNAVAILABLE_TEXT =
+  "I apologize, but I'm having trouble connecting to my AI service right now. Please try again later or check the machine manual for assistance.";
+
+export interface AIMessageRequest {
+  userMessage: string;
+  machine: Machine;
+  conversation: ConversationTurn[];
+  sessionId?: string;
+  budget?: PromptBudget;
+}
+
+export interface AIMessageResponse {
+  text: string;
+  confidence: 'high' | 'medium' | 'low';
+  sources?: string[];
+}
+
+/**
+ * Retrieves context and packs the prompt for one chat turn
+ */
+async function prepareAIRequest({
   userMessage,
   machine,
   conversation,
   sessionId,
-}: {
-  userMessage: string;
-  machine: Machine;
-  conversation: Array<{ sender: string; text: string }>;
-  sessionId?: string;
-}): Promise<{ text: string; confidence: 'high' | 'medium' | 'low'; sources?: string[] }> {
+  budget,
+}: AIMessageRequest): Promise<PackedPrompt> {
   // Import context service dynamically to avoid circular imports
   const { ContextService } = await import('./contextService');
 
   // Get relevant context from manuals and chat history
   const context = await ContextService.getContextForQuery(machine.id || '', userMessage, sessionId);
 
-  // Compose enhanced system prompt with machine context and retrieved information
+  // Compose system prompt with machine context
   let systemPrompt = `You are an expert troubleshooting assistant for the following machine: ${machine.name}.`;
 
   // Add machine details if available
@@ -211,55 +231,166 @@ export async function sendMessageToAI({
 
   systemPrompt += ` Use the context below to help the user. Be concise, clear, and helpful.`;
 
-  // Add formatted context from manuals and chat history
-  const formattedContext = ContextService.formatContextForAI(context);
-  if (formattedContext) {
-    systemPrompt += '\n\n' + formattedContext;
+  // Fit retrieved context and recent turns into the token budget
+  const prompt = packPrompt({
+    systemPrompt,
+    context,
+    conversation,
+    userMessage,
+    formatContext: (packed) => ContextService.formatContextForAI(packed),
+    scoreContext: (packed) =>
+      ContextService.calculateRelevanceScore(packed.manualExcerpts, packed.chatHistory),
+    budget,
+  });
+
+  return prompt;
+}
+
+/**
+ * Headers for the AI proxy, which only answers signed-in users
+ */
+async function getProxyHeaders(headers: Record<string, string>): Promise<Record<string, string>> {
+  const { data } = await supabase.auth.getSession();
+  const token = data.session?.access_token;
+  return token ? { ...headers, Authorization: `Bearer ${token}` } : headers;
+}
+
+function toAIResponse(text: string, prompt: PackedPrompt): AIMessageResponse {
+  // Only cite and score the manuals that were actually sent to the model
+  const sources = prompt.context.manualExcerpts.map((excerpt) => excerpt.filename);
+  const { relevanceScore } = prompt.context;
+
+  return {
+    text,
+    confidence: relevanceScore > 50 ? 'high' : relevanceScore > 20 ? 'medium' : 'low',
+    sources: sources.length > 0 ? sources : undefined,
+  };
+}
+
+/**
+ * Builds the machine's manual index ahead of the first question
+ *
+ * Called when a chat opens, so the index is usually ready by the time the
+ * technician has typed a question.
+ */
+export async function prefetchChatContext(machineId: string): Promise<void> {
+  const { ContextService } = await import('./contextService');
+  await ContextService.warmCache(machineId);
+}
+
+// Send a message to the AI API (Anthropic Claude) with enhanced context
+export async function sendMessageToAI(request: AIMessageRequest): Promise<AIMessageResponse> {
+  try {
+    const [prompt, headers] = await Promise.all([
+      prepareAIRequest(request),
+      getProxyHeaders({ 'Content-Type': 'application/json' }),
+    ]);
+
+    const data = await pipelineMetrics.time(PIPELINE_STAGES.aiResponse, async () => {
+      const response = await fetch('/api/anthropic-proxy', {
+        method: 'POST',
+        headers,
+        body: JSON.stringify({
+          system: prompt.system,
+          messages: prompt.messages,
+          model: AI_MODEL,
+          max_tokens: AI_MAX_TOKENS,
+          temperature: 0.2,
+        }),
+      });
+
+      if (!response.ok) {
+        throw new Error(`Anthropic API error: ${response.status}`);
+      }
+
+      return response.json();
+    });
+    return toAIResponse(data.content[0].text, prompt);
+  } catch (error) {
+    console.error('Anthropic API error:', error);
+    return {
+      text: AI_UNAVAILABLE_TEXT,
+      confidence: 'low' as const,
+      sources: undefined,
+    };
   }
+}
 
-  // Compose messages for Anthropic API
-  const messages = [
-    { role: 'system', content: systemPrompt },
-    ...conversation.map((msg) => ({
-      role: msg.sender === 'user' ? 'user' : 'assistant',
-      content: msg.text,
-    })),
-    { role: 'user', content: userMessage },
-  ];
+/**
+ * Sends a message to the AI API and streams the answer as it is generated
+ *
+ * The response arrives as server-sent events through the proxy; onToken is
+ * called with each text fragment so the UI can render it immediately. If
+ * the stream breaks after some text arrived, that partial text is returned
+ * rather than discarded.
+ *
+ * The prompt needs the retrieved context, so the request is sent once
+ * retrieval (run alongside the session lookup) has finished. Callers overlap
+ * the whole call with their own work: ChatInterface starts it before saving
+ * the user message and only awaits it afterwards.
+ * @param onToken Called with each text fragment in order
+ * @param signal Aborts the request, e.g. when the chat is closed
+ */
+export async function streamMessageToAI(
+  request: AIMessageRequest & { onToken: (token: string) => void; signal?: AbortSignal },
+): Promise<AIMessageResponse> {
+  const { onToken, signal } = request;
+  let received = '';
+  let prepared: PackedPrompt | undefined;
+  let stopResponseTimer: ((success?: boolean) => number) | undefined;
 
   try {
+    const [prompt, headers] = await Promise.all([
+      prepareAIRequest(request),
+      getProxyHeaders({ 'Content-Type': 'application/json', Accept: 'text/event-stream' }),
+    ]);
+    prepared = prompt;
+    stopResponseTimer = pipelineMetrics.startTimer(PIPELINE_STAGES.aiResponse);
+    const stopFirstTokenTimer = pipelineMetrics.startTimer(PIPELINE_STAGES.aiFirstToken);
+
     const response = await fetch('/api/anthropic-proxy', {
       method: 'POST',
-      headers: {
-        'Content-Type': 'application/json',
-      },
+      headers,
       body: JSON.stringify({
-        messages,
-        model: 'claude-sonnet-4-20250514',
-        max_tokens: 1024,
+        system: prompt.system,
+        messages: prompt.messages,
+        model: AI_MODEL,
+        max_tokens: AI_MAX_TOKENS,
         temperature: 0.2,
+        stream: true,
       }),
+      signal,
     });
 
     if (!response.ok) {
       throw new Error(`Anthropic API error: ${response.status}`);
     }
 
-    const data = await response.json();
-
-    // Extract sources from context for reference
-    const sources = context.manualExcerpts.map((excerpt) => excerpt.filename);
+    // Fall back to a single update if the proxy answered without streaming
+    if (!response.body || !response.headers.get('content-type')?.includes('text/event-stream')) {
+      const data = await response.json();
+      received = data.content[0].text;
+      stopFirstTokenTimer();
+      onToken(received);
+      stopResponseTimer();
+      return toAIResponse(received, prompt);
+    }
 
-    return {
-      text: data.content[0].text,
-      confidence:
-        context.relevanceScore > 50 ? 'high' : context.relevanceScore > 20 ? 'medium' : 'low',
-      sources: sources.length > 0 ? sources : undefined,
-    };
+    const text = await readMessageStream(response.body, (token) => {
+      if (!received) stopFirstTokenTimer();
+      received += token;
+      onToken(token);
+    });
+    stopResponseTimer();
+    return toAIResponse(text, prompt);
   } catch (error) {
+    stopResponseTimer?.(false);
     console.error('Anthropic API error:', error);
+    if (received && prepared) {
+      return { ...toAIResponse(received, prepared), confidence: 'low' };
+    }
     return {
-      text: "I apologize, but I'm having trouble connecting to my AI service right now. Please try again later or check the machine manual for assistance.",
+      text: AI_UNAVAILABLE_TEXT,
       confidence: 'low' as const,
       sources: undefined,
     };
@@ -268,6 +399,9 @@ export async function sendMessageToAI({
 
 /**
  * Calls the Supabase Edge Function to process a PDF document.
+ * Large documents are extracted page by page over several invocations; the
+ * call returns once the first invocation ends, and progress can be read
+ * with getExtractionJob.
  * @param documentId The UUID of the document record in the database
  * @param storagePath The storage path of the PDF in Supabase Storage
  */
@@ -0,0 +1,52 @@
+/**
+ * @jest-environment node
+ */
+
+/**
+ * Tests for the pipeline benchmark
+ */
+
+import {
+  BENCHMARK_STAGES,
+  REFERENCE_STAGE,
+  benchmarkKey,
+  runPipelineBenchmark,
+} from '../pipelineBenchmark';
+import { pipelineMetrics } from '../../metrics';
+
+jest.mock('../../supabaseClient', () => ({
+  supabase: { from: jest.fn() },
+}));
+
+describe('runPipelineBenchmark', () => {
+  it('should report every stage per manual size', () => {
+    const results = runPipelineBenchmark({ pageCounts: [5], iterations: 2 });
+
+    expect(results[benchmarkKey('chunking.total', 5)].count).toBe(2);
+    expect(results[benchmarkKey(BENCHMARK_STAGES.hashChunks, 5)].count).toBe(2);
+    expect(results[benchmarkKey(BENCHMARK_STAGES.indexBuild, 5)].count).toBe(2);
+    expect(results[benchmarkKey(BENCHMARK_STAGES.indexSearch, 5)].count).toBeGreaterThan(2);
+    expect(results[benchmarkKey(BENCHMARK_STAGES.packPrompt, 5)].errors).toBe(0);
+  });
+
+  it('should time the reference workload once, independent of manual size', () => {
+    const results = runPipelineBenchmark({ pageCounts: [5, 10], iterations: 1 });
+
+    expect(results[REFERENCE_STAGE].count).toBeGreaterThan(1);
+    expect(results[REFERENCE_STAGE].p50).toBeGreaterThan(0);
+    expect(Object.keys(results).filter((key) => key.startsWith(REFERENCE_STAGE))).toEqual([
+      REFERENCE_STAGE,
+    ]);
+  });
+
+  it('should leave production metrics untouched', () => {
+    pipelineMetrics.reset();
+    pipelineMetrics.record('context.retrieval', 12);
+
+    runPipelineBenchmark({ pageCounts: [5], iterations: 1 });
+
+    expect(Object.keys(pipelineMetrics.snapshot())).toEqual(['context.retrieval']);
+    expect(pipelineMetrics.snapshot()['context.retrieval'].count).toBe(1);
+    pipelineMetrics.reset();
+  });
+});
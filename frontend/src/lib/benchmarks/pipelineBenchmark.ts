@@ -0,0 +1,157 @@
+/**
+ * Benchmarks for the CPU-bound stages of the ingest and chat pipeline
+ *
+ * Synthetic manuals of each size are chunked, hashed, indexed, searched and
+ * packed into a prompt. Stage timings are collected in a registry of the
+ * benchmark's own, so production metrics are left alone, and reported per
+ * manual size, e.g. `chunking.total@500p`. Network-bound stages (vectorDb
+ * calls, the AI request) are not benchmarked here; they are measured in
+ * production by pipelineMetrics.
+ *
+ * A fixed reference workload is timed alongside, as `benchmark.reference`.
+ * It does not use pipeline code, so it measures only the speed of the
+ * machine and lets timings from different machines be compared.
+ */
+
+import { DocumentChunker } from '../chunking/algorithm';
+import { ManualIndex } from '../contextIndex';
+import { ContextService } from '../contextService';
+import { hashChunks } from '../embeddings/incremental';
+import { MetricsRegistry, MetricsSnapshot } from '../metrics';
+import { packPrompt } from '../promptPacker';
+import { generateManualContent } from './syntheticManual';
+
+export const BENCHMARK_PAGE_COUNTS = [50, 200, 500];
+
+// Same passage length ContextService uses for its manual index
+const PASSAGE_LENGTH = 500;
+
+const BENCHMARK_QUERIES = [
+  ['hydraulic', 'pressure', 'drop'],
+  ['torque', 'base', 'bolts'],
+  ['error', 'code', 'reset'],
+  ['lockout', 'tagout', 'procedure'],
+];
+
+export const REFERENCE_STAGE = 'benchmark.reference';
+
+// Iterations of the reference workload; more than the stages get, since
+// every stage is compared relative to it
+const REFERENCE_ITERATIONS = 30;
+
+export const BENCHMARK_STAGES = {
+  hashChunks: 'embeddings.hash_chunks',
+  indexBuild: 'context.index_build',
+  indexSearch: 'context.index_search',
+  packPrompt: 'ai.pack_prompt',
+} as const;
+
+export interface BenchmarkOptions {
+  pageCounts?: number[];
+  /** Runs per manual size; more runs give steadier percentiles */
+  iterations?: number;
+}
+
+/**
+ * Key under which a stage is reported for a manual size
+ */
+export function benchmarkKey(stage: string, pageCount: number): string {
+  return `${stage}@${pageCount}p`;
+}
+
+/**
+ * String building, sorting and map counting, roughly the mix of work in
+ * tokenizing and indexing, on deterministic input
+ */
+function runReferenceWorkload(): number {
+  let state = 1;
+  const words: string[] = [];
+  for (let i = 0; i < 50000; i++) {
+    state = (state * 1103515245 + 12345) % 2147483648;
+    words.push(state.toString(36));
+  }
+  words.sort();
+
+  const prefixes = new Map<string, number>();
+  for (const word of words) {
+    const prefix = word.slice(0, 3);
+    prefixes.set(prefix, (prefixes.get(prefix) ?? 0) + 1);
+  }
+  return prefixes.size;
+}
+
+/**
+ * Runs the pipeline benchmark
+ * @returns Latency summaries keyed by stage and manual size, plus REFERENCE_STAGE
+ */
+export function runPipelineBenchmark(options: BenchmarkOptions = {}): MetricsSnapshot {
+  const { pageCounts = BENCHMARK_PAGE_COUNTS, iterations = 5 } = options;
+  const results: MetricsSnapshot = {};
+  const metrics = new MetricsRegistry();
+  const chunker = new DocumentChunker({}, metrics);
+
+  for (const pageCount of pageCounts) {
+    const manual = generateManualContent(pageCount);
+    const documentId = `benchmark-${pageCount}`;
+    const source = {
+      id: documentId,
+      filename: `benchmark-${pageCount}-pages.pdf`,
+      extracted_text: manual.map((page) => page.text).join('\n\n'),
+    };
+
+    const runOnce = () => {
+      const chunks = chunker.chunkDocument(documentId, 'benchmark', manual, source.filename);
+      metrics.time(BENCHMARK_STAGES.hashChunks, () => hashChunks(chunks));
+
+      const index = metrics.time(
+        BENCHMARK_STAGES.indexBuild,
+        () => new ManualIndex([source], documentId, PASSAGE_LENGTH),
+      );
+
+      for (const terms of BENCHMARK_QUERIES) {
+        const hits = metrics.time(BENCHMARK_STAGES.indexSearch, () => index.search(terms));
+
+        metrics.time(BENCHMARK_STAGES.packPrompt, () =>
+          packPrompt({
+            systemPrompt: 'You are a maintenance assistant.',
+            context: {
+              manualExcerpts: hits.slice(0, 5).map(({ item, score }) => ({
+                documentId: item.documentId,
+                filename: item.filename,
+                excerpt: index.getText(item),
+                relevanceScore: score,
+              })),
+              chatHistory: [],
+              relevanceScore: 0,
+            },
+            conversation: [],
+            userMessage: terms.join(' '),
+            formatContext: (context) => ContextService.formatContextForAI(context),
+            scoreContext: (context) =>
+              ContextService.calculateRelevanceScore(context.manualExcerpts, context.chatHistory),
+          }),
+        );
+      }
+    };
+
+    // The first run pays for JIT compilation and is left out of the results
+    runOnce();
+    metrics.reset();
+    for (let i = 0; i < iterations; i++) {
+      runOnce();
+    }
+
+    Object.entries(metrics.snapshot()).forEach(([stage, summary]) => {
+      results[benchmarkKey(stage, pageCount)] = summary;
+    });
+  }
+
+  runReferenceWorkload();
+  metrics.reset();
+  for (let i = 0; i < REFERENCE_ITERATIONS; i++) {
+    metrics.time(REFERENCE_STAGE, runReferenceWorkload);
+  }
+  results[REFERENCE_STAGE] = metrics.snapshot()[REFERENCE_STAGE];
+
+  return results;
+}
@@ -0,0 +1,218 @@
+/**
+ * Synthetic manuals shared by the chunking performance tests and the pipeline benchmarks
+ */
+
+import { PDFContent } from '../types/chunking';
+
+/**
+ * Generates realistic manufacturing manual content, one entry per page
+ */
+export function generateManualContent(pageCount: number): PDFContent[] {
+  const sections = [
+    'Safety Instructions',
+    'Installation Guide',
+    'Operation Manual',
+    'Maintenance Schedule',
+    'Troubleshooting Guide',
+    'Parts Catalog',
+    'Technical Specifications',
+    'Warranty Information',
+  ];
+
+  return Array.from({ length: pageCount }, (_, pageIndex) => {
+    const sectionIndex = Math.floor((pageIndex / pageCount) * sections.length);
+    const sectionName = sections[sectionIndex];
+
+    let content = `# ${sectionName} - Page ${pageIndex + 1}\n\n`;
+
+    // Add varied content based on section type
+    switch (sectionIndex) {
+      case 0: // Safety
+        content += `
+WARNING: High voltage present. Risk of electric shock.
+CAUTION: Moving parts. Keep hands clear during operation.
+NOTICE: Read all instructions before operating equipment.
+
+Safety Guidelines:
+• Always disconnect power before servicing
+• Use proper lockout/tagout procedures
+• Wear appropriate PPE including safety glasses
+• Ensure adequate ventilation in work area
+• Never bypass safety interlocks
+• Keep work area clean and well-lit
+
+Emergency Procedures:
+1. Press emergency stop button
+2. Disconnect main power breaker
+3. Call maintenance supervisor
+4. Document incident in log book
+        `;
+        break;
+
+      case 1: // Installation
+        content += `
+Installation Step ${pageIndex}:
+
+Required Tools:
+- Torque wrench (50-200 ft-lbs)
+- Digital multimeter
+- Level (48" minimum)
+- Socket set (metric and standard)
+
+Specifications:
+| Component | Torque | Wire Size | Clearance |
+|-----------|--------|-----------|-----------|
+| Base bolts| 125 ft-lbs | N/A | 24" min |
+| Power lugs| 50 ft-lbs | 2 AWG | 36" min |
+| Ground | 35 ft-lbs | 6 AWG | N/A |
+
+Procedure:
+1. Position equipment on foundation
+2. Check level in both directions
+3. Secure with anchor bolts
+4. Connect power cables L1, L2, L3
+5. Connect ground wire to ground bus
+6. Verify phase rotation
+        `;
+        break;
+
+      case 2: // Operation
+        content += `
+Operating Parameters for Unit ${pageIndex}:
+
+Normal Operating Ranges:
+- Temperature: 160-180°F (71-82°C)
+- Pressure: 120-140 PSI (827-965 kPa)
+- Flow rate: 50-75 GPM (189-284 LPM)
+- Motor speed: 1750-1800 RPM
+- Vibration: <0.2 in/sec (5 mm/sec)
+
+Control Sequence:
+\`\`\`
+START_SEQUENCE:
+CHECK_INTERLOCKS()
+IF ALL_SAFE THEN
+  START_LUBE_PUMP()
+  WAIT 30_SECONDS
+  START_MAIN_MOTOR()
+  RAMP_TO_SPEED(1800_RPM, 60_SECONDS)
+  ENABLE_AUTO_CONTROL()
+ELSE
+  DISPLAY_FAULT()
+END_IF
+\`\`\`
+
+Monitoring Points:
+• Bearing temperature sensors (RTD1-RTD4)
+• Vibration sensors (VIB1-VIB2)
+• Pressure transmitters (PT1-PT3)
+• Flow meters (FT1-FT2)
+        `;
+        break;
+
+      case 3: // Maintenance
+        content += `
+Maintenance Schedule - Month ${pageIndex + 1}:
+
+Daily Tasks:
+□ Check oil level in sight glass
+□ Record operating temperatures
+□ Inspect for unusual noise/vibration
+□ Verify safety guards in place
+□ Clean control panel screens
+
+Weekly Tasks:
+□ Lubricate bearings (2 pumps grease)
+□ Check belt tension (1/2" deflection)
+□ Test emergency stop function
+□ Clean or replace air filters
+□ Inspect hydraulic hoses
+
+Monthly Tasks:
+□ Change oil filter (P/N: OF-${1000 + pageIndex})
+□ Calibrate pressure sensors
+□ Megger test motors (>1 MΩ)
+□ Tighten electrical connections
+□ Update maintenance log
+
+Parts Required:
+- Oil filter: OF-${1000 + pageIndex}
+- Air filter: AF-${2000 + pageIndex}
+- Hydraulic fluid: HF-46 (5 gallons)
+- Grease: NLGI #2 (1 lb)
+        `;
+        break;
+
+      case 4: // Troubleshooting
+        content += `
+Troubleshooting Guide - Issue ${pageIndex}:
+
+Problem: Equipment fails to start
+Error Code: E${100 + pageIndex}
+
+Possible Causes and Solutions:
+1. No control power
+ → Check control transformer fuses F1-F3
+ → Verify 120VAC at terminals 1-2
+ 
+2. Safety interlock open
+ → Check door switches DS1-DS4
+ → Verify e-stop pulled out
+ → Test safety relay K1
+ 
+3. Low oil pressure
+ → Check oil level (add if needed)
+ → Test pressure switch PS1 (setpoint: 10 PSI)
+ → Inspect oil pump coupling
+ 
+4. Motor overload tripped
+ → Check overload settings (FLA: 125A)
+ → Measure motor current all phases
+ → Check for phase imbalance (<5%)
+
+Reference Diagrams:
+- See Figure ${pageIndex}.1 for control schematic
+- See Figure ${pageIndex}.2 for safety circuit
+- Refer to Section 3.${pageIndex} for normal operation
+        `;
+        break;
+
+      default: // Parts, Specs, Warranty
+        content += `
+Technical Information - Document ${pageIndex}:
+
+Part Numbers:
+${Array.from(
+{ length: 10 },
+(_, i) =>
+  `- ${['Motor', 'Pump', 'Valve', 'Sensor', 'Filter'][i % 5]}: PN-${pageIndex * 1000 + i}`,
+).join('\n')}
+
+Specifications:
+${Array.from(
+{ length: 8 },
+(_, i) =>
+  `- Parameter ${i + 1}: ${Math.floor(Math.random() * 100) + 50} ± ${Math.floor(Math.random() * 10) + 1} units`,
+).join('\n')}
+
+Cross References:
+- Supersedes: OLD-${pageIndex * 100}
+- Compatible with: Series ${Math.floor(pageIndex / 10) * 100}
+- See also: Manual section ${((pageIndex + 5) % 8) + 1}
+
+Notes:
+This information is proprietary and confidential.
+Refer to engineering drawings for detailed dimensions.
+Contact technical support for clarification.
+        `;
+    }
+
+    // Add some repeated content to make it more realistic
+    content += '\n\n' + content.substring(0, 200);
+
+    return {
+      text: content,
+      pageNumber: pageIndex + 1,
+    };
+  });
+}
@@ -369,5 +369,19 @@ describe('DocumentChunker', () => {
 
       expect(chunks.length).toBeGreaterThan(1);
     });
+
+    it('should advance past special content that starts at a paragraph break', () => {
+      const pdfContent: PDFContent[] = [
+        {
+          text: '# Section 0 - Page 1\n\nOperating Parameters:\n\nNormal Operating Ranges:\n- Temperature: 160-180°F\n- Pressure: 120-140 PSI\n\nProblem: Equipment fails to start.',
+          pageNumber: 1,
+        },
+      ];
+
+      const chunks = chunker.chunkDocument('test-doc', 'test-tenant', pdfContent);
+
+      expect(chunks.length).toBeGreaterThan(0);
+      chunks.forEach((chunk) => expect(chunk.content.length).toBeGreaterThan(0));
+    });
   });
 });
@@ -0,0 +1,123 @@
+/**
+ * Tests for per-document chunking indexes
+ */
+
+import { DocumentIndex } from '../document-index';
+import { findParagraphBoundaries, findSentenceBoundaries } from '../algorithm';
+import { PDFContent } from '../../types/chunking';
+
+describe('DocumentIndex', () => {
+  const sampleTexts = [
+    '# Title\n\nIntro text. More text!\n\n## Section 1.1\n\nDetails here? Yes.\n\n\n### Deep\nTail',
+    '#  \n\n  Tricky header across blank lines\n# Another\ntext without end',
+    'No headers at all. Just sentences... and more!!! Done',
+    '\n\n \t\n# Leading whitespace\r\nWindows line\r\n\r\nNext paragraph.',
+    '##\n# \n#  x\n\n\n\n',
+  ];
+
+  function lastHeaderByScan(text: string, limit: number): string | undefined {
+    const matches = text.substring(0, limit).match(/^#{1,6}\s+(.+)$/gm);
+    return matches && matches.length > 0 ? matches[matches.length - 1] : undefined;
+  }
+
+  describe('findLastHeader', () => {
+    it('should match a regex scan of every prefix', () => {
+      sampleTexts.forEach((text) => {
+        const index = new DocumentIndex(text);
+
+        for (let limit = 0; limit <= text.length + 1; limit++) {
+          expect(index.findLastHeader(limit)).toBe(lastHeaderByScan(text, limit));
+        }
+      });
+    });
+
+    it('should return undefined when the text has no headers', () => {
+      const index = new DocumentIndex('Plain text only.\n\nAnother paragraph.');
+
+      expect(index.findLastHeader(100)).toBeUndefined();
+    });
+  });
+
+  describe('findLastParagraphBoundary', () => {
+    it('should match findParagraphBoundaries over every window', () => {
+      sampleTexts.forEach((text) => {
+        const index = new DocumentIndex(text);
+
+        for (let start = 0; start < text.length; start++) {
+          for (let max = start + 1; max <= text.length; max++) {
+            const boundaries = findParagraphBoundaries(text.substring(start, max));
+            const expected =
+              boundaries.length > 0 ? start + boundaries[boundaries.length - 1] : -1;
+
+            expect(index.findLastParagraphBoundary(start, max)).toBe(expected);
+          }
+        }
+      });
+    });
+  });
+
+  describe('findLastSentenceBoundary', () => {
+    it('should match findSentenceBoundaries over every window', () => {
+      sampleTexts.forEach((text) => {
+        const index = new DocumentIndex(text);
+
+        for (let start = 0; start < text.length; start++) {
+          for (let max = start + 1; max <= text.length; max++) {
+            const boundaries = findSentenceBoundaries(text.substring(start, max));
+            const expected =
+              boundaries.length > 0 ? start + boundaries[boundaries.length - 1] : -1;
+
+            expect(index.findLastSentenceBoundary(start, max)).toBe(expected);
+          }
+        }
+      });
+    });
+  });
+
+  describe('findContentTerminator', () => {
+    it('should match a search from each start position', () => {
+      const text = '| a | b |\n| 1 | 2 |\n\nAfter table\n\n• item\n\n```\ncode\n```\n\nEnd';
+      const index = new DocumentIndex(text);
+
+      for (let start = 0; start <= text.length; start++) {
+        const tableEnd = text.substring(start).search(/\n\n(?![|\-\+\s])/);
+        const codeEnd = text.substring(start).search(/```\s*$/m);
+        const listEnd = text.substring(start).search(/\n\n(?![•\-\*\+\d\.\s])/);
+
+        expect(index.findContentTerminator('table', start)).toBe(
+          tableEnd === -1 ? -1 : start + tableEnd,
+        );
+        expect(index.findContentTerminator('code', start)).toBe(
+          codeEnd === -1 ? -1 : start + codeEnd,
+        );
+        expect(index.findContentTerminator('list', start)).toBe(
+          listEnd === -1 ? -1 : start + listEnd,
+        );
+      }
+    });
+  });
+
+  describe('findPageSpan', () => {
+    const pages: PDFContent[] = [
+      { text: 'First page', pageNumber: 1 },
+      { text: '', pageNumber: 2 },
+      { text: 'Third page text', pageNumber: 3 },
+    ];
+
+    it('should resolve offsets against the joined page text', () => {
+      const index = new DocumentIndex('', pages);
+
+      // Page 1 covers [0, 12), page 2 covers [12, 14), page 3 covers [14, 31)
+      expect(index.findPageSpan(0, 5)).toEqual({ startPage: 1, endPage: 1 });
+      expect(index.findPageSpan(5, 12)).toEqual({ startPage: 1, endPage: 1 });
+      expect(index.findPageSpan(12, 13)).toEqual({ startPage: 2, endPage: 2 });
+      expect(index.findPageSpan(3, 20)).toEqual({ startPage: 1, endPage: 3 });
+    });
+
+    it('should default to page 1 for offsets past the end of the document', () => {
+      const index = new DocumentIndex('', pages);
+
+      expect(index.findPageSpan(40, 50)).toEqual({ startPage: 1, endPage: 1 });
+    });
+  });
+});
@@ -5,6 +5,7 @@
 import { ChunkingMonitor, ChunkingHealthStatus } from '../monitoring';
 import { recordChunkingMetrics, getChunkingFailureRate } from '../withFeatureFlag';
 import { isFeatureEnabled } from '../../featureFlags';
+import { MetricsRegistry } from '../../metrics';
 
 // Mock feature flags
 jest.mock('../../featureFlags', () => ({
@@ -164,6 +165,36 @@ describe('Rollback Procedures', () => {
       expect(status.recommendations.some((r) => r.includes('Consider optimizing'))).toBe(true);
     });
 
+    it('should recommend rollback when a stage exceeds its p95 budget', () => {
+      const metrics = new MetricsRegistry();
+      const budgeted = new ChunkingMonitor(
+        { maxStageP95Ms: { 'vector.searchSimilar': 500 }, minStageSamples: 10 },
+        metrics,
+      );
+      for (let i = 0; i < 20; i++) {
+        metrics.record('vector.searchSimilar', i < 15 ? 50 : 2000);
+      }
+
+      const status = budgeted.getHealthStatus();
+
+      expect(status.shouldRollback).toBe(true);
+      expect(status.stageLatency['vector.searchSimilar'].p95).toBeGreaterThan(500);
+      expect(status.recommendations.some((r) => r.includes('p95 latency of vector.searchSimilar'))).toBe(
+        true,
+      );
+    });
+
+    it('should not enforce stage budgets before enough samples', () => {
+      const metrics = new MetricsRegistry();
+      const budgeted = new ChunkingMonitor(
+        { maxStageP95Ms: { 'vector.searchSimilar': 500 }, minStageSamples: 10 },
+        metrics,
+      );
+      metrics.record('vector.searchSimilar', 2000);
+
+      expect(budgeted.getHealthStatus().shouldRollback).toBe(false);
+    });
+
     it('should warn on empty chunk documents', () => {
       // Record documents that produced no chunks
       for (let i = 0; i < 3; i++) {
@@ -0,0 +1,195 @@
+/**
+ * Tests for streaming chunking
+ */
+
+import { StreamingDocumentChunker, PageQueue } from '../streaming';
+import { DocumentChunker } from '../algorithm';
+import { ChunkingService } from '../withFeatureFlag';
+import { isFeatureEnabled } from '../../featureFlags';
+import { DocumentChunk, PDFContent } from '../../types/chunking';
+
+jest.mock('../../featureFlags', () => ({
+  isFeatureEnabled: jest.fn(),
+}));
+
+describe('StreamingDocumentChunker', () => {
+  const createPages = (pageCount: number): PDFContent[] =>
+    Array.from({ length: pageCount }, (_, i) => ({
+      text:
+        `# Section ${i + 1}\n\n` +
+        'The pump must be primed before startup. Check the seals weekly!\n\n'.repeat(15),
+      pageNumber: i + 1,
+    }));
+
+  const collect = async (chunks: AsyncIterable<DocumentChunk>): Promise<DocumentChunk[]> => {
+    const result: DocumentChunk[] = [];
+    for await (const chunk of chunks) {
+      result.push(chunk);
+    }
+    return result;
+  };
+
+  it('should produce the same chunks as the batch chunker for regular pages', async () => {
+    const pages = createPages(10);
+
+    const batchChunks = new DocumentChunker().chunkDocument('doc', 'tenant', pages);
+    const streamedChunks = await collect(
+      new StreamingDocumentChunker().chunkPages('doc', 'tenant', pages),
+    );
+
+    // The batch chunker stops after merging its first undersized tail, so the last chunk may differ
+    expect(streamedChunks.length).toBe(batchChunks.length);
+    expect(streamedChunks.slice(0, -1).map((chunk) => chunk.content)).toEqual(
+      batchChunks.slice(0, -1).map((chunk) => chunk.content),
+    );
+    expect(streamedChunks.map((chunk) => chunk.metadata.sectionHeader)).toEqual(
+      batchChunks.map((chunk) => chunk.metadata.sectionHeader),
+    );
+  });
+
+  it('should locate pages from the preprocessed page text', async () => {
+    const chunks = await collect(
+      new StreamingDocumentChunker().chunkPages('doc', 'tenant', createPages(10)),
+    );
+
+    // Every page starts with its own section header, so a chunk ends on the page of its section
+    chunks.forEach((chunk) => {
+      expect(`Section ${chunk.metadata.endPage}`).toBe(chunk.metadata.sectionHeader);
+      expect(chunk.metadata.startPage).toBeLessThanOrEqual(chunk.metadata.endPage);
+    });
+  });
+
+  it('should emit chunks before the last page arrives', async () => {
+    const queue = new PageQueue();
+    const chunker = new StreamingDocumentChunker();
+    const received: DocumentChunk[] = [];
+
+    const consumer = (async () => {
+      for await (const chunk of chunker.chunkPages('doc', 'tenant', queue)) {
+        received.push(chunk);
+      }
+    })();
+
+    createPages(5).forEach((page) => queue.push(page));
+    await new Promise((resolve) => setTimeout(resolve, 0));
+    const receivedBeforeEnd = received.length;
+
+    queue.push(createPages(6)[5]);
+    queue.close();
+    await consumer;
+
+    expect(receivedBeforeEnd).toBeGreaterThan(0);
+    expect(received.length).toBeGreaterThan(receivedBeforeEnd);
+  });
+
+  it('should link every chunk to its neighbours', async () => {
+    const chunks = await collect(
+      new StreamingDocumentChunker().chunkPages('doc', 'tenant', createPages(4)),
+    );
+
+    expect(chunks.length).toBeGreaterThan(2);
+    chunks.forEach((chunk, i) => {
+      expect(chunk.id).toBe(`doc_chunk_${i}`);
+      expect(chunk.relationships.previousChunkId).toBe(i > 0 ? chunks[i - 1].id : undefined);
+      expect(chunk.relationships.nextChunkId).toBe(
+        i < chunks.length - 1 ? chunks[i + 1].id : undefined,
+      );
+    });
+  });
+
+  it('should carry section headers and hierarchy across pages', async () => {
+    const pages: PDFContent[] = [
+      {
+        text: '# Maintenance\n\n' + 'Introduction to routine maintenance tasks. '.repeat(20),
+        pageNumber: 1,
+      },
+      {
+        text: '## Lubrication\n\n' + 'Apply grease to every fitting on the chain. '.repeat(40),
+        pageNumber: 2,
+      },
+      { text: 'Wipe away any excess grease after lubrication. '.repeat(40), pageNumber: 3 },
+    ];
+
+    const chunks = await collect(
+      new StreamingDocumentChunker({ chunkSize: 300, overlap: 50, minChunkSize: 20 }).chunkPages(
+        'doc',
+        'tenant',
+        pages,
+      ),
+    );
+
+    const lastChunk = chunks[chunks.length - 1];
+    expect(lastChunk.metadata.startPage).toBe(3);
+    expect(lastChunk.metadata.sectionHeader).toBe('Lubrication');
+    expect(lastChunk.relationships.hierarchyLevel).toBe(2);
+
+    const parent = chunks.find((chunk) => chunk.id === lastChunk.relationships.parentChunkId);
+    expect(parent?.metadata.sectionHeader).toBe('Maintenance');
+  });
+
+  it('should pass document details to the metadata enhancer', async () => {
+    const chunks = await collect(
+      new StreamingDocumentChunker().chunkPages('doc', 'tenant', createPages(2), {
+        documentTitle: 'Pump Manual',
+        documentAuthor: 'Acme',
+        pageCount: 2,
+      }),
+    );
+
+    expect(chunks[0].metadata.documentTitle).toBe('Pump Manual');
+    expect(chunks[0].metadata.documentAuthor).toBe('Acme');
+  });
+
+  it('should handle empty and whitespace-only streams', async () => {
+    const chunker = new StreamingDocumentChunker();
+
+    expect(await collect(chunker.chunkPages('doc', 'tenant', []))).toEqual([]);
+    expect(
+      await collect(chunker.chunkPages('doc', 'tenant', [{ text: '  \n\n\t', pageNumber: 1 }])),
+    ).toEqual([]);
+  });
+});
+
+describe('PageQueue', () => {
+  it('should reject pushes after closing', () => {
+    const queue = new PageQueue();
+    queue.close();
+
+    expect(() => queue.push({ text: 'late', pageNumber: 1 })).toThrow();
+  });
+
+  it('should surface producer failures to the consumer', async () => {
+    const queue = new PageQueue();
+    queue.push({ text: 'First page.', pageNumber: 1 });
+    queue.fail(new Error('extraction failed'));
+
+    const chunks = new StreamingDocumentChunker().chunkPages('doc', 'tenant', queue);
+    await expect(chunks.next()).rejects.toThrow('extraction failed');
+  });
+});
+
+describe('ChunkingService.streamDocument', () => {
+  const mockIsFeatureEnabled = isFeatureEnabled as jest.MockedFunction<typeof isFeatureEnabled>;
+
+  it('should throw when chunking is disabled', async () => {
+    mockIsFeatureEnabled.mockReturnValue(false);
+
+    const stream = new ChunkingService().streamDocument('doc', 'tenant', []);
+    await expect(stream.next()).rejects.toThrow('Document chunking is currently disabled');
+  });
+
+  it('should stream chunks when chunking is enabled', async () => {
+    mockIsFeatureEnabled.mockReturnValue(true);
+    jest.spyOn(console, 'log').mockImplementation();
+
+    const chunks: DocumentChunk[] = [];
+    for await (const chunk of new ChunkingService().streamDocument('doc', 'tenant', [
+      { text: 'A short page of text.', pageNumber: 1 },
+    ])) {
+      chunks.push(chunk);
+    }
+
+    expect(chunks.length).toBe(1);
+    expect(chunks[0].content).toBe('A short page of text.');
+  });
+});
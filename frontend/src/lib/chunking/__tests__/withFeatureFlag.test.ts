@@ -10,7 +10,8 @@ import {
   getRecentChunkingMetrics,
 } from '../withFeatureFlag';
 import { isFeatureEnabled } from '../../featureFlags';
-import { PDFContent } from '../../types/chunking';
+import { ChunkingWorkerPool } from '../worker-pool';
+import { DocumentChunk, PDFContent } from '../../types/chunking';
 
 // Mock the feature flags module
 jest.mock('../../featureFlags', () => ({
@@ -84,6 +85,30 @@ describe('ChunkingService', () => {
       ).rejects.toThrow('Document chunking is currently disabled');
     });
 
+    it('should chunk on the worker pool when one is given', async () => {
+      mockIsFeatureEnabled.mockReturnValue(true);
+      const workerPool = {
+        chunkDocument: jest.fn().mockResolvedValue([{ id: 'worker-chunk', content: 'From worker' }]),
+      };
+
+      const service = new ChunkingService(undefined, {
+        workerPool: workerPool as unknown as ChunkingWorkerPool,
+      });
+      const pdfContent = createTestPDFContent(2);
+
+      const chunks = await service.chunkDocument('doc123', 'tenant123', pdfContent, 'Test Document');
+
+      expect(chunks.map((chunk) => chunk.id)).toEqual(['worker-chunk']);
+      expect(workerPool.chunkDocument).toHaveBeenCalledWith(
+        'doc123',
+        'tenant123',
+        pdfContent,
+        'Test Document',
+        undefined,
+        expect.objectContaining({ chunkSize: 1000 }),
+      );
+    });
+
     it('should log performance warning for slow processing', async () => {
       mockIsFeatureEnabled.mockReturnValue(true);
       const consoleWarnSpy = jest.spyOn(console, 'warn').mockImplementation();
@@ -112,6 +137,37 @@ describe('ChunkingService', () => {
     });
   });
 
+  describe('streamDocument', () => {
+    it('should stream chunks from the worker pool when one is given', async () => {
+      mockIsFeatureEnabled.mockReturnValue(true);
+      const workerPool = {
+        streamDocument: jest.fn(async function* () {
+          yield { id: 'worker-chunk-1' } as DocumentChunk;
+          yield { id: 'worker-chunk-2' } as DocumentChunk;
+        }),
+      };
+
+      const service = new ChunkingService({ chunkSize: 800 }, {
+        workerPool: workerPool as unknown as ChunkingWorkerPool,
+      });
+      const pages = createTestPDFContent(3);
+
+      const ids: string[] = [];
+      for await (const chunk of service.streamDocument('doc123', 'tenant123', pages, 'Manual')) {
+        ids.push(chunk.id);
+      }
+
+      expect(ids).toEqual(['worker-chunk-1', 'worker-chunk-2']);
+      expect(workerPool.streamDocument).toHaveBeenCalledWith(
+        'doc123',
+        'tenant123',
+        pages,
+        { documentTitle: 'Manual', documentAuthor: undefined, pageCount: undefined },
+        expect.objectContaining({ chunkSize: 800 }),
+      );
+    });
+  });
+
   describe('isEnabled', () => {
     it('should return true when feature flag is enabled', () => {
       mockIsFeatureEnabled.mockReturnValue(true);
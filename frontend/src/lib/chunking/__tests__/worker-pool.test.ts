@@ -0,0 +1,105 @@
+/**
+ * @jest-environment node
+ */
+
+/**
+ * Tests for the chunking worker pool
+ */
+
+import { execFileSync } from 'child_process';
+import { join } from 'path';
+import { ChunkingWorkerPool } from '../worker-pool';
+import { StreamingDocumentChunker } from '../streaming';
+import { DocumentChunk, PDFContent } from '../../types/chunking';
+
+describe('ChunkingWorkerPool', () => {
+  let pool: ChunkingWorkerPool;
+
+  // Workers run the compiled worker, as they do in production
+  beforeAll(() => {
+    execFileSync(process.execPath, [
+      require.resolve('typescript/bin/tsc'),
+      '-p',
+      join(__dirname, '..', '..', '..', '..', 'tsconfig.worker.json'),
+    ]);
+  }, 120000);
+
+  const createPages = (pageCount: number, title: string): PDFContent[] =>
+    Array.from({ length: pageCount }, (_, i) => ({
+      text: `# ${title} ${i + 1}\n\n` + 'Inspect the belt tension every shift.\n\n'.repeat(20),
+      pageNumber: i + 1,
+    }));
+
+  beforeEach(() => {
+    pool = new ChunkingWorkerPool({}, { size: 2, batchSize: 5 });
+  });
+
+  afterEach(async () => {
+    await pool.destroy();
+  });
+
+  it('should chunk several documents in parallel', async () => {
+    const titles = ['Pump', 'Conveyor', 'Press'];
+
+    const results = await Promise.all(
+      titles.map((title) => pool.chunkDocument(title, 'tenant', createPages(20, title))),
+    );
+
+    for (let i = 0; i < titles.length; i++) {
+      const expected: DocumentChunk[] = [];
+      for await (const chunk of new StreamingDocumentChunker().chunkPages(
+        titles[i],
+        'tenant',
+        createPages(20, titles[i]),
+      )) {
+        expected.push(chunk);
+      }
+
+      expect(results[i].map((chunk) => chunk.id)).toEqual(expected.map((chunk) => chunk.id));
+      expect(results[i].map((chunk) => chunk.content)).toEqual(
+        expected.map((chunk) => chunk.content),
+      );
+    }
+  }, 60000);
+
+  it('should replace a worker when the consumer stops early', async () => {
+    let received = 0;
+    for await (const chunk of pool.streamDocument('doc', 'tenant', createPages(50, 'Manual'))) {
+      expect(chunk.tenantId).toBe('tenant');
+      if (++received === 3) {
+        break;
+      }
+    }
+
+    const chunks = await pool.chunkDocument('next', 'tenant', createPages(3, 'Manual'));
+    expect(chunks.length).toBeGreaterThan(0);
+  }, 60000);
+
+  it('should report chunking errors and keep serving documents', async () => {
+    const invalidPages = [{ text: null, pageNumber: 1 }] as unknown as PDFContent[];
+
+    await expect(pool.chunkDocument('bad', 'tenant', invalidPages)).rejects.toThrow(
+      'Chunking failed for document bad',
+    );
+
+    const chunks = await pool.chunkDocument('good', 'tenant', createPages(2, 'Manual'));
+    expect(chunks.length).toBeGreaterThan(0);
+  }, 60000);
+
+  it('should report a worker that has not been built', async () => {
+    const unbuilt = new ChunkingWorkerPool({}, { workerScript: join(__dirname, 'missing.js') });
+
+    await expect(unbuilt.chunkDocument('doc', 'tenant', createPages(1, 'Manual'))).rejects.toThrow(
+      'npm run build:workers',
+    );
+    await unbuilt.destroy();
+  });
+
+  it('should reject documents after being destroyed', async () => {
+    await pool.destroy();
+
+    await expect(pool.chunkDocument('doc', 'tenant', createPages(1, 'Manual'))).rejects.toThrow(
+      'destroyed',
+    );
+  });
+});
@@ -19,6 +19,8 @@ import {
 } from './content-handlers';
 import { preprocessText, cleanForEmbedding, validateTextQuality } from './preprocessing';
 import { MetadataEnhancer } from './metadata-enhancer';
+import { DocumentIndex } from './document-index';
+import { MetricsRegistry, monotonicNow, pipelineMetrics } from '../metrics';
 
 /**
  * Simple token counting utility
@@ -77,34 +79,51 @@ export function findParagraphBoundaries(text: string): number[] {
 
 /**
  * Finds the best boundary within a range to split text
+ *
+ * When a DocumentIndex built over `text` is supplied, paragraph and sentence
+ * boundaries are looked up instead of re-scanning the range.
  */
 export function findBestBoundary(
   text: string,
   startIndex: number,
   maxIndex: number,
   config: ChunkConfig,
+  index?: DocumentIndex,
 ): number {
-  const searchText = text.substring(startIndex, maxIndex);
-
   // Try paragraph boundaries first
   if (config.respectParagraphs) {
-    const paragraphBoundaries = findParagraphBoundaries(searchText);
-    if (paragraphBoundaries.length > 0) {
-      const lastParagraphBoundary = paragraphBoundaries[paragraphBoundaries.length - 1];
-      return startIndex + lastParagraphBoundary;
+    if (index) {
+      const paragraphBoundary = index.findLastParagraphBoundary(startIndex, maxIndex);
+      if (paragraphBoundary !== -1) {
+        return paragraphBoundary;
+      }
+    } else {
+      const paragraphBoundaries = findParagraphBoundaries(text.substring(startIndex, maxIndex));
+      if (paragraphBoundaries.length > 0) {
+        const lastParagraphBoundary = paragraphBoundaries[paragraphBoundaries.length - 1];
+        return startIndex + lastParagraphBoundary;
+      }
     }
   }
 
   // Try sentence boundaries
   if (config.respectSentences) {
-    const sentenceBoundaries = findSentenceBoundaries(searchText);
-    if (sentenceBoundaries.length > 0) {
-      const lastSentenceBoundary = sentenceBoundaries[sentenceBoundaries.length - 1];
-      return startIndex + lastSentenceBoundary;
+    if (index) {
+      const sentenceBoundary = index.findLastSentenceBoundary(startIndex, maxIndex);
+      if (sentenceBoundary !== -1) {
+        return sentenceBoundary;
+      }
+    } else {
+      const sentenceBoundaries = findSentenceBoundaries(text.substring(startIndex, maxIndex));
+      if (sentenceBoundaries.length > 0) {
+        const lastSentenceBoundary = sentenceBoundaries[sentenceBoundaries.length - 1];
+        return startIndex + lastSentenceBoundary;
+      }
     }
   }
 
   // Fall back to word boundaries
+  const searchText = text.substring(startIndex, maxIndex);
   const words = searchText.split(/\s+/);
   let wordPosition = 0;
   for (let i = 0; i < words.length - 1; i++) {
@@ -140,11 +159,15 @@ export function detectContentTypes(text: string) {
 
 /**
  * Extracts section information from text
+ *
+ * When a DocumentIndex built over `allText` is supplied, the preceding header
+ * is looked up instead of re-scanning everything before the chunk.
  */
 export function extractSectionInfo(
   text: string,
   allText: string,
   startIndex: number,
+  index?: DocumentIndex,
 ): {
   sectionHeader?: string;
   subsectionHeader?: string;
@@ -152,33 +175,25 @@ export function extractSectionInfo(
   hierarchyLevel: number;
 } {
   // Look backwards from current position to find section headers
-  const beforeText = allText.substring(0, startIndex + text.length);
-  const headerMatches = beforeText.match(/^#{1,6}\s+(.+)$/gm);
-
-  if (headerMatches && headerMatches.length > 0) {
-    const lastHeader = headerMatches[headerMatches.length - 1];
-    const headerLevel = (lastHeader.match(/^#+/) || [''])[0].length;
-    const headerText = lastHeader.replace(/^#+\s+/, '').trim();
+  let lastHeader: string | undefined;
+  if (index) {
+    lastHeader = index.findLastHeader(startIndex + text.length);
+  } else {
+    const beforeText = allText.substring(0, startIndex + text.length);
+    const headerMatches = beforeText.match(/^#{1,6}\s+(.+)$/gm);
+    if (headerMatches && headerMatches.length > 0) {
+      lastHeader = headerMatches[headerMatches.length - 1];
+    }
+  }
 
-    return {
-      sectionHeader: headerText,
-      hierarchyLevel: headerLevel,
-      tocPath: [headerText],
-    };
+  if (lastHeader !== undefined) {
+    return parseSectionHeader(lastHeader);
   }
 
   // Also check within the current text for headers
   const internalHeaders = text.match(/^#{1,6}\s+(.+)$/gm);
   if (internalHeaders && internalHeaders.length > 0) {
-    const firstHeader = internalHeaders[0];
-    const headerLevel = (firstHeader.match(/^#+/) || [''])[0].length;
-    const headerText = firstHeader.replace(/^#+\s+/, '').trim();
-
-    return {
-      sectionHeader: headerText,
-      hierarchyLevel: headerLevel,
-      tocPath: [headerText],
-    };
+    return parseSectionHeader(internalHeaders[0]);
   }
 
   return {
@@ -186,14 +201,37 @@ export function extractSectionInfo(
   };
 }
 
+/**
+ * Converts a markdown header line into section information
+ */
+export function parseSectionHeader(headerLine: string): {
+  sectionHeader: string;
+  tocPath: string[];
+  hierarchyLevel: number;
+} {
+  const headerLevel = (headerLine.match(/^#+/) || [''])[0].length;
+  const headerText = headerLine.replace(/^#+\s+/, '').trim();
+
+  return {
+    sectionHeader: headerText,
+    hierarchyLevel: headerLevel,
+    tocPath: [headerText],
+  };
+}
+
 /**
  * Main chunking algorithm
  */
 export class DocumentChunker {
   private config: ChunkConfig;
+  private metrics: MetricsRegistry;
 
-  constructor(config: Partial<ChunkConfig> = {}) {
+  /**
+   * @param metrics Registry that receives the chunking stage latencies
+   */
+  constructor(config: Partial<ChunkConfig> = {}, metrics: MetricsRegistry = pipelineMetrics) {
     this.config = { ...DEFAULT_CHUNK_CONFIG, ...config };
+    this.metrics = metrics;
   }
 
   /**
@@ -212,7 +250,7 @@ export class DocumentChunker {
     const metadataEnhancer = new MetadataEnhancer();
 
     // Record extraction start time
-    const extractionStart = Date.now();
+    const extractionStart = monotonicNow();
 
     // Combine all page content
     const rawText = pdfContent
@@ -231,10 +269,10 @@ export class DocumentChunker {
     }
 
     // Record extraction end and preprocessing start
-    const extractionEnd = Date.now();
+    const extractionEnd = monotonicNow();
     metadataEnhancer.setExtractionTimings(extractionStart, extractionEnd);
 
-    const preprocessingStart = Date.now();
+    const preprocessingStart = monotonicNow();
 
     // Preprocess text for optimal chunking and embedding quality
     const preprocessed = preprocessText(rawText, {
@@ -251,11 +289,14 @@ export class DocumentChunker {
 
     const fullText = preprocessed.content;
 
+    // Build boundary, header and page-offset indexes once for the whole document
+    const documentIndex = new DocumentIndex(fullText, pdfContent);
+
     // Record preprocessing end and chunking start
-    const preprocessingEnd = Date.now();
+    const preprocessingEnd = monotonicNow();
     metadataEnhancer.setPreprocessingTimings(preprocessingStart, preprocessingEnd);
 
-    const chunkingStart = Date.now();
+    const chunkingStart = monotonicNow();
 
     let currentIndex = 0;
     let chunkIndex = 0;
@@ -267,7 +308,13 @@ export class DocumentChunker {
       const maxChunkEnd = Math.min(currentIndex + this.config.chunkSize, fullText.length);
 
       // Find the best boundary
-      const chunkEnd = findBestBoundary(fullText, currentIndex, maxChunkEnd, this.config);
+      const chunkEnd = findBestBoundary(
+        fullText,
+        currentIndex,
+        maxChunkEnd,
+        this.config,
+        documentIndex,
+      );
 
       // Extract chunk content
       const rawChunkContent = fullText.substring(currentIndex, chunkEnd).trim();
@@ -286,8 +333,11 @@ export class DocumentChunker {
           currentIndex,
           chunkEnd,
           specialContent,
+          documentIndex,
         );
-        if (adjustedEnd !== chunkEnd) {
+        // An adjusted end at the current position would emit an empty chunk and
+        // never advance, so fall back to the regular boundary in that case
+        if (adjustedEnd !== chunkEnd && adjustedEnd > currentIndex) {
           // Use adjusted boundary
           const adjustedContent = fullText.substring(currentIndex, adjustedEnd).trim();
           const specialChunk = this.createChunkWithSpecialContent(
@@ -295,7 +345,7 @@ export class DocumentChunker {
             documentId,
             tenantId,
             chunkIndex,
-            pdfContent,
+            documentIndex,
             documentTitle,
             documentAuthor,
             fullText,
@@ -315,7 +365,8 @@ export class DocumentChunker {
       }
 
       // Skip if chunk is too small
-      if (countTokens(chunkContent).count < this.config.minChunkSize && chunkIndex > 0) {
+      const baseTokens = countTokens(chunkContent);
+      if (baseTokens.count < this.config.minChunkSize && chunkIndex > 0) {
         // Add to previous chunk instead
         if (chunks.length > 0) {
           chunks[chunks.length - 1].content += '\n' + chunkContent;
@@ -324,15 +375,14 @@ export class DocumentChunker {
       }
 
       // Find which pages this chunk spans
-      const { startPage, endPage } = this.findPageSpan(pdfContent, currentIndex, chunkEnd);
+      const { startPage, endPage } = documentIndex.findPageSpan(currentIndex, chunkEnd);
 
       // Extract section information
-      const sectionInfo = extractSectionInfo(chunkContent, fullText, currentIndex);
+      const sectionInfo = extractSectionInfo(chunkContent, fullText, currentIndex, documentIndex);
 
-      // Re-analyze special content for metadata
-      const contentAnalysis = analyzeSpecialContent(chunkContent, 1);
+      // Reuse the special content analysis from the boundary check
+      const contentAnalysis = specialContent;
       const contentWeight = calculateSpecialContentWeight(contentAnalysis);
-      const baseTokens = countTokens(chunkContent);
 
       // Validate text quality
       const qualityValidation = validateTextQuality(rawChunkContent, chunkContent);
@@ -409,7 +459,7 @@ export class DocumentChunker {
     this.establishHierarchicalRelationships(chunks);
 
     // Record chunking end time
-    const chunkingEnd = Date.now();
+    const chunkingEnd = monotonicNow();
     metadataEnhancer.setChunkingTimings(chunkingStart, chunkingEnd);
 
     // Enhance chunks with comprehensive metadata
@@ -417,43 +467,11 @@ export class DocumentChunker {
       documentTitle,
       documentAuthor,
     });
+    metadataEnhancer.recordStageLatencies('chunking', this.metrics);
 
     return enhancedChunks;
   }
 
-  /**
-   * Finds which pages a chunk spans
-   */
-  private findPageSpan(
-    pdfContent: PDFContent[],
-    startIndex: number,
-    endIndex: number,
-  ): {
-    startPage: number;
-    endPage: number;
-  } {
-    let currentIndex = 0;
-    let startPage = 1;
-    let endPage = 1;
-
-    for (const page of pdfContent) {
-      const pageEndIndex = currentIndex + page.text.length + 2; // +2 for \n\n
-
-      if (currentIndex <= startIndex && startIndex < pageEndIndex) {
-        startPage = page.pageNumber;
-      }
-
-      if (currentIndex <= endIndex && endIndex <= pageEndIndex) {
-        endPage = page.pageNumber;
-        break;
-      }
-
-      currentIndex = pageEndIndex;
-    }
-
-    return { startPage, endPage };
-  }
-
   /**
    * Determines position within page
    */
@@ -475,19 +493,27 @@ export class DocumentChunker {
    * Establishes parent-child relationships between chunks
    */
   private establishHierarchicalRelationships(chunks: DocumentChunk[]): void {
-    for (let i = 0; i < chunks.length; i++) {
-      const currentChunk = chunks[i];
+    // Stack of candidate parents with strictly increasing hierarchy levels
+    const ancestors: DocumentChunk[] = [];
+
+    for (const currentChunk of chunks) {
       const currentLevel = currentChunk.relationships.hierarchyLevel;
 
       // Find parent (previous chunk with lower hierarchy level)
-      for (let j = i - 1; j >= 0; j--) {
-        const potentialParent = chunks[j];
-        if (potentialParent.relationships.hierarchyLevel < currentLevel) {
-          currentChunk.relationships.parentChunkId = potentialParent.id;
-          potentialParent.relationships.childChunkIds.push(currentChunk.id);
-          break;
-        }
+      while (
+        ancestors.length > 0 &&
+        ancestors[ancestors.length - 1].relationships.hierarchyLevel >= currentLevel
+      ) {
+        ancestors.pop();
+      }
+
+      if (ancestors.length > 0) {
+        const parent = ancestors[ancestors.length - 1];
+        currentChunk.relationships.parentChunkId = parent.id;
+        parent.relationships.childChunkIds.push(currentChunk.id);
       }
+
+      ancestors.push(currentChunk);
     }
   }
 
@@ -499,18 +525,19 @@ export class DocumentChunker {
     startIndex: number,
     originalEnd: number,
     specialContent: any,
+    index?: DocumentIndex,
   ): number {
     // If we have tables, try to include the entire table
     if (specialContent.tables.length > 0) {
       // Find the end of the last table
       const lastTable = specialContent.tables[specialContent.tables.length - 1];
-      const tableEnd = this.findContentEnd(fullText, startIndex, 'table');
+      const tableEnd = this.findContentEnd(fullText, startIndex, 'table', index);
       return Math.min(tableEnd, fullText.length);
     }
 
     // If we have code blocks, include the entire block
     if (specialContent.codeBlocks.length > 0) {
-      const codeEnd = this.findContentEnd(fullText, startIndex, 'code');
+      const codeEnd = this.findContentEnd(fullText, startIndex, 'code', index);
       return Math.min(codeEnd, fullText.length);
     }
 
@@ -518,7 +545,7 @@ export class DocumentChunker {
     if (specialContent.lists.length > 0) {
       const totalItems = specialContent.lists.reduce((sum, list) => sum + list.items.length, 0);
       if (totalItems <= 10) {
-        const listEnd = this.findContentEnd(fullText, startIndex, 'list');
+        const listEnd = this.findContentEnd(fullText, startIndex, 'list', index);
         return Math.min(listEnd, fullText.length);
       }
     }
@@ -529,7 +556,20 @@ export class DocumentChunker {
   /**
    * Finds the end of special content
    */
-  private findContentEnd(fullText: string, startIndex: number, contentType: string): number {
+  private findContentEnd(
+    fullText: string,
+    startIndex: number,
+    contentType: string,
+    index?: DocumentIndex,
+  ): number {
+    if (index && (contentType === 'table' || contentType === 'code' || contentType === 'list')) {
+      const terminator = index.findContentTerminator(contentType, startIndex);
+      if (terminator === -1) {
+        return fullText.length;
+      }
+      return contentType === 'code' ? terminator + 3 : terminator;
+    }
+
     const searchText = fullText.substring(startIndex);
 
     switch (contentType) {
@@ -561,7 +601,7 @@ export class DocumentChunker {
     documentId: string,
     tenantId: string,
     chunkIndex: number,
-    pdfContent: PDFContent[],
+    documentIndex: DocumentIndex,
     documentTitle?: string,
     documentAuthor?: string,
     fullText?: string,
@@ -576,14 +616,18 @@ export class DocumentChunker {
     const weight = calculateSpecialContentWeight(specialContent);
 
     // Find page span
-    const { startPage, endPage } = this.findPageSpan(
-      pdfContent,
+    const { startPage, endPage } = documentIndex.findPageSpan(
       startIndex || 0,
       endIndex || content.length,
     );
 
     // Extract section information
-    const sectionInfo = extractSectionInfo(content, fullText || content, startIndex || 0);
+    const sectionInfo = extractSectionInfo(
+      content,
+      fullText || content,
+      startIndex || 0,
+      fullText ? documentIndex : undefined,
+    );
 
     // Validate text quality
     const qualityValidation = validateTextQuality(content, content);
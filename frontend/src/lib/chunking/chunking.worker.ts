@@ -0,0 +1,99 @@
+/**
+ * Worker thread entry point for ChunkingWorkerPool
+ *
+ * Pages are pulled from the main thread one at a time and chunks are sent
+ * back in batches, each acknowledged before chunking continues, so neither
+ * side buffers more than one page and one batch.
+ */
+
+import { parentPort } from 'worker_threads';
+import { StreamingDocumentChunker } from './streaming';
+import { DocumentChunk, PDFContent } from '../types/chunking';
+import type { WorkerRequest, WorkerResponse } from './worker-pool';
+
+if (!parentPort) {
+  throw new Error('chunking.worker must be started as a worker thread');
+}
+
+const port = parentPort;
+const inbox: WorkerRequest[] = [];
+let waiting: ((message: WorkerRequest) => void) | null = null;
+
+port.on('message', (message: WorkerRequest) => {
+  if (waiting) {
+    const resolve = waiting;
+    waiting = null;
+    resolve(message);
+  } else {
+    inbox.push(message);
+  }
+});
+
+function send(message: WorkerResponse): void {
+  port.postMessage(message);
+}
+
+function nextMessage(): Promise<WorkerRequest> {
+  const message = inbox.shift();
+  if (message) {
+    return Promise.resolve(message);
+  }
+  return new Promise((resolve) => {
+    waiting = resolve;
+  });
+}
+
+async function* requestPages(): AsyncGenerator<PDFContent> {
+  while (true) {
+    send({ type: 'next' });
+    const message = await nextMessage();
+    if (message.type !== 'page') {
+      return;
+    }
+    yield message.page;
+  }
+}
+
+async function sendBatch(chunks: DocumentChunk[]): Promise<void> {
+  send({ type: 'chunks', chunks });
+  const message = await nextMessage();
+  if (message.type !== 'ack') {
+    throw new Error(`Unexpected ${message.type} message while waiting for acknowledgement`);
+  }
+}
+
+async function run(): Promise<void> {
+  while (true) {
+    const message = await nextMessage();
+    if (message.type !== 'start') {
+      continue;
+    }
+
+    try {
+      const chunker = new StreamingDocumentChunker(message.config);
+      let batch: DocumentChunk[] = [];
+
+      for await (const chunk of chunker.chunkPages(
+        message.documentId,
+        message.tenantId,
+        requestPages(),
+        message.options,
+      )) {
+        batch.push(chunk);
+        if (batch.length >= message.batchSize) {
+          await sendBatch(batch);
+          batch = [];
+        }
+      }
+
+      if (batch.length > 0) {
+        await sendBatch(batch);
+      }
+      send({ type: 'done' });
+    } catch (error) {
+      send({ type: 'error', message: error instanceof Error ? error.message : String(error) });
+    }
+  }
+}
+
+run();
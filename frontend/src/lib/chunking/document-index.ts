@@ -0,0 +1,276 @@
+/**
+ * Per-document boundary indexes for linear-time chunking
+ *
+ * The chunker repeatedly asks the same questions about the preprocessed text:
+ * "what is the last header before this offset", "where is the last paragraph
+ * or sentence break inside this window", "which page does this offset fall
+ * on". Answering them by re-scanning the text makes chunking quadratic in
+ * document length, so the answers are indexed once per document and looked
+ * up with binary search. Every lookup reproduces the result of the original
+ * regex scan over the corresponding substring exactly.
+ */
+
+import { PDFContent } from '../types/chunking';
+
+const HEADER_PATTERN = /^#{1,6}\s+(.+)$/gm;
+const PARAGRAPH_PATTERN = /\n\s*\n/g;
+const SENTENCE_PATTERN = /[.!?]+/g;
+const LINE_TERMINATOR_PATTERN = /[\n\r\u2028\u2029]/g;
+
+const CONTENT_END_PATTERNS = {
+  table: /\n\n(?![|\-\+\s])/g,
+  code: /```\s*$/gm,
+  list: /\n\n(?![•\-\*\+\d\.\s])/g,
+} as const;
+
+export type IndexedContentType = keyof typeof CONTENT_END_PATTERNS;
+
+/**
+ * Returns the first index whose value is >= target
+ */
+export function lowerBound(values: number[], target: number): number {
+  let low = 0;
+  let high = values.length;
+
+  while (low < high) {
+    const mid = (low + high) >>> 1;
+    if (values[mid] < target) {
+      low = mid + 1;
+    } else {
+      high = mid;
+    }
+  }
+
+  return low;
+}
+
+/**
+ * Returns the first index whose value is > target
+ */
+export function upperBound(values: number[], target: number): number {
+  let low = 0;
+  let high = values.length;
+
+  while (low < high) {
+    const mid = (low + high) >>> 1;
+    if (values[mid] <= target) {
+      low = mid + 1;
+    } else {
+      high = mid;
+    }
+  }
+
+  return low;
+}
+
+/**
+ * Runs a global regex over the whole text and returns the start (or end) of every match
+ */
+function collectMatchPositions(
+  text: string,
+  pattern: RegExp,
+  edge: 'start' | 'end' = 'start',
+): number[] {
+  const regex = new RegExp(pattern.source, pattern.flags);
+  const positions: number[] = [];
+  let match;
+
+  while ((match = regex.exec(text)) !== null) {
+    positions.push(edge === 'start' ? match.index : match.index + match[0].length);
+  }
+
+  return positions;
+}
+
+/**
+ * Precomputed header, paragraph, sentence and page-offset indexes for one document
+ */
+export class DocumentIndex {
+  readonly text: string;
+
+  private headerEnds: number[] = [];
+  private headerTexts: string[] = [];
+  private lineTerminators: number[];
+  private newlines: number[] = [];
+  private paragraphRunStarts: number[];
+  private paragraphRunEnds: number[];
+  private sentenceEnds: number[];
+  private pageNumbers: number[];
+  private pageEnds: number[];
+  private contentEnds: Partial<Record<IndexedContentType, number[]>> = {};
+
+  constructor(text: string, pdfContent: PDFContent[] = []) {
+    this.text = text;
+
+    const headerRegex = new RegExp(HEADER_PATTERN.source, HEADER_PATTERN.flags);
+    let header;
+    while ((header = headerRegex.exec(text)) !== null) {
+      this.headerEnds.push(header.index + header[0].length);
+      this.headerTexts.push(header[0]);
+    }
+
+    this.lineTerminators = collectMatchPositions(text, LINE_TERMINATOR_PATTERN);
+    for (const position of this.lineTerminators) {
+      if (text.charCodeAt(position) === 10) {
+        this.newlines.push(position);
+      }
+    }
+
+    // Each match covers one whitespace run with at least two newlines,
+    // from its first newline to its last
+    this.paragraphRunStarts = collectMatchPositions(text, PARAGRAPH_PATTERN);
+    this.paragraphRunEnds = collectMatchPositions(text, PARAGRAPH_PATTERN, 'end');
+
+    this.sentenceEnds = collectMatchPositions(text, SENTENCE_PATTERN, 'end');
+
+    // Page offsets mirror the `\n\n` join used when the pages were combined
+    this.pageNumbers = pdfContent.map((page) => page.pageNumber);
+    this.pageEnds = [];
+    let offset = 0;
+    for (const page of pdfContent) {
+      offset += page.text.length + 2;
+      this.pageEnds.push(offset);
+    }
+  }
+
+  /**
+   * Finds the last markdown header line in `text.substring(0, limit)`
+   *
+   * Equivalent to taking the last element of
+   * `text.substring(0, limit).match(/^#{1,6}\s+(.+)$/gm)`.
+   */
+  findLastHeader(limit: number): string | undefined {
+    const end = Math.min(Math.max(limit, 0), this.text.length);
+
+    // Headers that end inside the prefix match identically in the prefix
+    const fullMatches = upperBound(this.headerEnds, end);
+    let lastHeader = fullMatches > 0 ? this.headerTexts[fullMatches - 1] : undefined;
+    const scanFrom = fullMatches > 0 ? this.headerEnds[fullMatches - 1] : 0;
+
+    // A header that is cut by the prefix end can only start on a line made up
+    // of '#' characters and whitespace leading up to the final line
+    let windowStart = scanFrom;
+    const lastTerminatorIndex = lowerBound(this.lineTerminators, end) - 1;
+    if (lastTerminatorIndex >= 0 && this.lineTerminators[lastTerminatorIndex] >= scanFrom) {
+      let runStart = this.lineTerminators[lastTerminatorIndex];
+      while (runStart > scanFrom && /\s/.test(this.text[runStart - 1])) {
+        runStart--;
+      }
+      windowStart = Math.max(scanFrom, runStart - 6);
+    }
+
+    const lineStarts: number[] = windowStart === 0 ? [0] : [];
+    for (
+      let i = lowerBound(this.lineTerminators, windowStart - 1);
+      i <= lastTerminatorIndex;
+      i++
+    ) {
+      lineStarts.push(this.lineTerminators[i] + 1);
+    }
+
+    if (lineStarts.length === 0) {
+      return lastHeader;
+    }
+
+    const prefix = this.text.substring(0, end);
+    const sticky = new RegExp(HEADER_PATTERN.source, 'my');
+    let position = scanFrom;
+    for (const lineStart of lineStarts) {
+      if (lineStart < position) continue;
+
+      sticky.lastIndex = lineStart;
+      const match = sticky.exec(prefix);
+      if (match) {
+        lastHeader = match[0];
+        position = lineStart + match[0].length;
+      }
+    }
+
+    return lastHeader;
+  }
+
+  /**
+   * Finds the end of the last paragraph break inside [start, max)
+   *
+   * Equivalent to the last result of `findParagraphBoundaries` over
+   * `text.substring(start, max)`, offset by `start`. Returns -1 if none.
+   */
+  findLastParagraphBoundary(start: number, max: number): number {
+    for (
+      let run = lowerBound(this.paragraphRunStarts, max) - 1;
+      run >= 0 && this.paragraphRunEnds[run] > start;
+      run--
+    ) {
+      const firstNewline = lowerBound(this.newlines, Math.max(start, this.paragraphRunStarts[run]));
+      const afterLastNewline = lowerBound(this.newlines, Math.min(max, this.paragraphRunEnds[run]));
+
+      if (afterLastNewline - firstNewline >= 2) {
+        return this.newlines[afterLastNewline - 1] + 1;
+      }
+    }
+
+    return -1;
+  }
+
+  /**
+   * Finds the last sentence boundary inside [start, max)
+   *
+   * Equivalent to the last result of `findSentenceBoundaries` over
+   * `text.substring(start, max)`, offset by `start`. Returns -1 if none.
+   */
+  findLastSentenceBoundary(start: number, max: number): number {
+    const index = lowerBound(this.sentenceEnds, max) - 1;
+    if (index >= 0 && this.sentenceEnds[index] > start) {
+      return this.sentenceEnds[index];
+    }
+
+    return -1;
+  }
+
+  /**
+   * Finds the first special-content terminator at or after `start`
+   *
+   * Equivalent to `text.substring(start).search(pattern)` offset by `start`.
+   * Returns -1 if none. Positions are indexed lazily per content type.
+   */
+  findContentTerminator(contentType: IndexedContentType, start: number): number {
+    let positions = this.contentEnds[contentType];
+    if (!positions) {
+      positions = collectMatchPositions(this.text, CONTENT_END_PATTERNS[contentType]);
+      this.contentEnds[contentType] = positions;
+    }
+
+    const index = lowerBound(positions, start);
+    return index < positions.length ? positions[index] : -1;
+  }
+
+  /**
+   * Finds which pages the range [startIndex, endIndex] spans
+   *
+   * Offsets are measured against the raw page text joined with `\n\n`,
+   * matching the linear page walk the chunker used previously.
+   */
+  findPageSpan(startIndex: number, endIndex: number): { startPage: number; endPage: number } {
+    const pageCount = this.pageEnds.length;
+
+    let endPageIndex = -1;
+    if (endIndex >= 0) {
+      const candidate = lowerBound(this.pageEnds, endIndex);
+      if (candidate < pageCount) {
+        endPageIndex = candidate;
+      }
+    }
+
+    let startPage = 1;
+    if (startIndex >= 0) {
+      const candidate = upperBound(this.pageEnds, startIndex);
+      if (candidate < pageCount && (endPageIndex === -1 || candidate <= endPageIndex)) {
+        startPage = this.pageNumbers[candidate];
+      }
+    }
+
+    const endPage = endPageIndex === -1 ? 1 : this.pageNumbers[endPageIndex];
+
+    return { startPage, endPage };
+  }
+}
@@ -3,7 +3,7 @@
  */
 
 import { DocumentChunk, ChunkMetadata, PDFContent } from '../types/chunking';
-import { extractSectionInfo } from './algorithm';
+import { MetricsRegistry, monotonicNow, pipelineMetrics } from '../metrics';
 
 export interface EnhancedChunkMetadata extends ChunkMetadata {
   /** Document-level context */
@@ -99,6 +99,18 @@ export interface CrossReference {
   context?: string;
 }
 
+/**
+ * Lookup tables over one chunk set, built once per enhancement pass
+ */
+interface SectionIndex {
+  /** First chunk for each id, mirroring `allChunks.find((c) => c.id === id)` */
+  chunksById: Map<string, DocumentChunk>;
+  /** Number of chunks sharing a parent and hierarchy level */
+  groupSizes: Map<string, number>;
+  /** 1-based position of each chunk id within its parent/level group */
+  positions: Map<string, number>;
+}
+
 export interface ProcessingTimings {
   startTime: number;
   extractionStart?: number;
@@ -117,10 +129,12 @@ export interface ProcessingTimings {
  */
 export class MetadataEnhancer {
   private processingTimings: ProcessingTimings;
+  private streamingContext?: EnhancedChunkMetadata['documentContext'];
+  private streamingIndex?: SectionIndex;
 
   constructor() {
     this.processingTimings = {
-      startTime: Date.now(),
+      startTime: monotonicNow(),
     };
   }
 
@@ -132,16 +146,14 @@ export class MetadataEnhancer {
     pdfContent: PDFContent[],
     documentInfo?: Partial<EnhancedChunkMetadata['documentContext']>,
   ): DocumentChunk[] {
-    this.processingTimings.enhancementStart = Date.now();
+    this.processingTimings.enhancementStart = monotonicNow();
 
-    const enhancedChunks = chunks.map((chunk, index) => {
-      const enhancedMetadata = this.enhanceChunkMetadata(
-        chunk,
-        chunks,
-        pdfContent,
-        documentInfo,
-        index,
-      );
+    // Document context and section lookups are shared by every chunk
+    const documentContext = this.buildDocumentContext(pdfContent, documentInfo);
+    const sectionIndex = this.buildSectionIndex(chunks);
+
+    const enhancedChunks = chunks.map((chunk) => {
+      const enhancedMetadata = this.enhanceChunkMetadata(chunk, documentContext, sectionIndex);
 
       return {
         ...chunk,
@@ -149,29 +161,59 @@ export class MetadataEnhancer {
       };
     });
 
-    this.processingTimings.enhancementEnd = Date.now();
-    this.processingTimings.endTime = Date.now();
+    this.processingTimings.enhancementEnd = monotonicNow();
+    this.processingTimings.endTime = monotonicNow();
 
     return enhancedChunks;
   }
 
+  /**
+   * Enhances the next chunk of a document that is still being streamed
+   *
+   * Chunks must arrive in document order. Section lookups only cover chunks
+   * enhanced so far, so `siblingCount` counts earlier siblings only. The
+   * document type and manufacturer details come from `leadingPages` on the
+   * first call; `documentInfo` is applied to every chunk.
+   */
+  enhanceStreamedChunk(
+    chunk: DocumentChunk,
+    leadingPages: PDFContent[],
+    documentInfo?: Partial<EnhancedChunkMetadata['documentContext']>,
+  ): DocumentChunk {
+    if (!this.streamingContext || !this.streamingIndex) {
+      this.processingTimings.enhancementStart = monotonicNow();
+      this.streamingContext = this.buildDocumentContext(leadingPages);
+      this.streamingIndex = this.buildSectionIndex([]);
+    }
+
+    this.addToSectionIndex(this.streamingIndex, chunk);
+    const metadata = this.enhanceChunkMetadata(
+      chunk,
+      { ...this.streamingContext, ...documentInfo },
+      this.streamingIndex,
+    );
+
+    this.processingTimings.enhancementEnd = monotonicNow();
+    this.processingTimings.endTime = this.processingTimings.enhancementEnd;
+
+    return {
+      ...chunk,
+      metadata,
+    };
+  }
+
   /**
    * Enhances individual chunk metadata
    */
   private enhanceChunkMetadata(
     chunk: DocumentChunk,
-    allChunks: DocumentChunk[],
-    pdfContent: PDFContent[],
-    documentInfo?: Partial<EnhancedChunkMetadata['documentContext']>,
-    chunkIndex?: number,
+    documentContext: EnhancedChunkMetadata['documentContext'],
+    sectionIndex: SectionIndex,
   ): EnhancedChunkMetadata {
     const baseMetadata = chunk.metadata;
 
-    // Build document context
-    const documentContext = this.buildDocumentContext(pdfContent, documentInfo);
-
     // Build section context
-    const sectionContext = this.buildSectionContext(chunk, allChunks, chunkIndex || 0);
+    const sectionContext = this.buildSectionContext(chunk, sectionIndex);
 
     // Calculate processing statistics
     const processingStats = this.calculateProcessingStats();
@@ -187,7 +229,7 @@ export class MetadataEnhancer {
 
     return {
       ...baseMetadata,
-      documentContext,
+      documentContext: { ...documentContext },
       sectionContext,
       processingStats,
       contentStats,
@@ -222,33 +264,67 @@ export class MetadataEnhancer {
     };
   }
 
+  /**
+   * Builds id and sibling lookups so each chunk's section context is O(depth)
+   */
+  private buildSectionIndex(allChunks: DocumentChunk[]): SectionIndex {
+    const sectionIndex: SectionIndex = {
+      chunksById: new Map<string, DocumentChunk>(),
+      groupSizes: new Map<string, number>(),
+      positions: new Map<string, number>(),
+    };
+
+    for (const chunk of allChunks) {
+      this.addToSectionIndex(sectionIndex, chunk);
+    }
+
+    return sectionIndex;
+  }
+
+  private addToSectionIndex(sectionIndex: SectionIndex, chunk: DocumentChunk): void {
+    const { chunksById, groupSizes, positions } = sectionIndex;
+
+    if (!chunksById.has(chunk.id)) {
+      chunksById.set(chunk.id, chunk);
+    }
+
+    const groupKey = this.getSiblingGroupKey(chunk);
+    const groupSize = (groupSizes.get(groupKey) || 0) + 1;
+    groupSizes.set(groupKey, groupSize);
+
+    const positionKey = `${groupKey}|${chunk.id}`;
+    if (!positions.has(positionKey)) {
+      positions.set(positionKey, groupSize);
+    }
+  }
+
+  private getSiblingGroupKey(chunk: DocumentChunk): string {
+    const { hierarchyLevel, parentChunkId } = chunk.relationships;
+    return JSON.stringify([hierarchyLevel, parentChunkId]);
+  }
+
   /**
    * Builds section hierarchy context
    */
   private buildSectionContext(
     chunk: DocumentChunk,
-    allChunks: DocumentChunk[],
-    chunkIndex: number,
+    sectionIndex: SectionIndex,
   ): EnhancedChunkMetadata['sectionContext'] {
     const metadata = chunk.metadata;
     const relationships = chunk.relationships;
 
     // Build full section path
-    const fullPath = this.buildSectionPath(chunk, allChunks);
+    const fullPath = this.buildSectionPath(chunk, sectionIndex);
 
     // Find parent sections
-    const parentSections = this.findParentSections(chunk, allChunks);
+    const parentSections = this.findParentSections(chunk, sectionIndex);
 
     // Count siblings at same level
-    const siblingCount =
-      allChunks.filter(
-        (c) =>
-          c.relationships.hierarchyLevel === relationships.hierarchyLevel &&
-          c.relationships.parentChunkId === relationships.parentChunkId,
-      ).length - 1;
+    const groupKey = this.getSiblingGroupKey(chunk);
+    const siblingCount = (sectionIndex.groupSizes.get(groupKey) || 0) - 1;
 
     // Determine position within section
-    const positionInSection = this.calculatePositionInSection(chunk, allChunks);
+    const positionInSection = sectionIndex.positions.get(`${groupKey}|${chunk.id}`) || 0;
 
     // Detect section type
     const sectionType = this.detectSectionType(metadata.sectionHeader || chunk.content);
@@ -268,7 +344,7 @@ export class MetadataEnhancer {
    * Calculates processing statistics
    */
   private calculateProcessingStats(): EnhancedChunkMetadata['processingStats'] {
-    const now = Date.now();
+    const now = monotonicNow();
     const timings = this.processingTimings;
 
     return {
@@ -417,7 +493,7 @@ export class MetadataEnhancer {
     return { manufacturerName, equipmentModel, manualVersion };
   }
 
-  private buildSectionPath(chunk: DocumentChunk, allChunks: DocumentChunk[]): string[] {
+  private buildSectionPath(chunk: DocumentChunk, sectionIndex: SectionIndex): string[] {
     const path: string[] = [];
     let current: DocumentChunk | undefined = chunk;
 
@@ -427,7 +503,7 @@ export class MetadataEnhancer {
       }
 
       if (current.relationships.parentChunkId) {
-        current = allChunks.find((c) => c.id === current!.relationships.parentChunkId);
+        current = sectionIndex.chunksById.get(current.relationships.parentChunkId);
       } else {
         break;
       }
@@ -436,12 +512,12 @@ export class MetadataEnhancer {
     return path;
   }
 
-  private findParentSections(chunk: DocumentChunk, allChunks: DocumentChunk[]): string[] {
+  private findParentSections(chunk: DocumentChunk, sectionIndex: SectionIndex): string[] {
     const parents: string[] = [];
     let current = chunk;
 
     while (current.relationships.parentChunkId) {
-      const parent = allChunks.find((c) => c.id === current.relationships.parentChunkId);
+      const parent = sectionIndex.chunksById.get(current.relationships.parentChunkId);
       if (parent?.metadata.sectionHeader) {
         parents.unshift(parent.metadata.sectionHeader);
       }
@@ -452,16 +528,6 @@ export class MetadataEnhancer {
     return parents;
   }
 
-  private calculatePositionInSection(chunk: DocumentChunk, allChunks: DocumentChunk[]): number {
-    const siblings = allChunks.filter(
-      (c) =>
-        c.relationships.parentChunkId === chunk.relationships.parentChunkId &&
-        c.relationships.hierarchyLevel === chunk.relationships.hierarchyLevel,
-    );
-
-    return siblings.findIndex((c) => c.id === chunk.id) + 1;
-  }
-
   private detectSectionType(text: string): EnhancedChunkMetadata['sectionContext']['sectionType'] {
     const lowerText = text.toLowerCase();
 
@@ -867,4 +933,24 @@ export class MetadataEnhancer {
     this.processingTimings.chunkingStart = start;
     this.processingTimings.chunkingEnd = end;
   }
+
+  /**
+   * Records the duration of each completed stage as `${prefix}.${stage}`
+   */
+  recordStageLatencies(prefix = 'chunking', registry: MetricsRegistry = pipelineMetrics): void {
+    const timings = this.processingTimings;
+    const stages: [string, number | undefined, number | undefined][] = [
+      ['extraction', timings.extractionStart, timings.extractionEnd],
+      ['preprocessing', timings.preprocessingStart, timings.preprocessingEnd],
+      ['chunking', timings.chunkingStart, timings.chunkingEnd],
+      ['enhancement', timings.enhancementStart, timings.enhancementEnd],
+      ['total', timings.startTime, timings.endTime],
+    ];
+
+    for (const [stage, start, end] of stages) {
+      if (start !== undefined && end !== undefined) {
+        registry.record(`${prefix}.${stage}`, end - start);
+      }
+    }
+  }
 }
@@ -9,6 +9,7 @@ import {
   recordChunkingMetrics,
 } from './withFeatureFlag';
 import { isFeatureEnabled } from '../featureFlags';
+import { MetricsRegistry, MetricsSnapshot, PIPELINE_STAGES, pipelineMetrics } from '../metrics';
 
 export interface ChunkingHealthStatus {
   healthy: boolean;
@@ -16,6 +17,8 @@ export interface ChunkingHealthStatus {
   recentFailures: number;
   recentTimeouts: number;
   averageProcessingTime: number;
+  /** Latency percentiles per pipeline stage */
+  stageLatency: MetricsSnapshot;
   recommendations: string[];
   shouldRollback: boolean;
 }
@@ -26,6 +29,10 @@ export interface RollbackThresholds {
   maxTimeoutsPerHour: number;
   maxProcessingTimeMs: number;
   minChunksPerDocument: number;
+  /** p95 latency budget per pipeline stage; exceeding one recommends rollback */
+  maxStageP95Ms: Record<string, number>;
+  /** Samples a stage needs before its budget is enforced */
+  minStageSamples: number;
 }
 
 const DEFAULT_THRESHOLDS: RollbackThresholds = {
@@ -34,6 +41,10 @@ const DEFAULT_THRESHOLDS: RollbackThresholds = {
   maxTimeoutsPerHour: 5,
   maxProcessingTimeMs: 300000, // 5 minutes for 500 pages
   minChunksPerDocument: 1,
+  maxStageP95Ms: {
+    [PIPELINE_STAGES.chunkingTotal]: 300000,
+  },
+  minStageSamples: 20,
 };
 
 /**
@@ -43,9 +54,14 @@ export class ChunkingMonitor {
   private thresholds: RollbackThresholds;
   private monitoringInterval: NodeJS.Timeout | null = null;
   private alertCallbacks: ((status: ChunkingHealthStatus) => void)[] = [];
+  private metrics: MetricsRegistry;
 
-  constructor(thresholds: Partial<RollbackThresholds> = {}) {
+  constructor(
+    thresholds: Partial<RollbackThresholds> = {},
+    metrics: MetricsRegistry = pipelineMetrics,
+  ) {
     this.thresholds = { ...DEFAULT_THRESHOLDS, ...thresholds };
+    this.metrics = metrics;
   }
 
   /**
@@ -121,6 +137,18 @@ export class ChunkingMonitor {
       recommendations.push('Consider optimizing chunking algorithm or increasing resources');
     }
 
+    // Check stage latency percentiles against their budgets
+    const stageLatency = this.metrics.snapshot();
+    Object.entries(this.thresholds.maxStageP95Ms).forEach(([stage, budget]) => {
+      const latency = stageLatency[stage];
+      if (latency && latency.count >= this.thresholds.minStageSamples && latency.p95 > budget) {
+        recommendations.push(
+          `p95 latency of ${stage} (${latency.p95.toFixed(0)}ms) exceeds budget (${budget}ms)`,
+        );
+        shouldRollback = true;
+      }
+    });
+
     // Check if chunking is producing valid output
     const emptyChunkDocuments = recentMetrics.filter(
       (m) => m.success && (m.chunkCount === 0 || m.chunkCount === undefined),
@@ -145,6 +173,7 @@ export class ChunkingMonitor {
       recentFailures,
       recentTimeouts,
       averageProcessingTime,
+      stageLatency,
       recommendations,
       shouldRollback,
     };
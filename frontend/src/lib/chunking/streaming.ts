@@ -0,0 +1,543 @@
+/**
+ * Streaming chunking: consumes pages as they arrive and emits chunks incrementally
+ */
+
+import {
+  ChunkConfig,
+  ChunkMetadata,
+  ChunkRelationships,
+  DocumentChunk,
+  PDFContent,
+  DEFAULT_CHUNK_CONFIG,
+} from '../types/chunking';
+import {
+  analyzeSpecialContent,
+  shouldKeepTogether,
+  calculateSpecialContentWeight,
+  SpecialContentContext,
+} from './content-handlers';
+import { preprocessText, cleanForEmbedding, validateTextQuality } from './preprocessing';
+import { MetadataEnhancer } from './metadata-enhancer';
+import { DocumentIndex, lowerBound, upperBound } from './document-index';
+import { countTokens, detectContentTypes, findBestBoundary, parseSectionHeader } from './algorithm';
+import { monotonicNow } from '../metrics';
+
+/** Pages used to detect document type and manufacturer details */
+const DOCUMENT_CONTEXT_PAGES = 3;
+
+/** Default cap on text buffered while waiting for the end of a table, list or code block */
+const DEFAULT_MAX_LOOKAHEAD = 20000;
+
+export type PageSource = AsyncIterable<PDFContent> | Iterable<PDFContent>;
+
+export interface StreamingChunkOptions {
+  documentTitle?: string;
+  documentAuthor?: string;
+  /** Total page count, if known; otherwise pages received so far are reported */
+  pageCount?: number;
+  /** Maximum characters buffered ahead of the current chunk for special content */
+  maxLookahead?: number;
+}
+
+/**
+ * Mutable state carried across page boundaries for one streamed document
+ */
+interface StreamState {
+  documentId: string;
+  tenantId: string;
+  options: StreamingChunkOptions;
+  /** Preprocessed text that has not been fully consumed yet */
+  window: string;
+  /** Absolute offset of window[0] in the preprocessed document */
+  windowStart: number;
+  index: DocumentIndex;
+  /** Absolute offset where the next chunk starts */
+  currentIndex: number;
+  chunkIndex: number;
+  /** Last header line seen in text that has already been dropped from the window */
+  carriedHeader?: string;
+  hasText: boolean;
+  pageNumbers: number[];
+  pageStarts: number[];
+  pageEnds: number[];
+  leadingPages: PDFContent[];
+  pagesReceived: number;
+  /** Candidate parents with strictly increasing hierarchy levels */
+  ancestors: DocumentChunk[];
+  /** Last chunk created; held back until its successor is known */
+  pending: DocumentChunk | null;
+  done: boolean;
+  enhancer: MetadataEnhancer;
+}
+
+/**
+ * Chunks a document page by page with bounded memory
+ *
+ * Only the unconsumed tail of the text (plus the configured overlap) is kept
+ * between pages, so memory does not grow with document length. Overlap and
+ * the current section header carry across page boundaries.
+ *
+ * Differences from DocumentChunker, which sees the whole document at once:
+ * - pages are preprocessed individually before being joined
+ * - page numbers and `pagePosition` are measured on the preprocessed pages
+ * - `siblingCount` only counts earlier siblings, and `childChunkIds` only
+ *   lists children found while the parent was still being held back
+ * - a trailing undersized chunk is merged into its predecessor without
+ *   ending the document
+ */
+export class StreamingDocumentChunker {
+  private config: ChunkConfig;
+
+  constructor(config: Partial<ChunkConfig> = {}) {
+    this.config = { ...DEFAULT_CHUNK_CONFIG, ...config };
+  }
+
+  /**
+   * Chunks pages as they arrive, yielding chunks in document order
+   */
+  async *chunkPages(
+    documentId: string,
+    tenantId: string,
+    pages: PageSource,
+    options: StreamingChunkOptions = {},
+  ): AsyncGenerator<DocumentChunk> {
+    const state: StreamState = {
+      documentId,
+      tenantId,
+      options,
+      window: '',
+      windowStart: 0,
+      index: new DocumentIndex(''),
+      currentIndex: 0,
+      chunkIndex: 0,
+      hasText: false,
+      pageNumbers: [],
+      pageStarts: [],
+      pageEnds: [],
+      leadingPages: [],
+      pagesReceived: 0,
+      ancestors: [],
+      pending: null,
+      done: false,
+      enhancer: new MetadataEnhancer(),
+    };
+
+    const chunkingStart = monotonicNow();
+
+    for await (const page of pages) {
+      this.appendPage(state, page);
+      yield* this.drain(state);
+    }
+
+    state.done = true;
+    yield* this.drain(state);
+
+    state.enhancer.setChunkingTimings(chunkingStart, monotonicNow());
+    if (state.pending) {
+      yield this.enhance(state, state.pending);
+      state.pending = null;
+    }
+
+    // Stage times include time spent waiting on pages and consumers, so
+    // they are kept apart from the batch chunker's
+    state.enhancer.recordStageLatencies('chunking.stream');
+  }
+
+  /**
+   * Preprocesses a page and appends it to the window
+   */
+  private appendPage(state: StreamState, page: PDFContent): void {
+    state.pagesReceived++;
+    if (state.leadingPages.length < DOCUMENT_CONTEXT_PAGES) {
+      state.leadingPages.push(page);
+    }
+
+    const text = page.text.trim()
+      ? preprocessText(page.text.trim(), {
+          normalizeWhitespace: true,
+          removeExtraLineBreaks: true,
+          normalizeUnicode: true,
+          fixEncodingIssues: true,
+          preserveStructure: true,
+          removeNonPrintable: true,
+          normalizeQuotes: true,
+          normalizeDashes: true,
+          preserveSpecialContent: true,
+        }).content
+      : '';
+
+    if (text) {
+      if (state.hasText) {
+        // As in DocumentChunker, the page separator belongs to the preceding page
+        state.window += '\n\n';
+        state.pageEnds[state.pageEnds.length - 1] += 2;
+      }
+      state.hasText = true;
+    }
+
+    const pageStart = state.windowStart + state.window.length;
+    state.window += text;
+
+    state.pageNumbers.push(page.pageNumber);
+    state.pageStarts.push(pageStart);
+    state.pageEnds.push(state.windowStart + state.window.length);
+    state.index = new DocumentIndex(state.window);
+  }
+
+  /**
+   * Emits every chunk that can be cut from the buffered text
+   */
+  private *drain(state: StreamState): Generator<DocumentChunk> {
+    const config = this.config;
+
+    // Wait for enough pages to describe the document before emitting anything
+    if (!state.done && state.pagesReceived < DOCUMENT_CONTEXT_PAGES) {
+      return;
+    }
+
+    while (true) {
+      const start = state.currentIndex - state.windowStart;
+      const remaining = state.window.length - start;
+
+      if (remaining <= 0 || !/\S/.test(state.window.substring(start))) {
+        break;
+      }
+
+      // Without a full chunk of lookahead the boundary may still move
+      if (!state.done && remaining <= config.chunkSize) {
+        break;
+      }
+
+      const maxChunkEnd = Math.min(start + config.chunkSize, state.window.length);
+      const chunkEnd = findBestBoundary(state.window, start, maxChunkEnd, config, state.index);
+
+      const rawChunkContent = state.window.substring(start, chunkEnd).trim();
+      const chunkContent = cleanForEmbedding(rawChunkContent);
+      const specialContent = analyzeSpecialContent(chunkContent, 1);
+
+      if (shouldKeepTogether(chunkContent, specialContent)) {
+        const adjustedEnd = this.findSpecialContentEnd(state, start, chunkEnd, specialContent);
+        if (adjustedEnd === null) {
+          // The table, list or code block continues past the buffered text
+          break;
+        }
+
+        if (adjustedEnd !== chunkEnd && adjustedEnd > start) {
+          const adjustedContent = state.window.substring(start, adjustedEnd).trim();
+          yield* this.emit(
+            state,
+            this.createChunk(state, adjustedContent, adjustedContent, start, adjustedEnd),
+          );
+
+          let nextIndex = adjustedEnd - config.overlap;
+          if (nextIndex <= adjustedEnd - adjustedContent.length) {
+            nextIndex = adjustedEnd;
+          }
+          state.currentIndex = state.windowStart + nextIndex;
+          continue;
+        }
+      }
+
+      // Fold undersized chunks into the chunk that is being held back
+      if (countTokens(chunkContent).count < config.minChunkSize && state.pending) {
+        state.pending.content += '\n' + chunkContent;
+        state.currentIndex = state.windowStart + chunkEnd;
+        continue;
+      }
+
+      yield* this.emit(
+        state,
+        this.createChunk(state, chunkContent, rawChunkContent, start, chunkEnd, specialContent),
+      );
+
+      const nextIndex = chunkEnd - config.overlap;
+      state.currentIndex = state.windowStart + (nextIndex <= start ? chunkEnd : nextIndex);
+    }
+
+    this.releaseConsumedText(state);
+  }
+
+  /**
+   * Mirrors DocumentChunker's special content boundary adjustment
+   *
+   * Returns null when the end of the content is not buffered yet.
+   */
+  private findSpecialContentEnd(
+    state: StreamState,
+    start: number,
+    originalEnd: number,
+    specialContent: SpecialContentContext,
+  ): number | null {
+    let contentType: 'table' | 'code' | 'list';
+    if (specialContent.tables.length > 0) {
+      contentType = 'table';
+    } else if (specialContent.codeBlocks.length > 0) {
+      contentType = 'code';
+    } else if (
+      specialContent.lists.length > 0 &&
+      specialContent.lists.reduce((sum, list) => sum + list.items.length, 0) <= 10
+    ) {
+      contentType = 'list';
+    } else {
+      return originalEnd;
+    }
+
+    const terminator = state.index.findContentTerminator(contentType, start);
+    if (terminator !== -1) {
+      return Math.min(
+        contentType === 'code' ? terminator + 3 : terminator,
+        state.window.length,
+      );
+    }
+
+    const maxLookahead = state.options.maxLookahead ?? DEFAULT_MAX_LOOKAHEAD;
+    if (!state.done && state.window.length - start < maxLookahead) {
+      return null;
+    }
+
+    return state.window.length;
+  }
+
+  /**
+   * Builds a chunk from window offsets
+   */
+  private createChunk(
+    state: StreamState,
+    content: string,
+    rawContent: string,
+    start: number,
+    end: number,
+    specialContent: SpecialContentContext = analyzeSpecialContent(content, 1),
+  ): DocumentChunk {
+    const { documentId, tenantId, chunkIndex } = state;
+    const { documentTitle, documentAuthor } = state.options;
+    const chunkId = `${documentId}_chunk_${chunkIndex}`;
+
+    const absoluteStart = state.windowStart + start;
+    const absoluteEnd = state.windowStart + end;
+    const { startPage, endPage, pagePosition } = this.findPageSpan(
+      state,
+      absoluteStart,
+      absoluteEnd,
+    );
+
+    // Section headers before the window were carried over from earlier pages
+    const precedingHeader = state.index.findLastHeader(start + content.length);
+    const headerLine = precedingHeader ?? state.carriedHeader;
+    const internalHeaders = headerLine ? null : content.match(/^#{1,6}\s+(.+)$/gm);
+    const sectionInfo = headerLine
+      ? parseSectionHeader(headerLine)
+      : internalHeaders && internalHeaders.length > 0
+        ? parseSectionHeader(internalHeaders[0])
+        : { sectionHeader: undefined, tocPath: undefined, hierarchyLevel: 0 };
+
+    const contentWeight = calculateSpecialContentWeight(specialContent);
+    const baseTokens = countTokens(content);
+    const qualityValidation = validateTextQuality(rawContent, content);
+
+    const metadata: ChunkMetadata = {
+      id: chunkId,
+      documentId,
+      chunkIndex,
+      startPage,
+      endPage,
+      sectionHeader: sectionInfo.sectionHeader,
+      documentTitle,
+      documentAuthor,
+      tocPath: sectionInfo.tocPath,
+      pagePosition,
+      contentType: detectContentTypes(content),
+      tokenCount: {
+        ...baseTokens,
+        count: Math.round(baseTokens.count * contentWeight),
+      },
+      specialContent: {
+        tables: specialContent.tables.length,
+        lists: specialContent.lists.length,
+        diagrams: specialContent.diagrams.length,
+        codeBlocks: specialContent.codeBlocks.length,
+        technicalFormats: specialContent.technicalFormats.length,
+        weight: contentWeight,
+      },
+      preprocessing: {
+        originalLength: rawContent.length,
+        normalizedLength: content.length,
+        transformations: [],
+        qualityScore: qualityValidation.qualityScore,
+      },
+    };
+
+    const relationships: ChunkRelationships = {
+      previousChunkId: chunkIndex > 0 ? `${documentId}_chunk_${chunkIndex - 1}` : undefined,
+      nextChunkId: undefined, // Set once the next chunk is created
+      parentChunkId: undefined,
+      childChunkIds: [],
+      hierarchyLevel: sectionInfo.hierarchyLevel,
+    };
+
+    state.chunkIndex++;
+
+    return {
+      id: chunkId,
+      content,
+      metadata,
+      relationships,
+      tenantId,
+      createdAt: new Date(),
+      updatedAt: new Date(),
+    };
+  }
+
+  /**
+   * Links a new chunk into the hierarchy and releases its predecessor
+   */
+  private *emit(state: StreamState, chunk: DocumentChunk): Generator<DocumentChunk> {
+    const level = chunk.relationships.hierarchyLevel;
+    const ancestors = state.ancestors;
+
+    while (
+      ancestors.length > 0 &&
+      ancestors[ancestors.length - 1].relationships.hierarchyLevel >= level
+    ) {
+      ancestors.pop();
+    }
+
+    if (ancestors.length > 0) {
+      const parent = ancestors[ancestors.length - 1];
+      chunk.relationships.parentChunkId = parent.id;
+
+      // Chunks that were already emitted are never mutated
+      if (parent === state.pending) {
+        parent.relationships.childChunkIds.push(chunk.id);
+      }
+    }
+    ancestors.push(chunk);
+
+    if (state.pending) {
+      state.pending.relationships.nextChunkId = chunk.id;
+      yield this.enhance(state, state.pending);
+    }
+    state.pending = chunk;
+  }
+
+  private enhance(state: StreamState, chunk: DocumentChunk): DocumentChunk {
+    const { documentTitle, documentAuthor, pageCount } = state.options;
+
+    const documentInfo = {
+      documentTitle,
+      documentAuthor,
+      pageCount: pageCount ?? state.pagesReceived,
+    };
+
+    return state.enhancer.enhanceStreamedChunk(chunk, state.leadingPages, documentInfo);
+  }
+
+  /**
+   * Finds the pages a chunk spans and where it starts within its first page
+   */
+  private findPageSpan(
+    state: StreamState,
+    startIndex: number,
+    endIndex: number,
+  ): {
+    startPage: number;
+    endPage: number;
+    pagePosition: 'top' | 'middle' | 'bottom';
+  } {
+    const lastPage = state.pageEnds.length - 1;
+    const startPageIndex = Math.min(upperBound(state.pageEnds, startIndex), lastPage);
+    const endPageIndex = Math.min(lowerBound(state.pageEnds, endIndex), lastPage);
+
+    const pageStart = state.pageStarts[startPageIndex];
+    const pageLength = state.pageEnds[startPageIndex] - pageStart;
+    const relativeStart = pageLength > 0 ? (startIndex - pageStart) / pageLength : 0;
+
+    return {
+      startPage: state.pageNumbers[startPageIndex],
+      endPage: state.pageNumbers[Math.max(endPageIndex, startPageIndex)],
+      pagePosition: relativeStart < 0.33 ? 'top' : relativeStart > 0.66 ? 'bottom' : 'middle',
+    };
+  }
+
+  /**
+   * Drops text before the next chunk start, remembering its last header
+   */
+  private releaseConsumedText(state: StreamState): void {
+    const consumed = state.currentIndex - state.windowStart;
+    if (consumed <= 0) {
+      return;
+    }
+
+    state.carriedHeader = state.index.findLastHeader(consumed) ?? state.carriedHeader;
+    state.window = state.window.substring(consumed);
+    state.windowStart = state.currentIndex;
+    state.index = new DocumentIndex(state.window);
+  }
+
+  /**
+   * Updates configuration
+   */
+  updateConfig(newConfig: Partial<ChunkConfig>): void {
+    this.config = { ...this.config, ...newConfig };
+  }
+
+  /**
+   * Gets current configuration
+   */
+  getConfig(): ChunkConfig {
+    return { ...this.config };
+  }
+}
+
+/**
+ * Async page source that producers push into, e.g. from an extraction job
+ */
+export class PageQueue implements AsyncIterable<PDFContent> {
+  private pages: PDFContent[] = [];
+  private closed = false;
+  private failure: Error | null = null;
+  private waiting: (() => void) | null = null;
+
+  push(page: PDFContent): void {
+    if (this.closed) {
+      throw new Error('Cannot push pages after the queue has been closed');
+    }
+    this.pages.push(page);
+    this.wake();
+  }
+
+  close(): void {
+    this.closed = true;
+    this.wake();
+  }
+
+  fail(error: Error): void {
+    this.failure = error;
+    this.closed = true;
+    this.wake();
+  }
+
+  async *[Symbol.asyncIterator](): AsyncIterator<PDFContent> {
+    while (true) {
+      if (this.failure) {
+        throw this.failure;
+      }
+      if (this.pages.length > 0) {
+        yield this.pages.shift()!;
+        continue;
+      }
+      if (this.closed) {
+        return;
+      }
+      await new Promise<void>((resolve) => {
+        this.waiting = resolve;
+      });
+    }
+  }
+
+  private wake(): void {
+    const waiting = this.waiting;
+    this.waiting = null;
+    waiting?.();
+  }
+}
@@ -4,13 +4,24 @@
 
 import { isFeatureEnabled } from '../featureFlags';
 import { DocumentChunker } from './algorithm';
+import { StreamingDocumentChunker, PageSource } from './streaming';
+import { ChunkingWorkerPool } from './worker-pool';
 import { ChunkConfig, DocumentChunk, PDFContent } from '../types/chunking';
 
+export interface ChunkingServiceOptions {
+  /** Chunk on these worker threads instead of the calling thread */
+  workerPool?: ChunkingWorkerPool;
+}
+
 export class ChunkingService {
   private chunker: DocumentChunker;
+  private streamingChunker: StreamingDocumentChunker;
+  private workerPool?: ChunkingWorkerPool;
 
-  constructor(config?: Partial<ChunkConfig>) {
+  constructor(config?: Partial<ChunkConfig>, options: ChunkingServiceOptions = {}) {
     this.chunker = new DocumentChunker(config);
+    this.streamingChunker = new StreamingDocumentChunker(config);
+    this.workerPool = options.workerPool;
   }
 
   /**
@@ -35,13 +46,22 @@ export class ChunkingService {
       console.log(`[ChunkingService] Starting chunking for document ${documentId}`);
       const startTime = Date.now();
 
-      const chunks = this.chunker.chunkDocument(
-        documentId,
-        tenantId,
-        pdfContent,
-        documentTitle,
-        documentAuthor,
-      );
+      const chunks = this.workerPool
+        ? await this.workerPool.chunkDocument(
+            documentId,
+            tenantId,
+            pdfContent,
+            documentTitle,
+            documentAuthor,
+            this.chunker.getConfig(),
+          )
+        : this.chunker.chunkDocument(
+            documentId,
+            tenantId,
+            pdfContent,
+            documentTitle,
+            documentAuthor,
+          );
 
       const endTime = Date.now();
       const duration = endTime - startTime;
@@ -70,6 +90,57 @@ export class ChunkingService {
     }
   }
 
+  /**
+   * Chunks a document page by page, yielding chunks as soon as they are complete
+   *
+   * With a worker pool, the document is chunked on a worker thread and pages
+   * are read from the source only as the worker needs them.
+   * @throws Error if chunking is disabled
+   */
+  async *streamDocument(
+    documentId: string,
+    tenantId: string,
+    pages: PageSource,
+    documentTitle?: string,
+    documentAuthor?: string,
+    pageCount?: number,
+  ): AsyncGenerator<DocumentChunk> {
+    if (!isFeatureEnabled('CHUNKING_ENABLED')) {
+      throw new Error(
+        'Document chunking is currently disabled. Enable CHUNKING_ENABLED feature flag to use this functionality.',
+      );
+    }
+
+    console.log(`[ChunkingService] Starting streamed chunking for document ${documentId}`);
+    const startTime = Date.now();
+    let chunkCount = 0;
+
+    const options = { documentTitle, documentAuthor, pageCount };
+    const chunks = this.workerPool
+      ? this.workerPool.streamDocument(
+          documentId,
+          tenantId,
+          pages,
+          options,
+          this.streamingChunker.getConfig(),
+        )
+      : this.streamingChunker.chunkPages(documentId, tenantId, pages, options);
+
+    try {
+      for await (const chunk of chunks) {
+        chunkCount++;
+        yield chunk;
+      }
+
+      console.log(
+        `[ChunkingService] Completed streamed chunking for document ${documentId}. Created ${chunkCount} chunks in ${Date.now() - startTime}ms`,
+      );
+    } catch (error) {
+      console.error(`[ChunkingService] Error chunking document ${documentId}:`, error);
+      throw error;
+    }
+  }
+
   /**
    * Checks if chunking is enabled
    */
@@ -89,13 +160,22 @@ export class ChunkingService {
    */
   updateConfig(newConfig: Partial<ChunkConfig>): void {
     this.chunker.updateConfig(newConfig);
+    this.streamingChunker.updateConfig(newConfig);
   }
 }
 
+// Worker threads for the default service; unset or 0 chunks on the calling thread
+const chunkingWorkers = Number(process.env.CHUNKING_WORKERS) || 0;
+
 /**
  * Default chunking service instance
+ *
+ * Chunks on a pool of CHUNKING_WORKERS worker threads when that is set.
  */
-export const chunkingService = new ChunkingService();
+export const chunkingService = new ChunkingService(undefined, {
+  workerPool:
+    chunkingWorkers > 0 ? new ChunkingWorkerPool({}, { size: chunkingWorkers }) : undefined,
+});
 
 /**
  * Helper function to check if chunking should be attempted
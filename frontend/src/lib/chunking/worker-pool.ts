@@ -0,0 +1,316 @@
+/**
+ * Worker thread pool for chunking several documents in parallel
+ *
+ * Workers run the compiled chunking.worker.js, built by `npm run build:workers`
+ * (tsconfig.worker.json) into dist/workers.
+ */
+
+import { existsSync } from 'fs';
+import { cpus } from 'os';
+import { join } from 'path';
+import { Worker } from 'worker_threads';
+import { ChunkConfig, DocumentChunk, PDFContent } from '../types/chunking';
+import { PageSource, StreamingChunkOptions } from './streaming';
+
+export interface WorkerPoolOptions {
+  /** Number of worker threads (defaults to one less than the CPU count) */
+  size?: number;
+  /** Heap limit for each worker, in megabytes */
+  maxMemoryMb?: number;
+  /** Chunks sent per message; each batch is acknowledged before the worker continues */
+  batchSize?: number;
+  /** Worker entry point (defaults to DEFAULT_WORKER_SCRIPT) */
+  workerScript?: string;
+  execArgv?: string[];
+}
+
+export type WorkerRequest =
+  | {
+      type: 'start';
+      documentId: string;
+      tenantId: string;
+      config: Partial<ChunkConfig>;
+      options: StreamingChunkOptions;
+      batchSize: number;
+    }
+  | { type: 'page'; page: PDFContent }
+  | { type: 'end' }
+  | { type: 'ack' };
+
+export type WorkerResponse =
+  | { type: 'next' }
+  | { type: 'chunks'; chunks: DocumentChunk[] }
+  | { type: 'done' }
+  | { type: 'error'; message: string };
+
+type WorkerEvent = WorkerResponse | { type: 'failed'; error: Error };
+
+const DEFAULT_MAX_MEMORY_MB = 512;
+const DEFAULT_BATCH_SIZE = 50;
+
+/**
+ * Where `npm run build:workers` writes the worker, relative to the app root
+ */
+export const DEFAULT_WORKER_SCRIPT = join(
+  process.cwd(),
+  'dist',
+  'workers',
+  'lib',
+  'chunking',
+  'chunking.worker.js',
+);
+
+/**
+ * Runs StreamingDocumentChunker in worker threads
+ *
+ * Each document is chunked on one worker. Pages are pulled from the caller's
+ * source only when the worker asks for them and chunks are handed back in
+ * acknowledged batches, so a slow consumer pauses chunking instead of
+ * buffering. A worker that fails, or whose consumer stops early, is
+ * terminated and replaced.
+ */
+export class ChunkingWorkerPool {
+  private readonly size: number;
+  private readonly maxMemoryMb: number;
+  private readonly batchSize: number;
+  private readonly workerScript: string;
+  private readonly execArgv?: string[];
+  private readonly config: Partial<ChunkConfig>;
+
+  private workers = new Set<Worker>();
+  private idle: Worker[] = [];
+  private waiters: Array<{ resolve: (worker: Worker) => void; reject: (error: Error) => void }> =
+    [];
+  private destroyed = false;
+
+  constructor(config: Partial<ChunkConfig> = {}, options: WorkerPoolOptions = {}) {
+    this.config = config;
+    this.size = Math.max(1, options.size ?? cpus().length - 1);
+    this.maxMemoryMb = options.maxMemoryMb ?? DEFAULT_MAX_MEMORY_MB;
+    this.batchSize = Math.max(1, options.batchSize ?? DEFAULT_BATCH_SIZE);
+    this.workerScript = options.workerScript ?? DEFAULT_WORKER_SCRIPT;
+    this.execArgv = options.execArgv;
+  }
+
+  /**
+   * Chunks a document on a worker, yielding chunks in document order
+   * @param config - Chunking configuration for this document (defaults to the pool's)
+   */
+  async *streamDocument(
+    documentId: string,
+    tenantId: string,
+    pages: PageSource,
+    options: StreamingChunkOptions = {},
+    config: Partial<ChunkConfig> = this.config,
+  ): AsyncGenerator<DocumentChunk> {
+    const worker = await this.acquire();
+    const iterator = toAsyncIterator(pages);
+
+    const events: WorkerEvent[] = [];
+    let notify: (() => void) | null = null;
+    const push = (event: WorkerEvent) => {
+      events.push(event);
+      const resolve = notify;
+      notify = null;
+      resolve?.();
+    };
+    const onMessage = (message: WorkerResponse) => push(message);
+    const onError = (error: Error) => push({ type: 'failed', error });
+    const onExit = (code: number) =>
+      push({ type: 'failed', error: new Error(`Chunking worker exited with code ${code}`) });
+
+    worker.on('message', onMessage);
+    worker.on('error', onError);
+    worker.on('exit', onExit);
+
+    let finished = false;
+    let sourceDone = false;
+    worker.ref();
+    try {
+      worker.postMessage({
+        type: 'start',
+        documentId,
+        tenantId,
+        config,
+        options,
+        batchSize: this.batchSize,
+      } as WorkerRequest);
+
+      while (!finished) {
+        if (events.length === 0) {
+          await new Promise<void>((resolve) => {
+            notify = resolve;
+          });
+          continue;
+        }
+
+        const event = events.shift()!;
+        switch (event.type) {
+          case 'next': {
+            const result = await iterator.next();
+            sourceDone = !!result.done;
+            const request: WorkerRequest = result.done
+              ? { type: 'end' }
+              : { type: 'page', page: result.value };
+            worker.postMessage(request);
+            break;
+          }
+          case 'chunks':
+            for (const chunk of event.chunks) {
+              yield chunk;
+            }
+            worker.postMessage({ type: 'ack' } as WorkerRequest);
+            break;
+          case 'done':
+            finished = true;
+            break;
+          case 'error':
+            // The worker reports the failure and is ready for the next document
+            finished = true;
+            throw new Error(`Chunking failed for document ${documentId}: ${event.message}`);
+          case 'failed':
+            throw event.error;
+        }
+      }
+    } finally {
+      worker.off('message', onMessage);
+      worker.off('error', onError);
+      worker.off('exit', onExit);
+
+      if (!sourceDone) {
+        await iterator.return?.();
+      }
+
+      if (finished) {
+        this.release(worker);
+      } else {
+        await this.discard(worker);
+      }
+    }
+  }
+
+  /**
+   * Chunks a document on a worker and collects the results
+   */
+  async chunkDocument(
+    documentId: string,
+    tenantId: string,
+    pdfContent: PDFContent[],
+    documentTitle?: string,
+    documentAuthor?: string,
+    config: Partial<ChunkConfig> = this.config,
+  ): Promise<DocumentChunk[]> {
+    const chunks: DocumentChunk[] = [];
+
+    for await (const chunk of this.streamDocument(
+      documentId,
+      tenantId,
+      pdfContent,
+      { documentTitle, documentAuthor, pageCount: pdfContent.length },
+      config,
+    )) {
+      chunks.push(chunk);
+    }
+
+    return chunks;
+  }
+
+  /**
+   * Terminates all workers; pending and later requests are rejected
+   */
+  async destroy(): Promise<void> {
+    this.destroyed = true;
+
+    const waiters = this.waiters;
+    this.waiters = [];
+    waiters.forEach((waiter) =>
+      waiter.reject(new Error('Chunking worker pool has been destroyed')),
+    );
+
+    const workers = Array.from(this.workers);
+    this.workers.clear();
+    this.idle = [];
+    await Promise.all(workers.map((worker) => worker.terminate()));
+  }
+
+  private acquire(): Promise<Worker> {
+    if (this.destroyed) {
+      return Promise.reject(new Error('Chunking worker pool has been destroyed'));
+    }
+
+    const worker = this.idle.pop();
+    if (worker) {
+      return Promise.resolve(worker);
+    }
+
+    if (this.workers.size < this.size) {
+      return Promise.resolve(this.spawn());
+    }
+
+    return new Promise((resolve, reject) => {
+      this.waiters.push({ resolve, reject });
+    });
+  }
+
+  private release(worker: Worker): void {
+    if (!this.workers.has(worker)) {
+      return;
+    }
+
+    const waiter = this.waiters.shift();
+    if (waiter) {
+      waiter.resolve(worker);
+    } else {
+      // Idle workers should not keep the process alive
+      worker.unref();
+      this.idle.push(worker);
+    }
+  }
+
+  private async discard(worker: Worker): Promise<void> {
+    this.workers.delete(worker);
+    await worker.terminate();
+
+    const waiter = this.waiters.shift();
+    if (waiter && !this.destroyed) {
+      try {
+        waiter.resolve(this.spawn());
+      } catch (error) {
+        waiter.reject(error as Error);
+      }
+    }
+  }
+
+  private spawn(): Worker {
+    if (!existsSync(this.workerScript)) {
+      throw new Error(
+        `Chunking worker not found at ${this.workerScript}. Run npm run build:workers first.`,
+      );
+    }
+
+    const worker = new Worker(this.workerScript, {
+      resourceLimits: { maxOldGenerationSizeMb: this.maxMemoryMb },
+      execArgv: this.execArgv,
+    });
+
+    worker.on('exit', () => {
+      this.workers.delete(worker);
+      this.idle = this.idle.filter((idleWorker) => idleWorker !== worker);
+    });
+
+    this.workers.add(worker);
+    return worker;
+  }
+}
+
+function toAsyncIterator(pages: PageSource): AsyncIterator<PDFContent> {
+  if (Symbol.asyncIterator in pages) {
+    return (pages as AsyncIterable<PDFContent>)[Symbol.asyncIterator]();
+  }
+
+  const iterator = (pages as Iterable<PDFContent>)[Symbol.iterator]();
+  return {
+    next: async () => iterator.next(),
+    return: async () => iterator.return?.() ?? { done: true, value: undefined },
+  };
+}
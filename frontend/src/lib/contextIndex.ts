@@ -0,0 +1,313 @@
+/**
+ * In-memory BM25 indexes for chat context retrieval
+ *
+ * Answering a technician question used to mean downloading every manual's
+ * extracted text and scanning it with indexOf per keyword. Manuals change
+ * rarely, so each machine's manuals are split into overlapping passages and
+ * indexed once; queries then only touch the posting lists of their terms.
+ * Indexes are kept in a small LRU cache keyed by machine id and rebuilt when
+ * the set of completed documents or any document's processed_at changes.
+ */
+
+export const STOP_WORDS = new Set([
+  'the',
+  'is',
+  'at',
+  'which',
+  'on',
+  'and',
+  'or',
+  'but',
+  'in',
+  'with',
+  'a',
+  'an',
+  'as',
+  'are',
+  'was',
+  'were',
+  'been',
+  'be',
+  'have',
+  'has',
+  'had',
+  'do',
+  'does',
+  'did',
+  'will',
+  'would',
+  'could',
+  'should',
+  'may',
+  'might',
+  'must',
+  'can',
+  'i',
+  'you',
+  'he',
+  'she',
+  'it',
+  'we',
+  'they',
+  'my',
+  'your',
+  'his',
+  'her',
+  'its',
+  'our',
+  'their',
+  'this',
+  'that',
+  'these',
+  'those',
+  'what',
+  'how',
+  'when',
+  'where',
+  'why',
+  'who',
+]);
+
+const TOKEN_PATTERN = /\w+/g;
+
+// Standard BM25 parameters
+const BM25_K1 = 1.2;
+const BM25_B = 0.75;
+
+export interface Token {
+  term: string;
+  offset: number;
+}
+
+/**
+ * Splits text into lowercase index terms with their character offsets
+ */
+export function tokenize(text: string): Token[] {
+  const tokens: Token[] = [];
+  const lowerText = text.toLowerCase();
+
+  for (const match of lowerText.matchAll(TOKEN_PATTERN)) {
+    const term = match[0];
+    if (term.length > 2 && !STOP_WORDS.has(term)) {
+      tokens.push({ term, offset: match.index! });
+    }
+  }
+
+  return tokens;
+}
+
+/**
+ * Counts how often each index term occurs in text
+ */
+export function termFrequencies(text: string): Map<string, number> {
+  const frequencies = new Map<string, number>();
+  for (const { term } of tokenize(text)) {
+    frequencies.set(term, (frequencies.get(term) || 0) + 1);
+  }
+  return frequencies;
+}
+
+export interface SearchHit<T> {
+  item: T;
+  score: number;
+}
+
+/**
+ * Inverted index over a fixed set of items ranked with BM25
+ */
+export class Bm25Index<T> {
+  private readonly items: T[] = [];
+  private readonly lengths: number[] = [];
+  private readonly postings = new Map<string, { item: number; tf: number }[]>();
+  private totalLength = 0;
+
+  /**
+   * Adds an item given the term frequencies of its text
+   */
+  add(item: T, termFrequencies: Map<string, number>): void {
+    const itemId = this.items.length;
+    let length = 0;
+
+    termFrequencies.forEach((tf, term) => {
+      let list = this.postings.get(term);
+      if (!list) {
+        list = [];
+        this.postings.set(term, list);
+      }
+      list.push({ item: itemId, tf });
+      length += tf;
+    });
+
+    this.items.push(item);
+    this.lengths.push(length);
+    this.totalLength += length;
+  }
+
+  /**
+   * Adds an item by tokenizing its text
+   */
+  addText(item: T, text: string): void {
+    this.add(item, termFrequencies(text));
+  }
+
+  get size(): number {
+    return this.items.length;
+  }
+
+  /**
+   * Scores every item containing at least one query term, best first
+   */
+  search(terms: string[]): SearchHit<T>[] {
+    if (this.items.length === 0) {
+      return [];
+    }
+
+    const averageLength = this.totalLength / this.items.length || 1;
+    const scores = new Map<number, number>();
+
+    for (const term of new Set(terms)) {
+      const list = this.postings.get(term);
+      if (!list) {
+        continue;
+      }
+
+      const idf = Math.log(1 + (this.items.length - list.length + 0.5) / (list.length + 0.5));
+      for (const { item, tf } of list) {
+        const norm = BM25_K1 * (1 - BM25_B + (BM25_B * this.lengths[item]) / averageLength);
+        const score = (idf * tf * (BM25_K1 + 1)) / (tf + norm);
+        scores.set(item, (scores.get(item) || 0) + score);
+      }
+    }
+
+    return Array.from(scores, ([item, score]) => ({ item: this.items[item], score })).sort(
+      (a, b) => b.score - a.score,
+    );
+  }
+}
+
+export interface ManualSource {
+  id: string;
+  filename: string;
+  extracted_text: string;
+}
+
+export interface ManualPassage {
+  documentId: string;
+  filename: string;
+  start: number;
+  end: number;
+}
+
+/**
+ * Passage-level index over all manuals of one machine
+ *
+ * Passages are fixed windows of passageLength characters starting every
+ * passageLength / 2 characters, so every term belongs to at most two
+ * passages and each document is tokenized exactly once.
+ */
+export class ManualIndex {
+  readonly signature: string;
+  private readonly index = new Bm25Index<ManualPassage>();
+  private readonly texts = new Map<string, string>();
+
+  constructor(documents: ManualSource[], signature: string, passageLength: number) {
+    this.signature = signature;
+    const step = Math.max(1, Math.floor(passageLength / 2));
+
+    for (const doc of documents) {
+      const text = doc.extracted_text;
+      this.texts.set(doc.id, text);
+
+      const overflow = Math.max(0, text.length - passageLength);
+      const passageCount = Math.ceil(overflow / step) + 1;
+      const frequencies = Array.from({ length: passageCount }, () => new Map<string, number>());
+
+      for (const { term, offset } of tokenize(text)) {
+        const last = Math.min(passageCount - 1, Math.floor(offset / step));
+        const first = Math.max(0, Math.floor((offset - passageLength) / step) + 1);
+        for (let passage = first; passage <= last; passage++) {
+          const tf = frequencies[passage];
+          tf.set(term, (tf.get(term) || 0) + 1);
+        }
+      }
+
+      frequencies.forEach((tf, passage) => {
+        const start = passage * step;
+        this.index.add(
+          {
+            documentId: doc.id,
+            filename: doc.filename,
+            start,
+            end: Math.min(text.length, start + passageLength),
+          },
+          tf,
+        );
+      });
+    }
+  }
+
+  /**
+   * Ranks passages for the query terms
+   */
+  search(terms: string[]): SearchHit<ManualPassage>[] {
+    return this.index.search(terms);
+  }
+
+  /**
+   * Returns the original text of a passage
+   */
+  getText(passage: ManualPassage): string {
+    return (this.texts.get(passage.documentId) || '').substring(passage.start, passage.end);
+  }
+}
+
+/**
+ * Fingerprint of a machine's indexed documents used for cache invalidation
+ */
+export function documentSignature(
+  documents: { id: string; processed_at?: string | null }[],
+): string {
+  return documents
+    .map((doc) => `${doc.id}:${doc.processed_at || ''}`)
+    .sort()
+    .join('|');
+}
+
+/**
+ * Minimal LRU cache built on Map insertion order
+ */
+export class LruCache<K, V> {
+  private readonly entries = new Map<K, V>();
+
+  constructor(private readonly maxEntries: number) {}
+
+  get(key: K): V | undefined {
+    const value = this.entries.get(key);
+    if (value !== undefined) {
+      this.entries.delete(key);
+      this.entries.set(key, value);
+    }
+    return value;
+  }
+
+  set(key: K, value: V): void {
+    this.entries.delete(key);
+    this.entries.set(key, value);
+
+    while (this.entries.size > this.maxEntries) {
+      this.entries.delete(this.entries.keys().next().value as K);
+    }
+  }
+
+  delete(key: K): void {
+    this.entries.delete(key);
+  }
+
+  clear(): void {
+    this.entries.clear();
+  }
+
+  get size(): number {
+    return this.entries.size;
+  }
+}
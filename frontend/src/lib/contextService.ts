@@ -1,6 +1,17 @@
 import { supabase } from './supabaseClient';
-import { Document } from '../types/document';
 import { ChatSession, ChatMessage } from './api';
+import {
+  Bm25Index,
+  LruCache,
+  ManualIndex,
+  ManualPassage,
+  ManualSource,
+  STOP_WORDS,
+  documentSignature,
+  termFrequencies,
+  tokenize,
+} from './contextIndex';
+import { PIPELINE_STAGES, pipelineMetrics } from './metrics';
 
 export interface ContextData {
   manualExcerpts: ManualExcerpt[];
@@ -16,6 +27,26 @@ export interface ManualExcerpt {
   pageNumber?: number;
 }
 
+interface IndexedSession {
+  session: ChatSession;
+  messages: ChatMessage[];
+  lastMessageAt: string;
+  termFrequencies: Map<string, number>;
+}
+
+/**
+ * Recent sessions of one machine with a BM25 index over their messages
+ */
+interface HistoryIndex {
+  /** Session ids and latest message timestamps the index was built from */
+  signature: string;
+  /** Newest first */
+  sessions: IndexedSession[];
+  index: Bm25Index<IndexedSession>;
+}
+
+type SessionRow = ChatSession & { chat_messages?: { timestamp: string }[] };
+
 export interface ChatHistorySummary {
   sessionId: string;
   date: string;
@@ -31,6 +62,21 @@ export class ContextService {
   private static readonly MAX_MANUAL_EXCERPTS = 5;
   private static readonly MAX_CHAT_HISTORY = 3;
   private static readonly EXCERPT_LENGTH = 500;
+  private static readonly MAX_EXCERPTS_PER_DOCUMENT = 3;
+  private static readonly MAX_HISTORY_SESSIONS = 10;
+  private static readonly MAX_CACHED_MACHINES = 20;
+  // Points per query keyword occurrence in an excerpt. BM25 scores only rank
+  // passages; they depend on the collection, so the reported score counts
+  // matches like the scorer the confidence thresholds in api.ts were set for.
+  private static readonly KEYWORD_MATCH_POINTS = 10;
+
+  private static readonly manualIndexCache = new LruCache<string, ManualIndex>(
+    ContextService.MAX_CACHED_MACHINES,
+  );
+
+  private static readonly historyIndexCache = new LruCache<string, HistoryIndex>(
+    ContextService.MAX_CACHED_MACHINES,
+  );
 
   /**
    * Get comprehensive context for a machine based on user query
@@ -40,268 +86,305 @@ export class ContextService {
     userQuery: string,
     currentSessionId?: string,
   ): Promise<ContextData> {
-    const [manualExcerpts, chatHistory] = await Promise.all([
-      this.getRelevantManualExcerpts(machineId, userQuery),
-      this.getRelevantChatHistory(machineId, userQuery, currentSessionId),
-    ]);
-
-    const relevanceScore = this.calculateRelevanceScore(manualExcerpts, chatHistory);
+    return pipelineMetrics.time(PIPELINE_STAGES.contextRetrieval, async () => {
+      const [manualExcerpts, chatHistory] = await Promise.all([
+        this.timeRetrieval(PIPELINE_STAGES.contextManualExcerpts, 'manual excerpts', () =>
+          this.getRelevantManualExcerpts(machineId, userQuery),
+        ),
+        this.timeRetrieval(PIPELINE_STAGES.contextChatHistory, 'chat history', () =>
+          this.getRelevantChatHistory(machineId, userQuery, currentSessionId),
+        ),
+      ]);
+
+      const relevanceScore = this.calculateRelevanceScore(manualExcerpts, chatHistory);
+
+      return {
+        manualExcerpts,
+        chatHistory,
+        relevanceScore,
+      };
+    });
+  }
 
-    return {
-      manualExcerpts,
-      chatHistory,
-      relevanceScore,
-    };
+  /**
+   * Time one retrieval step of a query
+   *
+   * A failed step is recorded as an error for its stage and contributes no
+   * context, so the question is still answered with whatever else was found.
+   */
+  private static async timeRetrieval<T>(
+    stage: string,
+    label: string,
+    retrieve: () => Promise<T[]>,
+  ): Promise<T[]> {
+    try {
+      return await pipelineMetrics.time(stage, retrieve);
+    } catch (error) {
+      console.error(`Error getting ${label}:`, error);
+      return [];
+    }
   }
 
   /**
    * Search for relevant manual excerpts based on user query
+   * @throws Error if the manual index cannot be loaded
    */
   private static async getRelevantManualExcerpts(
     machineId: string,
     userQuery: string,
   ): Promise<ManualExcerpt[]> {
-    try {
-      // Get all documents for the machine with extracted text
-      const { data: documents, error } = await supabase
-        .from('documents')
-        .select('*')
-        .eq('machine_id', machineId)
-        .eq('processing_status', 'completed')
-        .not('extracted_text', 'is', null);
-
-      if (error) {
-        console.error('Error fetching documents:', error);
-        return [];
-      }
+    const index = await this.getManualIndex(machineId);
+    if (!index) {
+      return [];
+    }
 
-      if (!documents || documents.length === 0) {
-        return [];
+    const keywords = this.extractKeywords(userQuery);
+    const excerpts: ManualExcerpt[] = [];
+    const selected: ManualPassage[] = [];
+
+    for (const { item: passage } of index.search(keywords)) {
+      const fromDocument = selected.filter((p) => p.documentId === passage.documentId);
+      if (
+        fromDocument.length >= this.MAX_EXCERPTS_PER_DOCUMENT ||
+        fromDocument.some((p) => p.start < passage.end && passage.start < p.end)
+      ) {
+        continue;
       }
 
-      // Extract keywords from user query for better matching
-      const keywords = this.extractKeywords(userQuery);
-      const excerpts: ManualExcerpt[] = [];
+      selected.push(passage);
+      const excerpt = index.getText(passage).trim();
+      excerpts.push({
+        documentId: passage.documentId,
+        filename: passage.filename,
+        excerpt,
+        relevanceScore: this.countKeywordMatches(excerpt, keywords) * this.KEYWORD_MATCH_POINTS,
+        pageNumber: undefined, // Could be enhanced with page number extraction
+      });
 
-      for (const doc of documents) {
-        const relevantExcerpts = this.findRelevantExcerpts(doc, keywords, userQuery);
-        excerpts.push(...relevantExcerpts);
+      if (excerpts.length >= this.MAX_MANUAL_EXCERPTS) {
+        break;
       }
-
-      // Sort by relevance score and take top results
-      return excerpts
-        .sort((a, b) => b.relevanceScore - a.relevanceScore)
-        .slice(0, this.MAX_MANUAL_EXCERPTS);
-    } catch (error) {
-      console.error('Error getting manual excerpts:', error);
-      return [];
     }
+
+    return excerpts;
   }
 
   /**
-   * Get relevant chat history for context
+   * Get the cached manual index for a machine, rebuilding it when documents change
+   *
+   * Only document ids and processed_at are fetched on a warm cache; full
+   * extracted text is downloaded when the index has to be rebuilt.
    */
-  private static async getRelevantChatHistory(
-    machineId: string,
-    userQuery: string,
-    currentSessionId?: string,
-  ): Promise<ChatHistorySummary[]> {
-    try {
-      // Get recent chat sessions for the machine (excluding current session)
-      const { data: sessions, error: sessionError } = await supabase
-        .from('chat_sessions')
-        .select('*')
-        .eq('machine_id', machineId)
-        .neq('id', currentSessionId || '')
-        .order('created_at', { ascending: false })
-        .limit(10);
-
-      if (sessionError || !sessions) {
-        console.error('Error fetching chat sessions:', sessionError);
-        return [];
-      }
+  private static async getManualIndex(machineId: string): Promise<ManualIndex | null> {
+    const { data: documents, error } = await supabase
+      .from('documents')
+      .select('id, processed_at')
+      .eq('machine_id', machineId)
+      .eq('processing_status', 'completed')
+      .not('extracted_text', 'is', null);
+
+    if (error) {
+      throw new Error(`Failed to fetch documents: ${error.message}`);
+    }
 
-      const keywords = this.extractKeywords(userQuery);
-      const historySummaries: ChatHistorySummary[] = [];
+    if (!documents || documents.length === 0) {
+      this.manualIndexCache.delete(machineId);
+      return null;
+    }
 
-      for (const session of sessions) {
-        const { data: messages, error: messageError } = await supabase
-          .from('chat_messages')
-          .select('*')
-          .eq('session_id', session.id)
-          .order('timestamp', { ascending: true });
+    const signature = documentSignature(documents);
+    const cached = this.manualIndexCache.get(machineId);
+    if (cached && cached.signature === signature) {
+      return cached;
+    }
 
-        if (messageError || !messages) {
-          continue;
-        }
+    const { data: sources, error: textError } = await supabase
+      .from('documents')
+      .select('id, filename, extracted_text')
+      .in(
+        'id',
+        documents.map((doc: { id: string }) => doc.id),
+      );
 
-        const summary = this.createChatHistorySummary(session, messages, keywords);
+    if (textError || !sources) {
+      throw new Error(`Failed to fetch document text: ${textError?.message || 'no data'}`);
+    }
 
-        if (summary && summary.relevantMessages.length > 0) {
-          historySummaries.push(summary);
-        }
-      }
+    const index = new ManualIndex(
+      (sources as ManualSource[]).filter((doc) => doc.extracted_text),
+      signature,
+      this.EXCERPT_LENGTH,
+    );
+    this.manualIndexCache.set(machineId, index);
+    return index;
+  }
 
-      return historySummaries
-        .sort((a, b) => new Date(b.date).getTime() - new Date(a.date).getTime())
-        .slice(0, this.MAX_CHAT_HISTORY);
+  /**
+   * Build or refresh the manual index for a machine before it is queried
+   */
+  static async warmCache(machineId: string): Promise<void> {
+    try {
+      await this.getManualIndex(machineId);
     } catch (error) {
-      console.error('Error getting chat history:', error);
-      return [];
+      console.error('Error warming manual index:', error);
     }
   }
 
   /**
-   * Extract keywords from user query for better context matching
+   * Drop cached indexes for one machine, or for all machines
    */
-  private static extractKeywords(query: string): string[] {
-    // Remove common words and extract meaningful terms
-    const stopWords = new Set([
-      'the',
-      'is',
-      'at',
-      'which',
-      'on',
-      'and',
-      'or',
-      'but',
-      'in',
-      'with',
-      'a',
-      'an',
-      'as',
-      'are',
-      'was',
-      'were',
-      'been',
-      'be',
-      'have',
-      'has',
-      'had',
-      'do',
-      'does',
-      'did',
-      'will',
-      'would',
-      'could',
-      'should',
-      'may',
-      'might',
-      'must',
-      'can',
-      'i',
-      'you',
-      'he',
-      'she',
-      'it',
-      'we',
-      'they',
-      'my',
-      'your',
-      'his',
-      'her',
-      'its',
-      'our',
-      'their',
-      'this',
-      'that',
-      'these',
-      'those',
-      'what',
-      'how',
-      'when',
-      'where',
-      'why',
-      'who',
-    ]);
-
-    return query
-      .toLowerCase()
-      .replace(/[^\w\s]/g, ' ')
-      .split(/\s+/)
-      .filter((word) => word.length > 2 && !stopWords.has(word))
-      .slice(0, 10); // Limit to 10 keywords
+  static invalidateCache(machineId?: string): void {
+    if (machineId) {
+      this.manualIndexCache.delete(machineId);
+      this.historyIndexCache.delete(machineId);
+    } else {
+      this.manualIndexCache.clear();
+      this.historyIndexCache.clear();
+    }
   }
 
   /**
-   * Find relevant excerpts in a document based on keywords
+   * Get relevant chat history for context
+   * @throws Error if the history index cannot be loaded
    */
-  private static findRelevantExcerpts(
-    document: Document,
-    keywords: string[],
-    originalQuery: string,
-  ): ManualExcerpt[] {
-    if (!document.extracted_text) {
-      return [];
-    }
-
-    const text = document.extracted_text.toLowerCase();
-    const excerpts: ManualExcerpt[] = [];
+  private static async getRelevantChatHistory(
+    machineId: string,
+    userQuery: string,
+    currentSessionId?: string,
+  ): Promise<ChatHistorySummary[]> {
+    const history = await this.getHistoryIndex(machineId);
+
+    // The index also covers the current session; only older ones are context
+    const candidates = new Set(
+      history.sessions
+        .filter(({ session }) => session.id !== currentSessionId)
+        .slice(0, this.MAX_HISTORY_SESSIONS)
+        .map(({ session }) => session.id),
+    );
+    const keywords = this.extractKeywords(userQuery);
+    const summaries: ChatHistorySummary[] = [];
 
-    // Find sections containing keywords
-    for (const keyword of keywords) {
-      const keywordIndex = text.indexOf(keyword.toLowerCase());
-      if (keywordIndex !== -1) {
-        const startIndex = Math.max(0, keywordIndex - this.EXCERPT_LENGTH / 2);
-        const endIndex = Math.min(text.length, keywordIndex + this.EXCERPT_LENGTH / 2);
-        const excerpt = document.extracted_text.substring(startIndex, endIndex);
-
-        // Calculate relevance score based on keyword frequency and position
-        const keywordCount = keywords.filter((k) =>
-          excerpt.toLowerCase().includes(k.toLowerCase()),
-        ).length;
-
-        const relevanceScore = this.calculateExcerptRelevance(excerpt, keywords, originalQuery);
-
-        excerpts.push({
-          documentId: document.id,
-          filename: document.filename,
-          excerpt: excerpt.trim(),
-          relevanceScore,
-          pageNumber: undefined, // Could be enhanced with page number extraction
-        });
+    for (const { item } of history.index.search(keywords)) {
+      if (!candidates.has(item.session.id)) {
+        continue;
+      }
+      const summary = this.createChatHistorySummary(item.session, item.messages, keywords);
+      if (summary) {
+        summaries.push(summary);
+      }
+      if (summaries.length >= this.MAX_CHAT_HISTORY) {
+        break;
       }
     }
 
-    // Remove duplicates and return top excerpts
-    const uniqueExcerpts = excerpts.filter(
-      (excerpt, index, self) => index === self.findIndex((e) => e.excerpt === excerpt.excerpt),
-    );
-
-    return uniqueExcerpts.sort((a, b) => b.relevanceScore - a.relevanceScore).slice(0, 3); // Max 3 excerpts per document
+    // Keep the sessions that best match the question, newest first
+    return summaries.sort((a, b) => new Date(b.date).getTime() - new Date(a.date).getTime());
   }
 
   /**
-   * Calculate relevance score for an excerpt
+   * Get the cached history index for a machine, updating it when sessions change
+   *
+   * One query returns the recent sessions with their latest message time. On
+   * a warm cache nothing else is fetched; otherwise messages are fetched and
+   * tokenized only for sessions that are new or have new messages.
    */
-  private static calculateExcerptRelevance(
-    excerpt: string,
-    keywords: string[],
-    originalQuery: string,
-  ): number {
-    const lowerExcerpt = excerpt.toLowerCase();
-    const lowerQuery = originalQuery.toLowerCase();
+  private static async getHistoryIndex(machineId: string): Promise<HistoryIndex> {
+    const { data, error } = await supabase
+      .from('chat_sessions')
+      .select('id, machine_id, user_id, created_at, chat_messages(timestamp)')
+      .eq('machine_id', machineId)
+      .order('created_at', { ascending: false })
+      .order('timestamp', { ascending: false, referencedTable: 'chat_messages' })
+      .limit(1, { referencedTable: 'chat_messages' })
+      .limit(this.MAX_HISTORY_SESSIONS + 1);
+
+    if (error || !data) {
+      throw new Error(`Failed to fetch chat sessions: ${error?.message || 'no data'}`);
+    }
 
-    let score = 0;
+    const rows = (data as SessionRow[]).map(({ chat_messages, ...session }) => ({
+      session: session as ChatSession,
+      lastMessageAt: chat_messages?.[0]?.timestamp || '',
+    }));
+    const signature = rows.map((row) => `${row.session.id}:${row.lastMessageAt}`).join('|');
 
-    // Exact query match gets highest score
-    if (lowerExcerpt.includes(lowerQuery)) {
-      score += 100;
+    const cached = this.historyIndexCache.get(machineId);
+    if (cached && cached.signature === signature) {
+      return cached;
     }
 
-    // Keyword matches
-    for (const keyword of keywords) {
-      const keywordCount = (lowerExcerpt.match(new RegExp(keyword, 'g')) || []).length;
-      score += keywordCount * 10;
+    const previous = new Map<string, IndexedSession>(
+      (cached?.sessions || []).map((entry) => [entry.session.id, entry]),
+    );
+    const changed = rows.filter(
+      (row) => previous.get(row.session.id)?.lastMessageAt !== row.lastMessageAt,
+    );
+
+    const messagesBySession = new Map<string, ChatMessage[]>();
+    if (changed.length > 0) {
+      const { data: messages, error: messageError } = await supabase
+        .from('chat_messages')
+        .select('*')
+        .in(
+          'session_id',
+          changed.map((row) => row.session.id),
+        )
+        .order('timestamp', { ascending: true });
+
+      if (messageError || !messages) {
+        throw new Error(`Failed to fetch chat messages: ${messageError?.message || 'no data'}`);
+      }
+
+      for (const message of messages as ChatMessage[]) {
+        const list = messagesBySession.get(message.session_id) || [];
+        list.push(message);
+        messagesBySession.set(message.session_id, list);
+      }
     }
 
-    // Bonus for technical terms (error codes, model numbers, etc.)
-    const technicalTerms =
-      /\b(error|code|model|part|serial|maintenance|repair|troubleshoot|fix|problem|issue)\b/gi;
-    const technicalMatches = (lowerExcerpt.match(technicalTerms) || []).length;
-    score += technicalMatches * 5;
+    const sessions = rows.map((row): IndexedSession => {
+      const unchanged = previous.get(row.session.id);
+      if (unchanged && unchanged.lastMessageAt === row.lastMessageAt) {
+        return unchanged;
+      }
+      const messages = messagesBySession.get(row.session.id) || [];
+      return {
+        session: row.session,
+        messages,
+        lastMessageAt: row.lastMessageAt,
+        termFrequencies: termFrequencies(messages.map((msg) => msg.text).join('\n')),
+      };
+    });
+
+    // BM25 weights depend on the whole collection, so postings are rebuilt
+    // from the stored term frequencies rather than patched
+    const index = new Bm25Index<IndexedSession>();
+    sessions.forEach((entry) => index.add(entry, entry.termFrequencies));
+
+    const history = { signature, sessions, index };
+    this.historyIndexCache.set(machineId, history);
+    return history;
+  }
+
+  /**
+   * Count occurrences of query keywords in text
+   */
+  private static countKeywordMatches(text: string, keywords: string[]): number {
+    const wanted = new Set(keywords);
+    return tokenize(text).filter(({ term }) => wanted.has(term)).length;
+  }
 
-    return score;
+  /**
+   * Extract keywords from user query for better context matching
+   */
+  private static extractKeywords(query: string): string[] {
+    // Remove common words and extract meaningful terms
+    return query
+      .toLowerCase()
+      .replace(/[^\w\s]/g, ' ')
+      .split(/\s+/)
+      .filter((word) => word.length > 2 && !STOP_WORDS.has(word))
+      .slice(0, 10); // Limit to 10 keywords
   }
 
   /**
@@ -355,7 +438,7 @@ export class ContextService {
   /**
    * Calculate overall relevance score for context data
    */
-  private static calculateRelevanceScore(
+  static calculateRelevanceScore(
     manualExcerpts: ManualExcerpt[],
     chatHistory: ChatHistorySummary[],
   ): number {
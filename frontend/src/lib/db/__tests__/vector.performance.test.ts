@@ -2,6 +2,8 @@
  * Performance tests for vector database operations
  */
 
+import { createClient } from '@supabase/supabase-js';
+import { randomUUID } from 'crypto';
 import { vectorDb } from '../vector';
 import type { VectorSearchParams } from '../../types/vector';
 
@@ -115,6 +117,79 @@ describe('Vector Database Performance Tests', () => {
     });
   });
 
+  describe('Bulk Ingest Throughput', () => {
+    // Simulated link: 20ms per request plus transfer at 50 MB/s in each direction
+    const REQUEST_LATENCY_MS = 20;
+    const BYTES_PER_MS = 50 * 1024;
+
+    const transferDelay = (payload: unknown) =>
+      new Promise((resolve) => setTimeout(resolve, JSON.stringify(payload).length / BYTES_PER_MS));
+
+    const mockNetworkInsert = () => {
+      let bytesSent = 0;
+      let bytesReceived = 0;
+
+      mockSupabase.from.mockReturnValue({
+        insert: jest.fn((rows: any[]) => {
+          const send = (async () => {
+            bytesSent += JSON.stringify(rows).length;
+            await new Promise((resolve) => setTimeout(resolve, REQUEST_LATENCY_MS));
+            await transferDelay(rows);
+          })();
+          return {
+            select: jest.fn(async () => {
+              await send;
+              // Returning full rows sends every vector back to the client
+              bytesReceived += JSON.stringify(rows).length;
+              await transferDelay(rows);
+              return { data: rows, error: null };
+            }),
+            then: (resolve: (value: any) => any, reject: (reason: any) => any) =>
+              send.then(() => ({ data: null, error: null })).then(resolve, reject),
+          };
+        }),
+      });
+
+      return () => ({ bytesSent, bytesReceived });
+    };
+
+    const createEmbeddings = (count: number) =>
+      Array.from({ length: count }, (_, i) => ({
+        tenant_id: 'test-tenant',
+        document_id: 'bulk-doc',
+        chunk_id: `chunk-${i}`,
+        chunk_text: `Chunk ${i} of a large manual`,
+        chunk_metadata: { index: i },
+        embedding: Array.from({ length: 1536 }, (_, d) => Math.sin(i + d * 0.01)),
+      }));
+
+    it('should report rows per second for sequential and bulk inserts', async () => {
+      const embeddings = createEmbeddings(2000);
+
+      const measure = async (insert: () => Promise<unknown>) => {
+        const traffic = mockNetworkInsert();
+        const startTime = Date.now();
+        await insert();
+        const seconds = Math.max(1, Date.now() - startTime) / 1000;
+        const { bytesSent, bytesReceived } = traffic();
+        return {
+          rowsPerSecond: Math.round(embeddings.length / seconds),
+          sentMb: +(bytesSent / 1024 / 1024).toFixed(1),
+          receivedMb: +(bytesReceived / 1024 / 1024).toFixed(1),
+        };
+      };
+
+      const sequential = await measure(() => vectorDb.insertEmbeddingsBatch(embeddings, 250));
+      const bulk = await measure(() => vectorDb.bulkInsertEmbeddings(embeddings));
+
+      console.table({ sequential, bulk });
+
+      expect(bulk.receivedMb).toBe(0);
+      expect(bulk.sentMb).toBeLessThan(sequential.sentMb);
+      expect(bulk.rowsPerSecond).toBeGreaterThan(sequential.rowsPerSecond);
+    }, 30000);
+  });
+
   describe('Document Chunk Performance', () => {
     it('should handle large document chunk operations', async () => {
       const mockInsert = jest.fn().mockImplementation(
@@ -421,25 +496,245 @@ describe('Vector Database Performance Tests', () => {
     });
   });
 
-  describe('Vector Search Performance (Placeholder)', () => {
-    it('should handle vector search failure quickly', async () => {
-      const searchParams: VectorSearchParams = {
-        query_embedding: new Array(1536).fill(0.1),
+  describe('Vector Search Performance', () => {
+    const searchParams: VectorSearchParams = {
+      query_embedding: new Array(1536).fill(0.1),
+      tenant_id: 'test-tenant',
+      limit: 10,
+    };
+
+    it('should return search results without client-side overhead', async () => {
+      mockSupabase.rpc = jest.fn().mockImplementation(
+        () =>
+          new Promise((resolve) =>
+            setTimeout(
+              () =>
+                resolve({
+                  data: Array.from({ length: 10 }, (_, i) => ({
+                    chunk_id: `chunk-${i}`,
+                    chunk_text: `Test content ${i}`,
+                    chunk_metadata: {},
+                    document_id: 'doc-1',
+                    similarity_score: 1 - i * 0.01,
+                  })),
+                  error: null,
+                }),
+              50,
+            ),
+          ), // 50ms for the RPC round trip
+      );
+
+      const startTime = Date.now();
+      const results = await vectorDb.searchSimilar(searchParams);
+      const endTime = Date.now();
+
+      expect(endTime - startTime).toBeLessThan(100);
+      expect(results).toHaveLength(10);
+    });
+
+    it('should answer a batch of queries in a single round trip', async () => {
+      mockSupabase.rpc = jest.fn().mockImplementation(
+        (_name: string, args: { query_embeddings: number[][] }) =>
+          new Promise((resolve) =>
+            setTimeout(
+              () =>
+                resolve({
+                  data: args.query_embeddings.map((_, i) => ({
+                    query_index: i + 1,
+                    chunk_id: `chunk-${i}`,
+                    chunk_text: `Test content ${i}`,
+                    chunk_metadata: {},
+                    document_id: 'doc-1',
+                    similarity_score: 0.9,
+                  })),
+                  error: null,
+                }),
+              50,
+            ),
+          ), // 50ms for the RPC round trip regardless of batch size
+      );
+
+      const startTime = Date.now();
+      const results = await vectorDb.searchSimilarBatch({
         tenant_id: 'test-tenant',
         limit: 10,
-      };
+        query_embeddings: Array.from({ length: 20 }, () => new Array(1536).fill(0.1)),
+      });
+      const endTime = Date.now();
+
+      // 20 sequential searches would take ~1 second
+      expect(endTime - startTime).toBeLessThan(150);
+      expect(mockSupabase.rpc).toHaveBeenCalledTimes(1);
+      expect(results).toHaveLength(20);
+      results.forEach((matches) => expect(matches).toHaveLength(1));
+    });
+
+    it('should reject invalid queries before making a round trip', async () => {
+      mockSupabase.rpc = jest.fn();
 
       const startTime = Date.now();
+      await expect(
+        vectorDb.searchSimilar({ ...searchParams, query_embedding: [0.1] }),
+      ).rejects.toThrow('Invalid query embedding dimension');
+      const endTime = Date.now();
 
-      try {
-        await vectorDb.searchSimilar(searchParams);
-      } catch (error) {
-        const endTime = Date.now();
-        expect(endTime - startTime).toBeLessThan(10); // Should fail immediately
-        expect(error).toEqual(
-          new Error('Vector search not yet implemented - requires Supabase function'),
-        );
-      }
+      expect(endTime - startTime).toBeLessThan(10); // Should fail immediately
+      expect(mockSupabase.rpc).not.toHaveBeenCalled();
     });
   });
 });
+
+/**
+ * Recall-vs-latency measurements for match_embeddings against a local
+ * Postgres + pgvector (e.g. `supabase start` with migrations applied).
+ *
+ * Skipped unless VECTOR_BENCHMARK_SUPABASE_URL is set. Ground truth comes from
+ * the exact ranking path (exact_scan_limit above the candidate count); the
+ * HNSW path is forced with exact_scan_limit = 0 and measured per ef_search.
+ */
+const benchmarkUrl = process.env.VECTOR_BENCHMARK_SUPABASE_URL;
+const describeBenchmark = benchmarkUrl ? describe : describe.skip;
+
+describeBenchmark('Vector Search Recall vs Latency (local pgvector)', () => {
+  const DIMENSIONS = 1536;
+  const CORPUS_SIZE = Number(process.env.VECTOR_BENCHMARK_CORPUS_SIZE || 5000);
+  const QUERY_COUNT = 20;
+  const MATCH_COUNT = 10;
+  const EF_SEARCH_VALUES = [10, 40, 100, 200];
+  const INSERT_BATCH_SIZE = 500;
+
+  const tenantId = randomUUID();
+  const otherTenantId = randomUUID();
+  const documentId = randomUUID();
+  let client: any;
+
+  // Deterministic pseudo-random vectors so runs are comparable
+  let seed = 42;
+  const random = () => {
+    seed = (seed * 1103515245 + 12345) % 2147483648;
+    return seed / 2147483648 - 0.5;
+  };
+  const randomVector = () => Array.from({ length: DIMENSIONS }, random);
+
+  const search = async (queryEmbedding: number[], options: Record<string, number>) => {
+    const startTime = performance.now();
+    const { data, error } = await client.rpc('match_embeddings', {
+      query_embedding: queryEmbedding,
+      p_tenant_id: tenantId,
+      match_count: MATCH_COUNT,
+      ...options,
+    });
+    const elapsed = performance.now() - startTime;
+
+    if (error) {
+      throw new Error(`match_embeddings failed: ${error.message}`);
+    }
+    return { ids: (data as { chunk_id: string }[]).map((row) => row.chunk_id), elapsed };
+  };
+
+  const percentile = (values: number[], p: number) => {
+    const sorted = [...values].sort((a, b) => a - b);
+    return sorted[Math.min(sorted.length - 1, Math.floor((p / 100) * sorted.length))];
+  };
+
+  const seedTenant = async (tenant: string, size: number) => {
+    for (let offset = 0; offset < size; offset += INSERT_BATCH_SIZE) {
+      const count = Math.min(INSERT_BATCH_SIZE, size - offset);
+      const chunks = Array.from({ length: count }, (_, i) => ({
+        id: randomUUID(),
+        tenant_id: tenant,
+        document_id: tenant === tenantId ? documentId : randomUUID(),
+        chunk_index: offset + i,
+        chunk_type: 'text',
+      }));
+
+      const { error: chunkError } = await client.from('document_chunks').insert(chunks);
+      if (chunkError) {
+        throw new Error(`Failed to seed chunks: ${chunkError.message}`);
+      }
+
+      const { error: embeddingError } = await client.from('embeddings').insert(
+        chunks.map((chunk) => ({
+          tenant_id: tenant,
+          document_id: chunk.document_id,
+          chunk_id: chunk.id,
+          chunk_text: `Benchmark chunk ${chunk.chunk_index}`,
+          embedding: randomVector(),
+        })),
+      );
+      if (embeddingError) {
+        throw new Error(`Failed to seed embeddings: ${embeddingError.message}`);
+      }
+    }
+  };
+
+  beforeAll(async () => {
+    client = createClient(benchmarkUrl as string, process.env.SUPABASE_SERVICE_ROLE_KEY || '');
+
+    // A second tenant of the same size checks that filtering does not cost recall
+    await seedTenant(tenantId, CORPUS_SIZE);
+    await seedTenant(otherTenantId, CORPUS_SIZE);
+  }, 600000);
+
+  afterAll(async () => {
+    if (client) {
+      await client.from('document_chunks').delete().in('tenant_id', [tenantId, otherTenantId]);
+    }
+  });
+
+  it(
+    'should report recall and latency for each ef_search setting',
+    async () => {
+      const queries = Array.from({ length: QUERY_COUNT }, randomVector);
+
+      const exactLatencies: number[] = [];
+      const groundTruth: string[][] = [];
+      for (const query of queries) {
+        const { ids, elapsed } = await search(query, { exact_scan_limit: CORPUS_SIZE * 2 });
+        groundTruth.push(ids);
+        exactLatencies.push(elapsed);
+      }
+
+      const report = [
+        {
+          mode: 'exact',
+          recall: 1,
+          p50Ms: percentile(exactLatencies, 50),
+          p95Ms: percentile(exactLatencies, 95),
+        },
+      ];
+
+      for (const efSearch of EF_SEARCH_VALUES) {
+        const latencies: number[] = [];
+        let hits = 0;
+
+        for (let i = 0; i < queries.length; i++) {
+          const { ids, elapsed } = await search(queries[i], {
+            ef_search: efSearch,
+            exact_scan_limit: 0,
+          });
+          const expected = new Set(groundTruth[i]);
+          hits += ids.filter((id) => expected.has(id)).length;
+          latencies.push(elapsed);
+        }
+
+        report.push({
+          mode: `hnsw ef_search=${efSearch}`,
+          recall: hits / (QUERY_COUNT * MATCH_COUNT),
+          p50Ms: percentile(latencies, 50),
+          p95Ms: percentile(latencies, 95),
+        });
+      }
+
+      console.table(report);
+
+      // Exact ranking must fill every result from the tenant's own rows
+      groundTruth.forEach((ids) => expect(ids).toHaveLength(MATCH_COUNT));
+      // Recall should not drop as ef_search grows, and the largest setting should be near-exact
+      const hnswRecall = report.slice(1).map((row) => row.recall);
+      expect(hnswRecall[hnswRecall.length - 1]).toBeGreaterThanOrEqual(0.9);
+      expect(hnswRecall[hnswRecall.length - 1]).toBeGreaterThanOrEqual(hnswRecall[0]);
+    },
+    600000,
+  );
+});
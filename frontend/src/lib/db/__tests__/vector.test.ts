@@ -2,7 +2,7 @@
  * Integration tests for vector database operations
  */
 
-import { vectorDb } from '../vector';
+import { toVectorLiteral, vectorDb } from '../vector';
 import type { Embedding, DocumentChunk, VectorSearchParams } from '../../types/vector';
 
 // Mock Supabase client for testing
@@ -160,18 +160,21 @@ describe('Vector Database Integration Tests', () => {
         error: null,
       });
 
+      const mockGte = jest.fn().mockReturnValue({
+        order: mockSelect,
+      });
       mockSupabase.from.mockReturnValue({
         select: jest.fn().mockReturnValue({
           eq: jest.fn().mockReturnValue({
-            order: jest.fn().mockReturnValue({
-              select: mockSelect,
-            }),
+            gte: mockGte,
           }),
         }),
       });
 
       const result = await vectorDb.getDocumentChunks('test-doc');
 
+      expect(mockGte).toHaveBeenCalledWith('chunk_index', 0);
+
       expect(result).toHaveLength(2);
       expect(result[0]).toHaveProperty('embeddings');
       expect(result[0].embeddings).toHaveLength(1);
@@ -197,18 +200,279 @@ describe('Vector Database Integration Tests', () => {
   });
 
   describe('Vector Search Operations', () => {
-    it('should throw error for vector similarity search (not yet implemented)', async () => {
-      const searchParams: VectorSearchParams = {
-        query_embedding: new Array(1536).fill(0.1),
-        tenant_id: 'test-tenant',
-        limit: 10,
-        threshold: 0.7,
-      };
+    const searchParams: VectorSearchParams = {
+      query_embedding: new Array(1536).fill(0.1),
+      tenant_id: 'test-tenant',
+      limit: 10,
+      threshold: 0.7,
+    };
+
+    it('should search through the tenant-scoped match_embeddings RPC', async () => {
+      const matches = [
+        {
+          chunk_id: 'chunk-1',
+          chunk_text: 'Check the hydraulic pressure',
+          chunk_metadata: {},
+          document_id: 'doc-1',
+          similarity_score: 0.92,
+          page_number: 4,
+          section_header: 'Hydraulics',
+        },
+      ];
+      mockSupabase.rpc = jest.fn().mockResolvedValue({ data: matches, error: null });
+
+      const result = await vectorDb.searchSimilar({
+        ...searchParams,
+        document_ids: ['doc-1'],
+        ef_search: 100,
+      });
+
+      expect(result).toEqual(matches);
+      expect(mockSupabase.rpc).toHaveBeenCalledWith('match_embeddings', {
+        query_embedding: searchParams.query_embedding,
+        p_tenant_id: 'test-tenant',
+        match_count: 10,
+        match_threshold: 0.7,
+        p_document_ids: ['doc-1'],
+        p_machine_id: null,
+        ef_search: 100,
+        exact_scan_limit: 10000,
+      });
+    });
+
+    it('should filter by machine when requested', async () => {
+      mockSupabase.rpc = jest.fn().mockResolvedValue({ data: [], error: null });
+
+      await vectorDb.searchSimilar({ ...searchParams, machine_id: 'machine-1' });
+
+      expect(mockSupabase.rpc).toHaveBeenCalledWith(
+        'match_embeddings',
+        expect.objectContaining({ p_machine_id: 'machine-1', p_document_ids: null }),
+      );
+    });
+
+    it('should validate search parameters', async () => {
+      mockSupabase.rpc = jest.fn();
+
+      await expect(
+        vectorDb.searchSimilar({ ...searchParams, query_embedding: [0.1, 0.2] }),
+      ).rejects.toThrow('Invalid query embedding dimension');
+      await expect(vectorDb.searchSimilar({ ...searchParams, tenant_id: '' })).rejects.toThrow(
+        'Tenant ID is required',
+      );
+      expect(mockSupabase.rpc).not.toHaveBeenCalled();
+    });
+
+    it('should surface search errors', async () => {
+      mockSupabase.rpc = jest.fn().mockResolvedValue({
+        data: null,
+        error: { message: 'function match_embeddings does not exist' },
+      });
 
       await expect(vectorDb.searchSimilar(searchParams)).rejects.toThrow(
-        'Vector search not yet implemented - requires Supabase function',
+        'Failed to search embeddings: function match_embeddings does not exist',
+      );
+    });
+
+    it('should answer several queries in one round trip', async () => {
+      const row = (queryIndex: number, chunkId: string, score: number) => ({
+        query_index: queryIndex,
+        chunk_id: chunkId,
+        chunk_text: `Text for ${chunkId}`,
+        chunk_metadata: {},
+        document_id: 'doc-1',
+        similarity_score: score,
+      });
+      mockSupabase.rpc = jest.fn().mockResolvedValue({
+        data: [row(1, 'chunk-a', 0.9), row(1, 'chunk-b', 0.8), row(3, 'chunk-c', 0.7)],
+        error: null,
+      });
+
+      const queries = [0.1, 0.2, 0.3].map((value) => new Array(1536).fill(value));
+      const results = await vectorDb.searchSimilarBatch({
+        query_embeddings: queries,
+        tenant_id: 'test-tenant',
+        limit: 5,
+      });
+
+      expect(mockSupabase.rpc).toHaveBeenCalledTimes(1);
+      expect(mockSupabase.rpc).toHaveBeenCalledWith(
+        'match_embeddings_batch',
+        expect.objectContaining({ query_embeddings: queries, match_count: 5 }),
+      );
+      expect(results.map((matches) => matches.map((match) => match.chunk_id))).toEqual([
+        ['chunk-a', 'chunk-b'],
+        [],
+        ['chunk-c'],
+      ]);
+      expect(results[0][0]).not.toHaveProperty('query_index');
+    });
+
+    it('should skip the round trip for an empty batch', async () => {
+      mockSupabase.rpc = jest.fn();
+
+      const results = await vectorDb.searchSimilarBatch({
+        query_embeddings: [],
+        tenant_id: 'test-tenant',
+      });
+
+      expect(results).toEqual([]);
+      expect(mockSupabase.rpc).not.toHaveBeenCalled();
+    });
+  });
+
+  describe('Bulk Ingest Operations', () => {
+    const createEmbeddings = (count: number) =>
+      Array.from({ length: count }, (_, i) => ({
+        tenant_id: 'test-tenant',
+        document_id: 'test-doc',
+        chunk_id: `chunk-${i}`,
+        chunk_text: `Test content ${i}`,
+        chunk_metadata: {},
+        embedding: new Array(1536).fill(0.25),
+      }));
+
+    it('should format vectors as compact pgvector literals', () => {
+      expect(toVectorLiteral([0.1, -2, 1e-8, 1 / 3])).toBe('[0.1,-2,1e-8,0.333333333]');
+    });
+
+    it('should insert without returning rows and with text vectors', async () => {
+      const mockSelect = jest.fn();
+      const mockInsert = jest.fn().mockReturnValue({
+        select: mockSelect,
+        then: (resolve: (value: any) => any) => resolve({ data: null, error: null }),
+      });
+      mockSupabase.from.mockReturnValue({ insert: mockInsert });
+
+      const result = await vectorDb.bulkInsertEmbeddings(createEmbeddings(3));
+
+      expect(result).toEqual([]);
+      expect(mockSelect).not.toHaveBeenCalled();
+      expect(mockInsert.mock.calls[0][0][0].embedding).toBe(
+        `[${new Array(1536).fill(0.25).join(',')}]`,
+      );
+    });
+
+    it('should run batches concurrently and keep results in order', async () => {
+      let inFlight = 0;
+      let maxInFlight = 0;
+      mockSupabase.from.mockReturnValue({
+        insert: jest.fn((rows: any[]) => ({
+          select: jest.fn(async () => {
+            inFlight++;
+            maxInFlight = Math.max(maxInFlight, inFlight);
+            await new Promise((resolve) => setTimeout(resolve, 5));
+            inFlight--;
+            return { data: rows.map((row) => ({ id: row.chunk_id })), error: null };
+          }),
+        })),
+      });
+
+      const result = await vectorDb.insertEmbeddingsBatch(createEmbeddings(10), 2, {
+        concurrency: 3,
+        returning: 'id',
+      });
+
+      expect(maxInFlight).toBe(3);
+      expect(result.map((row) => row.id)).toEqual(
+        Array.from({ length: 10 }, (_, i) => `chunk-${i}`),
       );
     });
+
+    it('should split batches that exceed the payload limit', async () => {
+      const batchSizes: number[] = [];
+      mockSupabase.from.mockReturnValue({
+        insert: jest.fn((rows: any[]) => ({
+          select: jest.fn(async () => {
+            batchSizes.push(rows.length);
+            return rows.length > 2
+              ? { data: null, error: { message: 'Payload Too Large' } }
+              : { data: rows, error: null };
+          }),
+        })),
+      });
+
+      const result = await vectorDb.insertEmbeddingsBatch(createEmbeddings(8), 8);
+
+      expect(result).toHaveLength(8);
+      expect(batchSizes).toEqual([8, 4, 2, 2, 4, 2, 2]);
+    });
+
+    it('should write chunks and embeddings through one RPC per batch', async () => {
+      mockSupabase.rpc = jest.fn().mockResolvedValue({ data: 2, error: null });
+
+      const count = await vectorDb.ingestChunksWithEmbeddings('test-tenant', 'test-doc', [
+        {
+          chunk_index: 0,
+          chunk_type: 'text',
+          chunk_text: 'First',
+          chunk_metadata: {},
+          embedding: new Array(1536).fill(0.5),
+        },
+        {
+          chunk_index: 1,
+          chunk_type: 'table',
+          chunk_text: 'Second',
+          chunk_metadata: {},
+          embedding: new Array(1536).fill(0.5),
+        },
+      ]);
+
+      expect(count).toBe(2);
+      expect(mockSupabase.rpc).toHaveBeenCalledTimes(1);
+      const [name, args] = mockSupabase.rpc.mock.calls[0];
+      expect(name).toBe('ingest_document_chunks');
+      expect(args.p_tenant_id).toBe('test-tenant');
+      expect(args.p_document_id).toBe('test-doc');
+      expect(args.p_chunks.map((row: any) => row.chunk_index)).toEqual([0, 1]);
+      expect(typeof args.p_chunks[0].embedding).toBe('string');
+    });
+
+    it('should link a document through its own RPC', async () => {
+      mockSupabase.rpc = jest.fn().mockResolvedValue({ data: null, error: null });
+
+      await vectorDb.linkDocumentChunks('test-doc');
+
+      expect(mockSupabase.rpc).toHaveBeenCalledWith('link_document_chunks', {
+        p_document_id: 'test-doc',
+      });
+    });
+
+    it('should apply re-ingest changes through one RPC', async () => {
+      mockSupabase.rpc = jest.fn().mockResolvedValue({ data: null, error: null });
+      const update = {
+        id: 'chunk-2',
+        chunk_index: 3,
+        chunk_type: 'text' as const,
+        chunk_text: 'Moved',
+        chunk_metadata: { chunkIndex: 3 },
+      };
+
+      await vectorDb.applyDocumentChunkChanges('test-doc', ['chunk-1'], [update]);
+
+      expect(mockSupabase.rpc).toHaveBeenCalledWith('apply_document_chunk_changes', {
+        p_document_id: 'test-doc',
+        p_delete_ids: ['chunk-1'],
+        p_updates: [update],
+      });
+    });
+
+    it('should reject invalid vectors before calling the ingest RPC', async () => {
+      mockSupabase.rpc = jest.fn();
+
+      await expect(
+        vectorDb.ingestChunksWithEmbeddings('test-tenant', 'test-doc', [
+          {
+            chunk_index: 0,
+            chunk_type: 'text',
+            chunk_text: 'First',
+            chunk_metadata: {},
+            embedding: [0.1],
+          },
+        ]),
+      ).rejects.toThrow('Invalid embedding dimension');
+      expect(mockSupabase.rpc).not.toHaveBeenCalled();
+    });
   });
 
   describe('Health Check Operations', () => {
@@ -300,7 +564,12 @@ describe('Vector Database Integration Tests', () => {
         limit: 10,
       };
 
-      // Should attempt vector search and get the "not implemented" error
+      mockSupabase.rpc = jest.fn().mockResolvedValue({
+        data: null,
+        error: { message: 'function match_embeddings does not exist' },
+      });
+
+      // Should attempt vector search and degrade to null when the RPC fails
       await expect(searchWithVectors(searchParams)).resolves.toBeNull();
     });
   });
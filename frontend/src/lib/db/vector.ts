@@ -1,7 +1,13 @@
 import { supabase } from '../supabaseClient';
+import { instrumentMethods } from '../metrics';
 import type {
+  BulkInsertOptions,
+  ChunkIngestRow,
+  ChunkUpdateRow,
   Embedding,
   DocumentChunk,
+  StoredChunkHash,
+  VectorBatchSearchParams,
   VectorSearchParams,
   VectorSearchResult,
 } from '../types/vector';
@@ -12,16 +18,160 @@ import type {
 const BATCH_SIZE = 1000;
 
 /**
- * Vector database operations with connection pooling best practices
+ * Maximum values per IN filter, keeping request URLs within PostgREST limits
+ */
+const FILTER_BATCH_SIZE = 200;
+
+/**
+ * Defaults for bulk ingest: parallel batches, no returned rows, compact vectors
+ */
+const BULK_INGEST_DEFAULTS: BulkInsertOptions = {
+  concurrency: 4,
+  returning: false,
+  vectorEncoding: 'text',
+  maxPayloadBytes: 4 * 1024 * 1024,
+};
+
+/**
+ * Errors after which a batch is retried as two smaller batches
+ */
+const PAYLOAD_ERROR_PATTERN = /payload|too large|413|timeout|canceling statement/i;
+
+/**
+ * Embedding dimensions stored in the embeddings table
+ */
+const EMBEDDING_DIMENSIONS = 1536;
+
+/**
+ * Defaults for similarity search
+ */
+const DEFAULT_SEARCH_LIMIT = 10;
+const DEFAULT_EF_SEARCH = 40;
+const DEFAULT_EXACT_SCAN_LIMIT = 10000;
+
+/**
+ * Builds the arguments shared by the match_embeddings RPC functions
+ */
+function buildSearchArgs(params: Omit<VectorSearchParams, 'query_embedding'>) {
+  if (!params.tenant_id) {
+    throw new Error('Tenant ID is required for vector search');
+  }
+
+  const limit = params.limit ?? DEFAULT_SEARCH_LIMIT;
+  if (limit <= 0) {
+    throw new Error('limit must be positive');
+  }
+
+  return {
+    p_tenant_id: params.tenant_id,
+    match_count: limit,
+    match_threshold: params.threshold ?? 0,
+    p_document_ids:
+      params.document_ids && params.document_ids.length > 0 ? params.document_ids : null,
+    p_machine_id: params.machine_id ?? null,
+    ef_search: params.ef_search ?? DEFAULT_EF_SEARCH,
+    exact_scan_limit: params.exact_scan_limit ?? DEFAULT_EXACT_SCAN_LIMIT,
+  };
+}
+
+function validateQueryEmbedding(queryEmbedding: number[]) {
+  if (!queryEmbedding || queryEmbedding.length !== EMBEDDING_DIMENSIONS) {
+    throw new Error(
+      `Invalid query embedding dimension. Expected ${EMBEDDING_DIMENSIONS}, got ${queryEmbedding?.length || 0}`,
+    );
+  }
+}
+
+/**
+ * Formats a vector as a pgvector text literal
+ *
+ * Nine significant digits round-trip float4 exactly, and the literal is
+ * roughly half the size of the default JSON number encoding.
+ */
+export function toVectorLiteral(vector: number[]): string {
+  let literal = '[';
+  for (let i = 0; i < vector.length; i++) {
+    if (i > 0) literal += ',';
+    literal += String(parseFloat(vector[i].toPrecision(9)));
+  }
+  return literal + ']';
+}
+
+function encodeEmbeddings<T extends { embedding: number[] }>(
+  rows: T[],
+  encoding: BulkInsertOptions['vectorEncoding'],
+) {
+  return encoding === 'text'
+    ? rows.map((row) => ({ ...row, embedding: toVectorLiteral(row.embedding) }))
+    : rows;
+}
+
+/**
+ * Runs batch inserts with bounded concurrency, keeping results in input order
+ *
+ * When maxPayloadBytes is set, the batch size is reduced so that a batch of
+ * rows like the first one stays under it. A batch that fails with a payload
+ * or timeout error is split in half and retried.
  */
-export const vectorDb = {
+async function insertInBatches<T, R>(
+  rows: T[],
+  batchSize: number,
+  options: BulkInsertOptions,
+  insertBatch: (batch: T[]) => Promise<R[]>,
+): Promise<R[]> {
+  let size = batchSize;
+  if (options.maxPayloadBytes && rows.length > 0) {
+    const rowBytes = JSON.stringify(rows[0]).length;
+    size = Math.min(size, Math.floor(options.maxPayloadBytes / rowBytes));
+  }
+  size = Math.max(1, size);
+
+  const batches: T[][] = [];
+  for (let i = 0; i < rows.length; i += size) {
+    batches.push(rows.slice(i, i + size));
+  }
+
+  const insertAdaptive = async (batch: T[]): Promise<R[]> => {
+    try {
+      return await insertBatch(batch);
+    } catch (error) {
+      if (batch.length > 1 && error instanceof Error && PAYLOAD_ERROR_PATTERN.test(error.message)) {
+        const middle = batch.length >>> 1;
+        const first = await insertAdaptive(batch.slice(0, middle));
+        const second = await insertAdaptive(batch.slice(middle));
+        return [...first, ...second];
+      }
+      throw error;
+    }
+  };
+
+  const results: R[][] = new Array(batches.length);
+  let next = 0;
+  const worker = async () => {
+    while (next < batches.length) {
+      const index = next++;
+      results[index] = await insertAdaptive(batches[index]);
+    }
+  };
+
+  const concurrency = Math.max(1, options.concurrency ?? 1);
+  await Promise.all(Array.from({ length: Math.min(concurrency, batches.length) }, worker));
+
+  return results.flat();
+}
+
+const vectorOperations = {
   /**
    * Insert embeddings in batch for efficiency
    * @param embeddings - Array of embedding objects to insert
+   * @param options - Returned columns and vector encoding
    * @returns Promise<Embedding[]> - Array of inserted embeddings with generated IDs
    * @throws Error if insertion fails or validation error occurs
    */
-  async insertEmbeddings(embeddings: Omit<Embedding, 'id' | 'created_at' | 'updated_at'>[]) {
+  async insertEmbeddings(
+    embeddings: Omit<Embedding, 'id' | 'created_at' | 'updated_at'>[],
+    options: BulkInsertOptions = {},
+  ) {
     if (!embeddings || embeddings.length === 0) {
       throw new Error('Cannot insert empty embeddings array');
     }
@@ -35,7 +185,12 @@ export const vectorDb = {
       }
     }
 
-    const { data, error } = await supabase.from('embeddings').insert(embeddings).select();
+    const query = supabase
+      .from('embeddings')
+      .insert(encodeEmbeddings(embeddings, options.vectorEncoding));
+    const { data, error } = await (options.returning === false
+      ? query
+      : query.select(options.returning));
 
     if (error) {
       throw new Error(`Failed to insert embeddings: ${error.message}`);
@@ -48,34 +203,51 @@ export const vectorDb = {
    * Insert embeddings in batches for large datasets
    * @param embeddings - Array of embedding objects to insert
    * @param batchSize - Number of embeddings per batch (default: 1000)
+   * @param options - Concurrency, returned columns, vector encoding and payload limit
    * @returns Promise<Embedding[]> - Array of all inserted embeddings
    */
   async insertEmbeddingsBatch(
     embeddings: Omit<Embedding, 'id' | 'created_at' | 'updated_at'>[],
     batchSize: number = BATCH_SIZE,
-  ) {
+    options: BulkInsertOptions = {},
+  ): Promise<Embedding[]> {
     if (!embeddings || embeddings.length === 0) {
       return [];
     }
 
-    const results: Embedding[] = [];
-
-    for (let i = 0; i < embeddings.length; i += batchSize) {
-      const batch = embeddings.slice(i, i + batchSize);
-      const batchResult = await this.insertEmbeddings(batch);
-      results.push(...batchResult);
-    }
+    return insertInBatches(embeddings, batchSize, options, (batch) =>
+      this.insertEmbeddings(batch, options),
+    );
+  },
 
-    return results;
+  /**
+   * Insert embeddings for throughput rather than convenience
+   * @param embeddings - Array of embedding objects to insert
+   * @param options - Overrides for the bulk defaults (4 batches in flight, no returned rows,
+   *   pgvector text literals, 4 MB payloads)
+   * @returns Promise<Embedding[]> - Inserted rows if options.returning is set, otherwise []
+   */
+  async bulkInsertEmbeddings(
+    embeddings: Omit<Embedding, 'id' | 'created_at' | 'updated_at'>[],
+    options: BulkInsertOptions = {},
+  ): Promise<Embedding[]> {
+    return this.insertEmbeddingsBatch(embeddings, BATCH_SIZE, {
+      ...BULK_INGEST_DEFAULTS,
+      ...options,
+    });
   },
 
   /**
    * Insert document chunks in batch
    * @param chunks - Array of document chunk objects to insert
+   * @param options - Returned columns
    * @returns Promise<DocumentChunk[]> - Array of inserted chunks with generated IDs
    * @throws Error if insertion fails or validation error occurs
    */
-  async insertDocumentChunks(chunks: Omit<DocumentChunk, 'id' | 'created_at' | 'updated_at'>[]) {
+  async insertDocumentChunks(
+    chunks: Omit<DocumentChunk, 'id' | 'created_at' | 'updated_at'>[],
+    options: BulkInsertOptions = {},
+  ) {
     if (!chunks || chunks.length === 0) {
       throw new Error('Cannot insert empty chunks array');
     }
@@ -90,7 +262,10 @@ export const vectorDb = {
       }
     }
 
-    const { data, error } = await supabase.from('document_chunks').insert(chunks).select();
+    const query = supabase.from('document_chunks').insert(chunks);
+    const { data, error } = await (options.returning === false
+      ? query
+      : query.select(options.returning));
 
     if (error) {
       throw new Error(`Failed to insert document chunks: ${error.message}`);
@@ -103,34 +278,150 @@ export const vectorDb = {
    * Insert document chunks in batches for large datasets
    * @param chunks - Array of document chunk objects to insert
    * @param batchSize - Number of chunks per batch (default: 1000)
+   * @param options - Concurrency, returned columns and payload limit
    * @returns Promise<DocumentChunk[]> - Array of all inserted chunks
    */
   async insertDocumentChunksBatch(
     chunks: Omit<DocumentChunk, 'id' | 'created_at' | 'updated_at'>[],
     batchSize: number = BATCH_SIZE,
-  ) {
+    options: BulkInsertOptions = {},
+  ): Promise<DocumentChunk[]> {
     if (!chunks || chunks.length === 0) {
       return [];
     }
 
-    const results: DocumentChunk[] = [];
+    return insertInBatches(chunks, batchSize, options, (batch) =>
+      this.insertDocumentChunks(batch, options),
+    );
+  },
 
-    for (let i = 0; i < chunks.length; i += batchSize) {
-      const batch = chunks.slice(i, i + batchSize);
-      const batchResult = await this.insertDocumentChunks(batch);
-      results.push(...batchResult);
+  /**
+   * Insert chunks together with their embeddings through the ingest_document_chunks RPC
+   *
+   * Each batch is written in one transaction, so a chunk never exists without
+   * its embedding. Previous/next links are not set, since batches run
+   * concurrently; call linkDocumentChunks once all writes for the document are done.
+   * @param tenantId - Tenant owning the document
+   * @param documentId - Document the chunks belong to
+   * @param rows - Chunk fields plus chunk text, metadata and vector
+   * @param options - Concurrency, vector encoding and payload limit (bulk defaults apply)
+   * @returns Promise<number> - Number of chunks written
+   * @throws Error if validation fails or any batch fails
+   */
+  async ingestChunksWithEmbeddings(
+    tenantId: string,
+    documentId: string,
+    rows: ChunkIngestRow[],
+    options: BulkInsertOptions = {},
+  ): Promise<number> {
+    if (!tenantId || !documentId) {
+      throw new Error('Missing required fields: tenant_id and document_id are required');
+    }
+    if (!rows || rows.length === 0) {
+      return 0;
     }
 
-    return results;
+    for (const row of rows) {
+      if (!row.embedding || row.embedding.length !== EMBEDDING_DIMENSIONS) {
+        throw new Error(
+          `Invalid embedding dimension. Expected ${EMBEDDING_DIMENSIONS}, got ${row.embedding?.length || 0}`,
+        );
+      }
+    }
+
+    const settings = { ...BULK_INGEST_DEFAULTS, ...options };
+    const counts = await insertInBatches(
+      encodeEmbeddings(rows, settings.vectorEncoding),
+      BATCH_SIZE,
+      settings,
+      async (batch) => {
+        const { data, error } = await supabase.rpc('ingest_document_chunks', {
+          p_tenant_id: tenantId,
+          p_document_id: documentId,
+          p_chunks: batch,
+        });
+
+        if (error) {
+          throw new Error(`Failed to ingest document chunks: ${error.message}`);
+        }
+        return [(data as number) ?? batch.length];
+      },
+    );
+
+    return counts.reduce((sum, count) => sum + count, 0);
   },
 
   /**
-   * Perform vector similarity search
-   * Note: This will be implemented as a Supabase function in a future story
+   * Set previous_chunk_id and next_chunk_id for every chunk of a document
+   * from chunk_index order
+   * @param documentId - UUID of the document
+   * @throws Error if the RPC fails
+   */
+  async linkDocumentChunks(documentId: string) {
+    if (!documentId) {
+      throw new Error('Document ID is required');
+    }
+
+    const { error } = await supabase.rpc('link_document_chunks', {
+      p_document_id: documentId,
+    });
+
+    if (error) {
+      throw new Error(`Failed to link document chunks: ${error.message}`);
+    }
+  },
+
+  /**
+   * Perform vector similarity search scoped to a tenant
+   * @param params - Query embedding, tenant, optional document or machine filter and ef_search
+   * @returns Promise<VectorSearchResult[]> - Matches ordered by descending similarity
+   * @throws Error if validation fails or the search RPC fails
    */
   async searchSimilar(params: VectorSearchParams): Promise<VectorSearchResult[]> {
-    // Placeholder for vector search - will be implemented as RPC function
-    throw new Error('Vector search not yet implemented - requires Supabase function');
+    validateQueryEmbedding(params.query_embedding);
+
+    const { data, error } = await supabase.rpc('match_embeddings', {
+      query_embedding: params.query_embedding,
+      ...buildSearchArgs(params),
+    });
+
+    if (error) {
+      throw new Error(`Failed to search embeddings: ${error.message}`);
+    }
+
+    return (data as VectorSearchResult[]) || [];
+  },
+
+  /**
+   * Perform several similarity searches in one round trip
+   * @param params - Query embeddings plus the filters applied to every query
+   * @returns Promise<VectorSearchResult[][]> - Matches for each query embedding, in input order
+   * @throws Error if validation fails or the search RPC fails
+   */
+  async searchSimilarBatch(params: VectorBatchSearchParams): Promise<VectorSearchResult[][]> {
+    const { query_embeddings, ...filters } = params;
+
+    if (!query_embeddings || query_embeddings.length === 0) {
+      return [];
+    }
+    query_embeddings.forEach(validateQueryEmbedding);
+
+    const { data, error } = await supabase.rpc('match_embeddings_batch', {
+      query_embeddings,
+      ...buildSearchArgs(filters),
+    });
+
+    if (error) {
+      throw new Error(`Failed to search embeddings: ${error.message}`);
+    }
+
+    const results: VectorSearchResult[][] = query_embeddings.map(() => []);
+    for (const row of (data as (VectorSearchResult & { query_index: number })[]) || []) {
+      const { query_index, ...result } = row;
+      results[query_index - 1]?.push(result);
+    }
+
+    return results;
   },
 
   /**
@@ -157,6 +448,8 @@ export const vectorDb = {
       `,
       )
       .eq('document_id', documentId)
+      // Negative indexes are staged by a re-ingest that has not been applied yet
+      .gte('chunk_index', 0)
       .order('chunk_index');
 
     if (error) {
@@ -184,6 +477,132 @@ export const vectorDb = {
     }
   },
 
+  /**
+   * List a document's chunks with the content hash, text and metadata of their embedding
+   * @param documentId - UUID of the document
+   * @returns Promise<StoredChunkHash[]> - Chunks ordered by chunk_index, without vectors
+   * @throws Error if retrieval fails
+   */
+  async getDocumentChunkHashes(documentId: string): Promise<StoredChunkHash[]> {
+    if (!documentId) {
+      throw new Error('Document ID is required');
+    }
+
+    const { data, error } = await supabase
+      .from('document_chunks')
+      .select(
+        `
+        id,
+        chunk_index,
+        chunk_type,
+        page_number,
+        section_header,
+        embeddings (
+          content_hash,
+          chunk_text,
+          chunk_metadata
+        )
+      `,
+      )
+      .eq('document_id', documentId)
+      .order('chunk_index');
+
+    if (error) {
+      throw new Error(`Failed to retrieve chunk hashes: ${error.message}`);
+    }
+
+    return (data || []).map(({ embeddings, ...chunk }: any) => ({
+      ...chunk,
+      content_hash: embeddings?.[0]?.content_hash ?? null,
+      chunk_text: embeddings?.[0]?.chunk_text ?? null,
+      chunk_metadata: embeddings?.[0]?.chunk_metadata ?? null,
+    }));
+  },
+
+  /**
+   * Look up stored vectors by content hash within a tenant
+   * @param tenantId - Tenant whose embeddings may be reused
+   * @param hashes - Content hashes to look up
+   * @returns Promise<Map<string, number[]>> - Vector for each hash that has one
+   * @throws Error if retrieval fails
+   */
+  async findEmbeddingsByHash(tenantId: string, hashes: string[]): Promise<Map<string, number[]>> {
+    const vectors = new Map<string, number[]>();
+    const unique = Array.from(new Set(hashes));
+
+    for (let i = 0; i < unique.length; i += FILTER_BATCH_SIZE) {
+      const { data, error } = await supabase
+        .from('embeddings')
+        .select('content_hash, embedding')
+        .eq('tenant_id', tenantId)
+        .in('content_hash', unique.slice(i, i + FILTER_BATCH_SIZE));
+
+      if (error) {
+        throw new Error(`Failed to look up embeddings: ${error.message}`);
+      }
+
+      for (const row of data || []) {
+        // pgvector columns are returned in their text form, e.g. "[0.1,0.2]"
+        const embedding =
+          typeof row.embedding === 'string' ? JSON.parse(row.embedding) : row.embedding;
+        if (row.content_hash && embedding) {
+          vectors.set(row.content_hash, embedding);
+        }
+      }
+    }
+
+    return vectors;
+  },
+
+  /**
+   * Delete specific chunks and, via cascade, their embeddings
+   * @param chunkIds - UUIDs of the chunks to delete
+   * @throws Error if deletion fails
+   */
+  async deleteDocumentChunks(chunkIds: string[]) {
+    for (let i = 0; i < chunkIds.length; i += FILTER_BATCH_SIZE) {
+      const { error } = await supabase
+        .from('document_chunks')
+        .delete()
+        .in('id', chunkIds.slice(i, i + FILTER_BATCH_SIZE));
+
+      if (error) {
+        throw new Error(`Failed to delete document chunks: ${error.message}`);
+      }
+    }
+  },
+
+  /**
+   * Finish a re-ingest in one transaction
+   *
+   * Deletes stale chunks, rewrites kept chunks in place, moves chunks written at
+   * a staging chunk_index of -(chunk_index + 1) to their final index and
+   * re-links neighbours.
+   * @param documentId - UUID of the document
+   * @param deleteIds - UUIDs of chunks that no longer exist
+   * @param updates - New position, text and metadata for kept chunks
+   * @throws Error if the RPC fails
+   */
+  async applyDocumentChunkChanges(
+    documentId: string,
+    deleteIds: string[],
+    updates: ChunkUpdateRow[],
+  ) {
+    if (!documentId) {
+      throw new Error('Document ID is required');
+    }
+
+    const { error } = await supabase.rpc('apply_document_chunk_changes', {
+      p_document_id: documentId,
+      p_delete_ids: deleteIds,
+      p_updates: updates,
+    });
+
+    if (error) {
+      throw new Error(`Failed to apply document chunk changes: ${error.message}`);
+    }
+  },
+
   /**
    * Health check for vector database connectivity and extension status
    * @returns Promise<{connected: boolean, vectorEnabled: boolean, error: string | null}>
@@ -215,6 +634,13 @@ export const vectorDb = {
   },
 };
 
+/**
+ * Vector database operations with connection pooling best practices
+ *
+ * Every call is timed in pipelineMetrics as `vector.<method>`.
+ */
+export const vectorDb = instrumentMethods('vector', vectorOperations);
+
 /**
  * Utility function for retrying operations
  */
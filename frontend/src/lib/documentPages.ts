@@ -0,0 +1,61 @@
+import { supabase } from './supabaseClient';
+import { DocumentPage, PdfExtractionJob } from '../types/document';
+import { PDFContent } from './types/chunking';
+
+const PAGE_FETCH_SIZE = 50;
+
+/**
+ * Streams a document's extracted pages in page order for chunking
+ *
+ * Pages are fetched PAGE_FETCH_SIZE at a time, so the result can be passed
+ * straight to ChunkingService.streamDocument without loading the whole
+ * manual. Pages still being extracted are not waited for.
+ */
+export async function* streamDocumentPages(
+  documentId: string,
+  fromPage = 1,
+  pageSize = PAGE_FETCH_SIZE,
+): AsyncGenerator<PDFContent> {
+  let nextPage = fromPage;
+
+  while (true) {
+    const { data, error } = await supabase
+      .from('document_pages')
+      .select('page_number, text')
+      .eq('document_id', documentId)
+      .gte('page_number', nextPage)
+      .order('page_number', { ascending: true })
+      .limit(pageSize);
+
+    if (error) {
+      throw new Error(`Failed to fetch document pages: ${error.message}`);
+    }
+
+    const pages = (data || []) as Pick<DocumentPage, 'page_number' | 'text'>[];
+    for (const page of pages) {
+      yield { text: page.text, pageNumber: page.page_number };
+    }
+
+    if (pages.length < pageSize) {
+      return;
+    }
+    nextPage = pages[pages.length - 1].page_number + 1;
+  }
+}
+
+/**
+ * Get extraction progress for a document, or null if extraction has not started
+ */
+export async function getExtractionJob(documentId: string): Promise<PdfExtractionJob | null> {
+  const { data, error } = await supabase
+    .from('pdf_extraction_jobs')
+    .select('id, document_id, status, total_pages, next_page, pages_extracted, error_message')
+    .eq('document_id', documentId)
+    .maybeSingle();
+
+  if (error) {
+    throw new Error(`Failed to fetch extraction job: ${error.message}`);
+  }
+
+  return data as PdfExtractionJob | null;
+}
@@ -0,0 +1,99 @@
+/**
+ * @jest-environment node
+ */
+
+/**
+ * Tests for embedders and batched embedding
+ */
+
+import { DeterministicEmbedder, TextEmbedder, embedInBatches } from '../embedder';
+
+describe('DeterministicEmbedder', () => {
+  it('should return identical unit vectors for identical text', async () => {
+    const embedder = new DeterministicEmbedder();
+
+    const [first, second, other] = await embedder.embed(['pump seal', 'pump seal', 'belt']);
+
+    expect(first).toHaveLength(1536);
+    expect(first).toEqual(second);
+    expect(first).not.toEqual(other);
+    expect(Math.sqrt(first.reduce((sum, v) => sum + v * v, 0))).toBeCloseTo(1, 6);
+  });
+});
+
+describe('embedInBatches', () => {
+  it('should split texts into batches and keep input order', async () => {
+    const embedder = new DeterministicEmbedder(8, 3);
+    const texts = Array.from({ length: 10 }, (_, i) => `text ${i}`);
+
+    const vectors = await embedInBatches(embedder, texts, { concurrency: 2 });
+
+    expect(embedder.calls.map((batch) => batch.length)).toEqual([3, 3, 3, 1]);
+    expect(vectors).toEqual(await new DeterministicEmbedder(8).embed(texts));
+  });
+
+  it('should respect the concurrency limit', async () => {
+    let inFlight = 0;
+    let maxInFlight = 0;
+    const embedder: TextEmbedder = {
+      model: 'slow',
+      dimensions: 2,
+      maxBatchSize: 1,
+      async embed(texts) {
+        inFlight++;
+        maxInFlight = Math.max(maxInFlight, inFlight);
+        await new Promise((resolve) => setTimeout(resolve, 5));
+        inFlight--;
+        return texts.map(() => [0, 1]);
+      },
+    };
+
+    await embedInBatches(embedder, new Array(12).fill('x'), { concurrency: 3 });
+
+    expect(maxInFlight).toBe(3);
+  });
+
+  it('should reject vectors of the wrong dimension', async () => {
+    const embedder: TextEmbedder = {
+      model: 'broken',
+      dimensions: 4,
+      maxBatchSize: 10,
+      embed: async (texts) => texts.map(() => [0, 1]),
+    };
+
+    await expect(embedInBatches(embedder, ['a'])).rejects.toThrow(
+      'Invalid embedding dimension. Expected 4, got 2',
+    );
+  });
+
+  it('should stop starting batches once one fails', async () => {
+    let calls = 0;
+    const embedder: TextEmbedder = {
+      model: 'flaky',
+      dimensions: 2,
+      maxBatchSize: 1,
+      async embed(texts) {
+        const call = ++calls;
+        await new Promise((resolve) => setTimeout(resolve, 5));
+        if (call === 1) {
+          throw new Error('rate limited');
+        }
+        return texts.map(() => [0, 1]);
+      },
+    };
+
+    await expect(
+      embedInBatches(embedder, new Array(20).fill('x'), { concurrency: 2 }),
+    ).rejects.toThrow('rate limited');
+    await new Promise((resolve) => setTimeout(resolve, 20));
+
+    expect(calls).toBe(2);
+  });
+
+  it('should not call the embedder for no texts', async () => {
+    const embedder = new DeterministicEmbedder();
+
+    expect(await embedInBatches(embedder, [])).toEqual([]);
+    expect(embedder.calls).toHaveLength(0);
+  });
+});
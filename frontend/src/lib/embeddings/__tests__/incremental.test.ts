@@ -0,0 +1,399 @@
+/**
+ * @jest-environment node
+ */
+
+/**
+ * Tests for incremental, content-addressed chunk ingestion
+ */
+
+import { DeterministicEmbedder } from '../embedder';
+import { diffChunks, hashChunkText, hashChunks, ingestDocumentChunks } from '../incremental';
+import { generateManualContent } from '../../benchmarks/syntheticManual';
+import { DocumentChunker } from '../../chunking/algorithm';
+import { vectorDb } from '../../db/vector';
+import { DocumentChunk } from '../../types/chunking';
+import { ChunkType } from '../../types/vector';
+
+jest.mock('../../db/vector', () => ({
+  vectorDb: {
+    getDocumentChunkHashes: jest.fn(),
+    findEmbeddingsByHash: jest.fn(),
+    deleteDocumentChunks: jest.fn(),
+    ingestChunksWithEmbeddings: jest.fn(),
+    applyDocumentChunkChanges: jest.fn(),
+    linkDocumentChunks: jest.fn(),
+  },
+}));
+
+const mockDb = vectorDb as jest.Mocked<typeof vectorDb>;
+
+function createChunk(index: number, content: string): DocumentChunk {
+  return {
+    id: `chunk-${index}`,
+    content,
+    metadata: {
+      id: `chunk-${index}`,
+      documentId: 'doc-1',
+      chunkIndex: index,
+      startPage: 1,
+      endPage: 1,
+      contentType: {
+        hasTable: false,
+        hasList: false,
+        hasImage: false,
+        hasCode: false,
+        hasDiagram: false,
+      },
+    },
+    relationships: { childChunkIds: [], hierarchyLevel: 0 },
+    tenantId: 'tenant-1',
+    createdAt: new Date(),
+    updatedAt: new Date(),
+  };
+}
+
+/**
+ * In-memory stand-in for the document_chunks and embeddings tables
+ */
+function useFakeTables() {
+  let nextId = 0;
+  const rows = new Map<
+    string,
+    {
+      chunk_index: number;
+      chunk_type: ChunkType;
+      page_number: number | null;
+      section_header: string | null;
+      hash: string;
+      embedding: number[];
+      chunk_text: string;
+      chunk_metadata: Record<string, any>;
+    }
+  >();
+  const assertUniqueIndexes = () => {
+    const indexes = Array.from(rows.values()).map((row) => row.chunk_index);
+    expect(new Set(indexes).size).toBe(indexes.length);
+  };
+
+  mockDb.getDocumentChunkHashes.mockImplementation(async () =>
+    Array.from(rows, ([id, row]) => ({
+      id,
+      chunk_index: row.chunk_index,
+      chunk_type: row.chunk_type,
+      page_number: row.page_number,
+      section_header: row.section_header,
+      content_hash: row.hash,
+      chunk_text: row.chunk_text,
+      // Stored metadata comes back from JSON, without Dates or undefined keys
+      chunk_metadata: JSON.parse(JSON.stringify(row.chunk_metadata)),
+    })),
+  );
+  mockDb.findEmbeddingsByHash.mockImplementation(async (_tenantId, hashes) => {
+    const found = new Map<string, number[]>();
+    rows.forEach((row) => {
+      if (hashes.includes(row.hash)) found.set(row.hash, row.embedding);
+    });
+    return found;
+  });
+  mockDb.deleteDocumentChunks.mockImplementation(async (ids) => {
+    ids.forEach((id) => rows.delete(id));
+  });
+  mockDb.ingestChunksWithEmbeddings.mockImplementation(async (_tenantId, _documentId, chunks) => {
+    chunks.forEach((chunk) => {
+      rows.set(`row-${nextId++}`, {
+        chunk_index: chunk.chunk_index,
+        chunk_type: chunk.chunk_type ?? 'text',
+        page_number: chunk.page_number ?? null,
+        section_header: chunk.section_header ?? null,
+        hash: chunk.content_hash!,
+        embedding: chunk.embedding,
+        chunk_text: chunk.chunk_text,
+        chunk_metadata: chunk.chunk_metadata,
+      });
+    });
+    // chunk_index is unique per document outside of applyDocumentChunkChanges
+    assertUniqueIndexes();
+    return chunks.length;
+  });
+  mockDb.applyDocumentChunkChanges.mockImplementation(async (_documentId, deleteIds, updates) => {
+    deleteIds.forEach((id) => rows.delete(id));
+    updates.forEach((update) => {
+      const row = rows.get(update.id)!;
+      row.chunk_index = update.chunk_index;
+      row.chunk_type = update.chunk_type;
+      row.page_number = update.page_number;
+      row.section_header = update.section_header;
+      row.chunk_text = update.chunk_text;
+      row.chunk_metadata = update.chunk_metadata;
+    });
+    rows.forEach((row) => {
+      if (row.chunk_index < 0) row.chunk_index = -row.chunk_index - 1;
+    });
+    assertUniqueIndexes();
+  });
+
+  return rows;
+}
+
+describe('hashChunkText', () => {
+  it('should ignore differences removed by normalization', () => {
+    expect(hashChunkText('Replace   the  seal.')).toBe(hashChunkText('Replace the seal.'));
+    expect(hashChunkText('Replace the seal.')).not.toBe(hashChunkText('Replace the pump.'));
+  });
+});
+
+describe('diffChunks', () => {
+  const row = (id: string, chunkIndex: number, contentHash: string | null, text = '') => ({
+    id,
+    chunk_index: chunkIndex,
+    chunk_type: 'text' as const,
+    page_number: 1,
+    content_hash: contentHash,
+    chunk_text: text,
+    chunk_metadata: null,
+  });
+
+  it('should match rows by hash and replace changed and unhashed ones', () => {
+    const incoming = hashChunks([
+      createChunk(0, 'Intro text'),
+      createChunk(1, 'Changed text'),
+      createChunk(2, 'Moved text'),
+    ]);
+    const stored = [
+      {
+        ...row('a', 0, incoming[0].hash, 'Intro text'),
+        chunk_metadata: JSON.parse(JSON.stringify(incoming[0].chunk.metadata)),
+      },
+      row('b', 1, 'old'),
+      row('c', 3, incoming[2].hash),
+      row('d', 2, null),
+    ];
+
+    const diff = diffChunks(stored, incoming);
+
+    expect(diff.unchanged.map((m) => m.row.id)).toEqual(['a']);
+    expect(diff.updated.map((m) => [m.row.id, m.chunk.chunkIndex])).toEqual([['c', 2]]);
+    expect(diff.deleted.map((row) => row.id)).toEqual(['b', 'd']);
+    expect(diff.inserted.map((c) => c.chunkIndex)).toEqual([1]);
+  });
+
+  it('should pair repeated chunks with stored rows in index order', () => {
+    const incoming = hashChunks([
+      createChunk(0, 'See warning'),
+      createChunk(1, 'Step one'),
+      createChunk(2, 'See warning'),
+    ]);
+    const hash = incoming[0].hash;
+    const stored = [row('late', 5, hash), row('early', 0, hash), row('extra', 9, hash)];
+
+    const diff = diffChunks(stored, incoming);
+
+    expect(diff.updated.map((m) => [m.row.id, m.chunk.chunkIndex])).toEqual([
+      ['early', 0],
+      ['late', 2],
+    ]);
+    expect(diff.deleted.map((row) => row.id)).toEqual(['extra']);
+    expect(diff.inserted.map((c) => c.chunkIndex)).toEqual([1]);
+  });
+
+  it('should never match rows left at a staging index', () => {
+    const incoming = hashChunks([createChunk(0, 'Step one')]);
+
+    const diff = diffChunks([row('staged', -1, incoming[0].hash)], incoming);
+
+    expect(diff.deleted.map((row) => row.id)).toEqual(['staged']);
+    expect(diff.inserted).toHaveLength(1);
+  });
+});
+
+describe('ingestDocumentChunks', () => {
+  const options = () => ({
+    tenantId: 'tenant-1',
+    documentId: 'doc-1',
+    embedder: new DeterministicEmbedder(),
+  });
+
+  beforeEach(() => {
+    jest.clearAllMocks();
+  });
+
+  it('should embed and insert every chunk on first ingest', async () => {
+    const rows = useFakeTables();
+    const chunks = [createChunk(0, 'Check oil level'), createChunk(1, 'Replace filter')];
+
+    const stats = await ingestDocumentChunks(chunks, options());
+
+    expect(stats).toEqual({
+      unchanged: 0,
+      updated: 0,
+      deleted: 0,
+      inserted: 2,
+      reused: 0,
+      embedded: 2,
+    });
+    expect(Array.from(rows.values()).map((row) => row.chunk_index)).toEqual([0, 1]);
+    expect(mockDb.deleteDocumentChunks).not.toHaveBeenCalled();
+    expect(mockDb.applyDocumentChunkChanges).not.toHaveBeenCalled();
+    expect(mockDb.linkDocumentChunks).toHaveBeenCalledTimes(1);
+    expect(mockDb.linkDocumentChunks).toHaveBeenCalledWith('doc-1');
+  });
+
+  it('should only touch changed chunks when a revised manual is ingested', async () => {
+    const rows = useFakeTables();
+    const original = ['Check oil level', 'Replace filter', 'Torque specs'];
+    await ingestDocumentChunks(original.map((text, i) => createChunk(i, text)), options());
+
+    const revised = ['Check oil level', 'Replace filter monthly', 'Torque specs'];
+    const revision = options();
+    const stats = await ingestDocumentChunks(
+      revised.map((text, i) => createChunk(i, text)),
+      revision,
+    );
+
+    expect(stats).toEqual({
+      unchanged: 2,
+      updated: 0,
+      deleted: 1,
+      inserted: 1,
+      reused: 0,
+      embedded: 1,
+    });
+    expect(revision.embedder.calls.flat()).toEqual([
+      expect.stringContaining('Replace filter monthly'),
+    ]);
+    expect(
+      Array.from(rows.values())
+        .sort((a, b) => a.chunk_index - b.chunk_index)
+        .map((row) => row.chunk_text),
+    ).toEqual(revised);
+  });
+
+  it('should update moved chunks in place instead of replacing them', async () => {
+    const rows = useFakeTables();
+    const original = ['Check oil level', 'Replace filter'];
+    await ingestDocumentChunks(original.map((text, i) => createChunk(i, text)), options());
+    const originalIds = Array.from(rows.keys());
+
+    // A new first chunk shifts every existing chunk down by one
+    const revised = ['New safety notice', ...original];
+    const revision = options();
+    const stats = await ingestDocumentChunks(
+      revised.map((text, i) => createChunk(i, text)),
+      revision,
+    );
+
+    expect(stats).toEqual({
+      unchanged: 0,
+      updated: 2,
+      deleted: 0,
+      inserted: 1,
+      reused: 0,
+      embedded: 1,
+    });
+    expect(revision.embedder.calls.flat()).toEqual([expect.stringContaining('New safety notice')]);
+    expect(originalIds.map((id) => rows.get(id)!.chunk_index)).toEqual([1, 2]);
+    expect(originalIds.map((id) => rows.get(id)!.chunk_metadata.chunkIndex)).toEqual([1, 2]);
+    expect(
+      Array.from(rows.values())
+        .sort((a, b) => a.chunk_index - b.chunk_index)
+        .map((row) => row.chunk_text),
+    ).toEqual(revised);
+  });
+
+  it('should rewrite rows whose metadata changed even if their text did not', async () => {
+    const rows = useFakeTables();
+    const chunk = createChunk(0, 'Check oil level');
+    await ingestDocumentChunks([chunk], options());
+
+    const retitled = createChunk(0, 'Check oil level');
+    retitled.metadata.documentTitle = 'Press 200 Manual, rev B';
+    const stats = await ingestDocumentChunks([retitled], options());
+
+    expect(stats).toMatchObject({ unchanged: 0, updated: 1, inserted: 0, embedded: 0 });
+    expect(Array.from(rows.values())[0].chunk_metadata.documentTitle).toBe(
+      'Press 200 Manual, rev B',
+    );
+  });
+
+  it('should leave stored rows untouched when embedding fails', async () => {
+    const rows = useFakeTables();
+    await ingestDocumentChunks([createChunk(0, 'Check oil level')], options());
+    jest.clearAllMocks();
+
+    const embedder = new DeterministicEmbedder();
+    jest.spyOn(embedder, 'embed').mockRejectedValue(new Error('rate limited'));
+
+    await expect(
+      ingestDocumentChunks([createChunk(0, 'Check coolant level')], {
+        ...options(),
+        embedder,
+      }),
+    ).rejects.toThrow('rate limited');
+    expect(mockDb.deleteDocumentChunks).not.toHaveBeenCalled();
+    expect(mockDb.applyDocumentChunkChanges).not.toHaveBeenCalled();
+    expect(Array.from(rows.values()).map((row) => row.chunk_text)).toEqual(['Check oil level']);
+  });
+
+  it('should relink the document when chunks are only removed', async () => {
+    const rows = useFakeTables();
+    const original = ['Check oil level', 'Replace filter', 'Torque specs'];
+    await ingestDocumentChunks(original.map((text, i) => createChunk(i, text)), options());
+    jest.clearAllMocks();
+
+    const stats = await ingestDocumentChunks(
+      [createChunk(0, 'Check oil level'), createChunk(1, 'Torque specs')],
+      options(),
+    );
+
+    expect(stats).toMatchObject({ unchanged: 1, updated: 1, deleted: 1, inserted: 0 });
+    expect(mockDb.ingestChunksWithEmbeddings).not.toHaveBeenCalled();
+    expect(mockDb.deleteDocumentChunks).not.toHaveBeenCalled();
+    expect(mockDb.applyDocumentChunkChanges).toHaveBeenCalledTimes(1);
+    expect(rows.size).toBe(2);
+  });
+
+  it('should not write anything when nothing changed', async () => {
+    useFakeTables();
+    const chunks = [createChunk(0, 'Check oil level')];
+    await ingestDocumentChunks(chunks, options());
+    jest.clearAllMocks();
+
+    const revision = options();
+    const stats = await ingestDocumentChunks(chunks, revision);
+
+    expect(stats).toEqual({
+      unchanged: 1,
+      updated: 0,
+      deleted: 0,
+      inserted: 0,
+      reused: 0,
+      embedded: 0,
+    });
+    expect(revision.embedder.calls).toHaveLength(0);
+    expect(mockDb.applyDocumentChunkChanges).not.toHaveBeenCalled();
+    expect(mockDb.ingestChunksWithEmbeddings).not.toHaveBeenCalled();
+    expect(mockDb.linkDocumentChunks).not.toHaveBeenCalled();
+  });
+
+  it('should leave real chunker output untouched when the same manual is ingested again', async () => {
+    const rows = useFakeTables();
+    const pages = generateManualContent(5);
+    const first = new DocumentChunker().chunkDocument('doc-1', 'tenant-1', pages, 'manual.pdf');
+    await ingestDocumentChunks(first, options());
+    const stored = JSON.stringify(Array.from(rows.values()));
+    jest.clearAllMocks();
+
+    // A later run records different processing times in every chunk's metadata
+    let clock = performance.now();
+    const now = jest.spyOn(performance, 'now').mockImplementation(() => (clock += 1000));
+    const second = new DocumentChunker().chunkDocument('doc-1', 'tenant-1', pages, 'manual.pdf');
+    now.mockRestore();
+
+    const stats = await ingestDocumentChunks(second, options());
+
+    expect(stats).toMatchObject({ unchanged: second.length, updated: 0, deleted: 0, inserted: 0 });
+    expect(mockDb.ingestChunksWithEmbeddings).not.toHaveBeenCalled();
+    expect(mockDb.applyDocumentChunkChanges).not.toHaveBeenCalled();
+    expect(JSON.stringify(Array.from(rows.values()))).toBe(stored);
+  });
+});
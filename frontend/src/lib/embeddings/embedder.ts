@@ -0,0 +1,131 @@
+/**
+ * Pluggable text embedders and batched, concurrency-limited embedding
+ */
+
+import { createHash } from 'crypto';
+
+/**
+ * Anything that turns texts into fixed-size vectors
+ */
+export interface TextEmbedder {
+  /** Model identifier recorded with the vectors */
+  readonly model: string;
+  /** Length of every returned vector */
+  readonly dimensions: number;
+  /** Largest number of texts accepted by a single embed call */
+  readonly maxBatchSize: number;
+  /** Returns one vector per text, in input order */
+  embed(texts: string[]): Promise<number[][]>;
+}
+
+export interface EmbedOptions {
+  /** Texts per embed call (capped at the embedder's maxBatchSize) */
+  batchSize?: number;
+  /** Embed calls allowed in flight at once */
+  concurrency?: number;
+}
+
+const DEFAULT_CONCURRENCY = 4;
+
+/**
+ * Embeds texts in batches with at most `concurrency` requests in flight
+ *
+ * When a batch fails no further batches are started; the first error is thrown.
+ * @returns Vectors in the same order as the input texts
+ * @throws Error if any batch fails or returns the wrong number of vectors
+ */
+export async function embedInBatches(
+  embedder: TextEmbedder,
+  texts: string[],
+  options: EmbedOptions = {},
+): Promise<number[][]> {
+  const batchSize = Math.max(
+    1,
+    Math.min(options.batchSize ?? embedder.maxBatchSize, embedder.maxBatchSize),
+  );
+  const concurrency = Math.max(1, options.concurrency ?? DEFAULT_CONCURRENCY);
+
+  const batchStarts: number[] = [];
+  for (let start = 0; start < texts.length; start += batchSize) {
+    batchStarts.push(start);
+  }
+
+  const vectors: number[][] = new Array(texts.length);
+  let nextBatch = 0;
+  // Set when any batch fails, so the other workers stop picking up batches
+  let failed = false;
+
+  const runWorker = async () => {
+    while (!failed && nextBatch < batchStarts.length) {
+      const start = batchStarts[nextBatch++];
+      const batch = texts.slice(start, start + batchSize);
+
+      try {
+        const result = await embedder.embed(batch);
+
+        if (result.length !== batch.length) {
+          throw new Error(`Embedder returned ${result.length} vectors for ${batch.length} texts`);
+        }
+        result.forEach((vector, i) => {
+          if (vector.length !== embedder.dimensions) {
+            throw new Error(
+              `Invalid embedding dimension. Expected ${embedder.dimensions}, got ${vector.length}`,
+            );
+          }
+          vectors[start + i] = vector;
+        });
+      } catch (error) {
+        failed = true;
+        throw error;
+      }
+    }
+  };
+
+  await Promise.all(Array.from({ length: Math.min(concurrency, batchStarts.length) }, runWorker));
+
+  return vectors;
+}
+
+/**
+ * Local embedder that derives unit vectors from a hash of the text
+ *
+ * Identical texts always produce identical vectors and no network calls are
+ * made, which makes it suitable for tests and offline development. The
+ * vectors carry no semantic meaning.
+ */
+export class DeterministicEmbedder implements TextEmbedder {
+  readonly model = 'deterministic-stub';
+  readonly maxBatchSize: number;
+  readonly calls: string[][] = [];
+
+  constructor(
+    readonly dimensions = 1536,
+    maxBatchSize = 100,
+  ) {
+    this.maxBatchSize = maxBatchSize;
+  }
+
+  async embed(texts: string[]): Promise<number[][]> {
+    this.calls.push(texts);
+    return texts.map((text) => this.embedOne(text));
+  }
+
+  private embedOne(text: string): number[] {
+    // xorshift32 seeded from the text hash
+    let state = createHash('sha256').update(text).digest().readUInt32LE(0) || 1;
+    const vector = new Array<number>(this.dimensions);
+    let norm = 0;
+
+    for (let i = 0; i < this.dimensions; i++) {
+      state ^= state << 13;
+      state ^= state >>> 17;
+      state ^= state << 5;
+      const value = (state >>> 0) / 4294967296 - 0.5;
+      vector[i] = value;
+      norm += value * value;
+    }
+
+    norm = Math.sqrt(norm) || 1;
+    return vector.map((value) => value / norm);
+  }
+}
@@ -0,0 +1,280 @@
+/**
+ * Incremental, content-addressed ingestion of document chunks
+ *
+ * Sits between DocumentChunker output and the vector tables. Each chunk is
+ * identified by a SHA-256 of its cleanForEmbedding text. When a document is
+ * re-ingested, stored rows are matched to chunks by hash: matched rows are
+ * left alone or rewritten in place, rows whose content is gone are deleted,
+ * and only content new to the document is inserted. Vectors for new rows are
+ * reused from any embedding of the tenant with the same hash, so the embedder
+ * is only called for text it has never seen.
+ */
+
+import { createHash } from 'crypto';
+import { cleanForEmbedding } from '../chunking/preprocessing';
+import { vectorDb } from '../db/vector';
+import { DocumentChunk as ChunkerChunk } from '../types/chunking';
+import { ChunkType, StoredChunkHash } from '../types/vector';
+import { EmbedOptions, TextEmbedder, embedInBatches } from './embedder';
+
+export interface IncrementalIngestOptions extends EmbedOptions {
+  tenantId: string;
+  documentId: string;
+  embedder: TextEmbedder;
+}
+
+export interface IngestStats {
+  /** Rows kept as they were */
+  unchanged: number;
+  /** Rows kept but rewritten in place with a new position, text or metadata */
+  updated: number;
+  /** Rows removed because their content no longer occurs in the document */
+  deleted: number;
+  /** Rows written for content that is new to the document */
+  inserted: number;
+  /** Inserted rows whose vector was reused from a stored embedding */
+  reused: number;
+  /** Texts sent to the embedder */
+  embedded: number;
+}
+
+export interface HashedChunk {
+  chunk: ChunkerChunk;
+  hash: string;
+  chunkIndex: number;
+  chunkType: ChunkType;
+  pageNumber: number | null;
+  sectionHeader: string | null;
+  /** chunk.metadata as stored, without fields that differ on every chunking run */
+  metadata: Record<string, unknown>;
+}
+
+export interface MatchedChunk {
+  row: StoredChunkHash;
+  chunk: HashedChunk;
+}
+
+export interface ChunkDiff {
+  unchanged: MatchedChunk[];
+  updated: MatchedChunk[];
+  deleted: StoredChunkHash[];
+  inserted: HashedChunk[];
+}
+
+/**
+ * Hash of a chunk's normalized text
+ */
+export function hashChunkText(text: string): string {
+  return createHash('sha256').update(cleanForEmbedding(text)).digest('hex');
+}
+
+/**
+ * Maps chunker content flags onto the document_chunks chunk_type column
+ */
+function toChunkType(chunk: ChunkerChunk): ChunkType {
+  const { contentType } = chunk.metadata;
+  if (contentType.hasTable) return 'table';
+  if (contentType.hasDiagram || contentType.hasImage) return 'diagram';
+  if (contentType.hasList) return 'list';
+  return 'text';
+}
+
+// Metadata describing the chunking run rather than the chunk, e.g. the
+// wall-clock timings MetadataEnhancer records, which change on every run
+const RUN_METADATA_KEYS = ['processingStats'];
+
+/**
+ * A chunk's metadata without run-specific fields
+ */
+function storedMetadata(chunk: ChunkerChunk): Record<string, unknown> {
+  const metadata: Record<string, unknown> = { ...chunk.metadata };
+  RUN_METADATA_KEYS.forEach((key) => delete metadata[key]);
+  return metadata;
+}
+
+/**
+ * Attaches content hashes and stored-row fields to chunker output
+ */
+export function hashChunks(chunks: ChunkerChunk[]): HashedChunk[] {
+  return chunks.map((chunk) => ({
+    chunk,
+    hash: hashChunkText(chunk.content),
+    chunkIndex: chunk.metadata.chunkIndex,
+    chunkType: toChunkType(chunk),
+    pageNumber: chunk.metadata.startPage ?? null,
+    sectionHeader: chunk.metadata.sectionHeader ?? null,
+    metadata: storedMetadata(chunk),
+  }));
+}
+
+/**
+ * JSON with object keys sorted, so metadata read back from jsonb (which
+ * reorders keys) compares equal to the object it was written from
+ */
+function canonicalJson(value: unknown): string {
+  return JSON.stringify(value ?? null, (_key, v) =>
+    v && typeof v === 'object' && !Array.isArray(v)
+      ? Object.keys(v)
+          .sort()
+          .reduce<Record<string, unknown>>((sorted, k) => {
+            sorted[k] = v[k];
+            return sorted;
+          }, {})
+      : v,
+  );
+}
+
+/**
+ * Whether a stored row already holds every persisted field of a chunk
+ */
+function isUnchanged(row: StoredChunkHash, c: HashedChunk): boolean {
+  return (
+    row.chunk_index === c.chunkIndex &&
+    row.chunk_type === c.chunkType &&
+    (row.page_number ?? null) === c.pageNumber &&
+    (row.section_header ?? null) === c.sectionHeader &&
+    row.chunk_text === c.chunk.content &&
+    canonicalJson(row.chunk_metadata) === canonicalJson(c.metadata)
+  );
+}
+
+/**
+ * Splits stored and incoming chunks into unchanged, updated, deleted and inserted sets
+ *
+ * Stored rows are matched to incoming chunks by content hash; when a hash
+ * occurs several times, occurrences are paired in chunk_index order. A
+ * matched row is unchanged if all its persisted fields are equal and updated
+ * otherwise (e.g. it moved, or its metadata changed), so inserting a chunk
+ * near the start of a manual rewrites later rows in place instead of
+ * replacing them. Rows without a hash (ingested before hashing existed) or
+ * left at a staging index by an interrupted re-ingest are never matched.
+ */
+export function diffChunks(stored: StoredChunkHash[], incoming: HashedChunk[]): ChunkDiff {
+  const rowsByHash = new Map<string, StoredChunkHash[]>();
+  [...stored]
+    .sort((a, b) => a.chunk_index - b.chunk_index)
+    .forEach((row) => {
+      if (!row.content_hash || row.chunk_index < 0) return;
+      const rows = rowsByHash.get(row.content_hash);
+      if (rows) {
+        rows.push(row);
+      } else {
+        rowsByHash.set(row.content_hash, [row]);
+      }
+    });
+
+  const unchanged: MatchedChunk[] = [];
+  const updated: MatchedChunk[] = [];
+  const inserted: HashedChunk[] = [];
+  const matched = new Set<StoredChunkHash>();
+
+  for (const chunk of incoming) {
+    const row = rowsByHash.get(chunk.hash)?.shift();
+    if (!row) {
+      inserted.push(chunk);
+      continue;
+    }
+    matched.add(row);
+    (isUnchanged(row, chunk) ? unchanged : updated).push({ row, chunk });
+  }
+
+  const deleted = stored.filter((row) => !matched.has(row));
+
+  return { unchanged, updated, deleted, inserted };
+}
+
+/**
+ * Columns written for a chunk, whether it is inserted or updated in place
+ */
+function chunkColumns(c: HashedChunk) {
+  return {
+    chunk_index: c.chunkIndex,
+    chunk_type: c.chunkType,
+    page_number: c.pageNumber,
+    section_header: c.sectionHeader,
+    chunk_text: c.chunk.content,
+    chunk_metadata: c.metadata,
+  };
+}
+
+/**
+ * Brings a document's stored chunks and embeddings in line with new chunker output
+ * @returns Counts of kept, updated, deleted, inserted, reused and embedded rows
+ * @throws Error if any database or embedder call fails
+ */
+export async function ingestDocumentChunks(
+  chunks: ChunkerChunk[],
+  options: IncrementalIngestOptions,
+): Promise<IngestStats> {
+  const { tenantId, documentId, embedder } = options;
+
+  const stored = await vectorDb.getDocumentChunkHashes(documentId);
+  const { unchanged, updated, deleted, inserted } = diffChunks(stored, hashChunks(chunks));
+
+  const vectors =
+    inserted.length > 0
+      ? await vectorDb.findEmbeddingsByHash(tenantId, inserted.map((c) => c.hash))
+      : new Map<string, number[]>();
+  const reused = inserted.filter((c) => vectors.has(c.hash)).length;
+
+  const missing = new Map<string, string>();
+  for (const c of inserted) {
+    if (!vectors.has(c.hash) && !missing.has(c.hash)) {
+      missing.set(c.hash, cleanForEmbedding(c.chunk.content));
+    }
+  }
+
+  // Everything that can fail slowly happens before the first write
+  const missingHashes = Array.from(missing.keys());
+  const newVectors = await embedInBatches(embedder, Array.from(missing.values()), options);
+  missingHashes.forEach((hash, i) => vectors.set(hash, newVectors[i]));
+
+  // Rows an interrupted re-ingest left at staging indexes would collide with new ones
+  const leftovers = deleted.filter((row) => row.chunk_index < 0);
+  if (leftovers.length > 0) {
+    await vectorDb.deleteDocumentChunks(leftovers.map((row) => row.id));
+  }
+
+  // New rows of a re-ingest are staged at -(chunk_index + 1) so they cannot collide
+  // with live rows; a first ingest has no live rows and writes final indexes directly
+  const staged = stored.length > leftovers.length;
+
+  if (inserted.length > 0) {
+    await vectorDb.ingestChunksWithEmbeddings(
+      tenantId,
+      documentId,
+      inserted.map((c) => ({
+        ...chunkColumns(c),
+        chunk_index: staged ? -(c.chunkIndex + 1) : c.chunkIndex,
+        embedding: vectors.get(c.hash)!,
+        content_hash: c.hash,
+      })),
+      { concurrency: options.concurrency },
+    );
+  }
+
+  const stale = deleted.filter((row) => row.chunk_index >= 0);
+  if (staged) {
+    // Deletes, in-place updates, unstaging and relinking commit together, so
+    // readers never see the document with chunks missing or links dangling
+    if (stale.length > 0 || updated.length > 0 || inserted.length > 0) {
+      await vectorDb.applyDocumentChunkChanges(
+        documentId,
+        stale.map((row) => row.id),
+        updated.map(({ row, chunk }) => ({ id: row.id, ...chunkColumns(chunk) })),
+      );
+    }
+  } else if (inserted.length > 0) {
+    // Insert batches commit in any order, so links are set once they all have
+    await vectorDb.linkDocumentChunks(documentId);
+  }
+
+  return {
+    unchanged: unchanged.length,
+    updated: updated.length,
+    deleted: deleted.length,
+    inserted: inserted.length,
+    reused,
+    embedded: missingHashes.length,
+  };
+}
@@ -0,0 +1,102 @@
+import { supabase } from './supabaseClient';
+import { Document, ManualSearchHit, ManualSearchResults } from '../types/document';
+
+// Columns needed to list documents; extracted_text is left out on purpose
+export const DOCUMENT_LIST_COLUMNS =
+  'id, machine_id, uploader_id, filename, storage_path, uploaded_at, metadata, ' +
+  'processing_status, page_count, file_size, processed_at, error_message';
+
+export const SEARCH_PAGE_SIZE = 20;
+
+export interface ManualFilters {
+  /** Only documents uploaded on or after this date */
+  uploadedAfter?: string;
+  /** Only documents whose filename ends with this, e.g. '.pdf' */
+  fileType?: string;
+}
+
+export interface HighlightSegment {
+  text: string;
+  match: boolean;
+}
+
+/**
+ * List a machine's documents, newest first, without their extracted text
+ */
+export async function listMachineDocuments(
+  machineId: string,
+  filters: ManualFilters = {},
+): Promise<Document[]> {
+  let query = supabase
+    .from('documents')
+    .select(DOCUMENT_LIST_COLUMNS)
+    .eq('machine_id', machineId)
+    .order('uploaded_at', { ascending: false });
+  if (filters.uploadedAfter) query = query.gte('uploaded_at', filters.uploadedAfter);
+  if (filters.fileType) query = query.ilike('filename', `%${filters.fileType}`);
+
+  const { data, error } = await query;
+  if (error) {
+    throw new Error(`Failed to fetch documents: ${error.message}`);
+  }
+  return (data || []) as Document[];
+}
+
+/**
+ * Full-text search over a machine's manuals
+ *
+ * Matching, ranking and snippet generation run in the database against the
+ * indexed page text, so only one page of hits with short snippets is
+ * transferred.
+ * @param offset Number of hits to skip, for loading further pages
+ * @returns Hits ranked best first, and the total number of matching documents;
+ *   no hits for a blank search
+ * @throws Error if the search RPC fails
+ */
+export async function searchManuals(
+  machineId: string,
+  searchText: string,
+  filters: ManualFilters = {},
+  offset = 0,
+  limit = SEARCH_PAGE_SIZE,
+): Promise<ManualSearchResults> {
+  // The RPC matches nothing for a blank search; skip the round trip
+  if (!searchText.trim()) {
+    return { hits: [], total: 0 };
+  }
+
+  const { data, error } = await supabase.rpc('search_manuals', {
+    p_machine_id: machineId,
+    search_text: searchText,
+    match_limit: limit,
+    match_offset: offset,
+    uploaded_after: filters.uploadedAfter || null,
+    filename_suffix: filters.fileType || null,
+  });
+
+  if (error) {
+    throw new Error(`Failed to search manuals: ${error.message}`);
+  }
+
+  const rows = (data || []) as (ManualSearchHit & { total_count: number })[];
+  return {
+    hits: rows,
+    total: rows.length > 0 ? Number(rows[0].total_count) : 0,
+  };
+}
+
+/**
+ * Split a search snippet into plain and highlighted parts
+ *
+ * Snippets mark matches with <mark></mark>; everything else is treated as
+ * plain text, so page text is never interpreted as HTML.
+ */
+export function splitHighlights(snippet: string): HighlightSegment[] {
+  const segments: HighlightSegment[] = [];
+  snippet.split(/<mark>([\s\S]*?)<\/mark>/).forEach((text, i) => {
+    if (text) {
+      segments.push({ text, match: i % 2 === 1 });
+    }
+  });
+  return segments;
+}
@@ -0,0 +1,299 @@
+/**
+ * Latency instrumentation shared by the ingest and chat pipeline
+ *
+ * Every stage (chunker phases, vectorDb operations, context retrieval, AI
+ * calls) records into one registry. Each stage keeps a histogram, so
+ * p50/p95/p99 are available without storing individual samples.
+ */
+
+// Histogram buckets grow by 5%, so reported percentiles are within 5% of the true value
+const BUCKET_GROWTH = 1.05;
+const MIN_TRACKED_MS = 0.01;
+const LOG_GROWTH = Math.log(BUCKET_GROWTH);
+
+export const PIPELINE_STAGES = {
+  chunkingExtraction: 'chunking.extraction',
+  chunkingPreprocessing: 'chunking.preprocessing',
+  chunkingChunking: 'chunking.chunking',
+  chunkingEnhancement: 'chunking.enhancement',
+  chunkingTotal: 'chunking.total',
+  contextRetrieval: 'context.retrieval',
+  contextManualExcerpts: 'context.manual_excerpts',
+  contextChatHistory: 'context.chat_history',
+  aiFirstToken: 'ai.first_token',
+  aiResponse: 'ai.response',
+} as const;
+
+export type Percentile = 'p50' | 'p95' | 'p99';
+
+export interface StageSummary {
+  count: number;
+  errors: number;
+  mean: number;
+  min: number;
+  max: number;
+  p50: number;
+  p95: number;
+  p99: number;
+}
+
+export type MetricsSnapshot = Record<string, StageSummary>;
+
+/**
+ * One structured record per stage, for log shipping or a metrics backend
+ */
+export interface StageMetricRecord extends StageSummary {
+  metric: 'pipeline.stage.latency_ms';
+  stage: string;
+  timestamp: string;
+}
+
+export type LatencyBaseline = Record<string, Partial<Record<Percentile, number>>>;
+
+export interface LatencyRegression {
+  stage: string;
+  percentile: Percentile;
+  baselineMs: number;
+  currentMs: number;
+  ratio: number;
+}
+
+export interface RegressionOptions {
+  /** Allowed relative slowdown, e.g. 0.25 for 25% */
+  tolerance?: number;
+  /** Slowdowns smaller than this are ignored, to keep fast stages from flapping */
+  minDeltaMs?: number;
+  percentiles?: Percentile[];
+}
+
+/**
+ * Milliseconds from a monotonic, sub-millisecond clock where available
+ *
+ * Use this rather than Date.now() for anything recorded as a latency; Date.now()
+ * only has millisecond resolution and can jump with the system clock.
+ */
+export function monotonicNow(): number {
+  return typeof performance !== 'undefined' ? performance.now() : Date.now();
+}
+
+function isPromiseLike(value: unknown): value is PromiseLike<unknown> {
+  return !!value && typeof (value as PromiseLike<unknown>).then === 'function';
+}
+
+/**
+ * Log-bucketed latency histogram
+ */
+export class LatencyHistogram {
+  private buckets = new Map<number, number>();
+  count = 0;
+  sum = 0;
+  min = Infinity;
+  max = 0;
+
+  record(ms: number): void {
+    const value = Math.max(0, ms);
+    const bucket =
+      value < MIN_TRACKED_MS ? -1 : Math.floor(Math.log(value / MIN_TRACKED_MS) / LOG_GROWTH);
+    this.buckets.set(bucket, (this.buckets.get(bucket) || 0) + 1);
+    this.count++;
+    this.sum += value;
+    this.min = Math.min(this.min, value);
+    this.max = Math.max(this.max, value);
+  }
+
+  /**
+   * Value below which the given percentage of samples fall
+   */
+  percentile(p: number): number {
+    if (this.count === 0) return 0;
+
+    const rank = Math.max(1, Math.ceil((p / 100) * this.count));
+    const keys = Array.from(this.buckets.keys()).sort((a, b) => a - b);
+    let seen = 0;
+    for (const key of keys) {
+      seen += this.buckets.get(key)!;
+      if (seen >= rank) {
+        const upper = key < 0 ? MIN_TRACKED_MS : MIN_TRACKED_MS * Math.pow(BUCKET_GROWTH, key + 1);
+        return Math.min(Math.max(upper, this.min), this.max);
+      }
+    }
+    return this.max;
+  }
+
+  merge(other: LatencyHistogram): void {
+    other.buckets.forEach((count, key) => {
+      this.buckets.set(key, (this.buckets.get(key) || 0) + count);
+    });
+    this.count += other.count;
+    this.sum += other.sum;
+    this.min = Math.min(this.min, other.min);
+    this.max = Math.max(this.max, other.max);
+  }
+}
+
+/**
+ * Per-stage latency histograms and error counts
+ */
+export class MetricsRegistry {
+  private histograms = new Map<string, LatencyHistogram>();
+  private errors = new Map<string, number>();
+
+  record(stage: string, ms: number, success = true): void {
+    let histogram = this.histograms.get(stage);
+    if (!histogram) {
+      histogram = new LatencyHistogram();
+      this.histograms.set(stage, histogram);
+    }
+    histogram.record(ms);
+    if (!success) {
+      this.errors.set(stage, (this.errors.get(stage) || 0) + 1);
+    }
+  }
+
+  /**
+   * Runs fn and records its duration under stage, including for async results
+   *
+   * Failures are recorded as errors and rethrown.
+   */
+  time<R>(stage: string, fn: () => R): R {
+    const start = monotonicNow();
+    let result: R;
+    try {
+      result = fn();
+    } catch (error) {
+      this.record(stage, monotonicNow() - start, false);
+      throw error;
+    }
+
+    if (isPromiseLike(result)) {
+      return Promise.resolve(result).then(
+        (value) => {
+          this.record(stage, monotonicNow() - start);
+          return value;
+        },
+        (error) => {
+          this.record(stage, monotonicNow() - start, false);
+          throw error;
+        },
+      ) as R;
+    }
+
+    this.record(stage, monotonicNow() - start);
+    return result;
+  }
+
+  /**
+   * Starts a timer for work that does not fit in one callback
+   * @returns A function that records the elapsed time when called
+   */
+  startTimer(stage: string): (success?: boolean) => number {
+    const start = monotonicNow();
+    return (success = true) => {
+      const elapsed = monotonicNow() - start;
+      this.record(stage, elapsed, success);
+      return elapsed;
+    };
+  }
+
+  getHistogram(stage: string): LatencyHistogram | undefined {
+    return this.histograms.get(stage);
+  }
+
+  snapshot(): MetricsSnapshot {
+    const snapshot: MetricsSnapshot = {};
+    this.histograms.forEach((histogram, stage) => {
+      snapshot[stage] = {
+        count: histogram.count,
+        errors: this.errors.get(stage) || 0,
+        mean: histogram.count > 0 ? histogram.sum / histogram.count : 0,
+        min: histogram.count > 0 ? histogram.min : 0,
+        max: histogram.max,
+        p50: histogram.percentile(50),
+        p95: histogram.percentile(95),
+        p99: histogram.percentile(99),
+      };
+    });
+    return snapshot;
+  }
+
+  /**
+   * Current summaries as structured records, one per stage
+   */
+  exportMetrics(): StageMetricRecord[] {
+    const timestamp = new Date().toISOString();
+    return Object.entries(this.snapshot()).map(([stage, summary]) => ({
+      metric: 'pipeline.stage.latency_ms',
+      stage,
+      timestamp,
+      ...summary,
+    }));
+  }
+
+  reset(): void {
+    this.histograms.clear();
+    this.errors.clear();
+  }
+}
+
+/**
+ * Registry used by the pipeline in this process
+ */
+export const pipelineMetrics = new MetricsRegistry();
+
+/**
+ * Wraps every method of an object so each call is timed as `${prefix}.${method}`
+ *
+ * Methods run with `this` bound to the unwrapped object, so only calls from
+ * outside are timed: a method that calls another one of the same object is
+ * recorded once, with the nested call's time included in its own.
+ */
+export function instrumentMethods<T extends object>(
+  prefix: string,
+  target: T,
+  registry: MetricsRegistry = pipelineMetrics,
+): T {
+  const instrumented = {} as Record<string, unknown>;
+  Object.entries(target).forEach(([key, value]) => {
+    instrumented[key] =
+      typeof value === 'function'
+        ? (...args: unknown[]) => registry.time(`${prefix}.${key}`, () => value.apply(target, args))
+        : value;
+  });
+  return instrumented as T;
+}
+
+/**
+ * Compares stage percentiles against a baseline
+ * @returns Stages and percentiles that are slower than the baseline allows
+ */
+export function findLatencyRegressions(
+  current: MetricsSnapshot,
+  baseline: LatencyBaseline,
+  options: RegressionOptions = {},
+): LatencyRegression[] {
+  const { tolerance = 0.25, minDeltaMs = 1, percentiles = ['p50', 'p95'] } = options;
+  const regressions: LatencyRegression[] = [];
+
+  Object.entries(baseline).forEach(([stage, expected]) => {
+    const summary = current[stage];
+    if (!summary || summary.count === 0) return;
+
+    for (const percentile of percentiles) {
+      const baselineMs = expected[percentile];
+      if (baselineMs === undefined) continue;
+
+      const currentMs = summary[percentile];
+      if (currentMs > baselineMs * (1 + tolerance) && currentMs - baselineMs > minDeltaMs) {
+        regressions.push({
+          stage,
+          percentile,
+          baselineMs,
+          currentMs,
+          ratio: baselineMs > 0 ? currentMs / baselineMs : Infinity,
+        });
+      }
+    }
+  });
+
+  return regressions;
+}
@@ -0,0 +1,186 @@
+/**
+ * Fits retrieved context and conversation history into a prompt token budget
+ *
+ * Token counts are estimated from character length; the estimate only has to
+ * keep prompts from growing without bound as sessions get longer, not to
+ * match the model's tokenizer exactly.
+ */
+
+import type { ContextData } from './contextService';
+
+export const CHARS_PER_TOKEN = 4;
+
+export interface PromptBudget {
+  /** Upper bound for system prompt, context and messages together */
+  maxInputTokens: number;
+  /** Upper bound for the retrieved manual and history context */
+  maxContextTokens: number;
+}
+
+export const DEFAULT_PROMPT_BUDGET: PromptBudget = {
+  maxInputTokens: 6000,
+  maxContextTokens: 2500,
+};
+
+// Excerpts are not truncated below this, a shorter fragment is rarely useful
+const MIN_EXCERPT_TOKENS = 100;
+
+export interface ConversationTurn {
+  sender: string;
+  text: string;
+}
+
+export interface PromptMessage {
+  role: 'user' | 'assistant';
+  content: string;
+}
+
+export interface PackPromptOptions {
+  systemPrompt: string;
+  context: ContextData;
+  conversation: ConversationTurn[];
+  userMessage: string;
+  formatContext: (context: ContextData) => string;
+  scoreContext: (context: ContextData) => number;
+  budget?: PromptBudget;
+}
+
+export interface PackedPrompt {
+  system: string;
+  messages: PromptMessage[];
+  /** The part of the retrieved context that made it into the prompt */
+  context: ContextData;
+  estimatedTokens: number;
+  /** Earlier conversation turns left out to stay within budget */
+  droppedTurns: number;
+}
+
+export function estimateTokens(text: string): number {
+  return Math.ceil(text.length / CHARS_PER_TOKEN);
+}
+
+/**
+ * Cuts text to roughly the given number of tokens at a word boundary
+ */
+export function truncateToTokens(text: string, maxTokens: number): string {
+  const maxChars = maxTokens * CHARS_PER_TOKEN;
+  if (text.length <= maxChars) {
+    return text;
+  }
+  const cut = text.slice(0, maxChars - 1);
+  const lastSpace = cut.lastIndexOf(' ');
+  return (lastSpace > maxChars / 2 ? cut.slice(0, lastSpace) : cut).trimEnd() + '…';
+}
+
+/**
+ * Keeps the highest ranked manual excerpts and history sessions that fit in maxTokens
+ *
+ * Excerpts come first since they are ranked by relevance to the question; an
+ * excerpt that does not fit whole is truncated if enough budget is left. The
+ * packed context is rescored with scoreContext, so its relevance reflects only
+ * what the model will see.
+ */
+export function packContext(
+  context: ContextData,
+  maxTokens: number,
+  formatContext: (context: ContextData) => string,
+  scoreContext: (context: ContextData) => number,
+): ContextData {
+  const packed: ContextData = {
+    manualExcerpts: [],
+    chatHistory: [],
+    relevanceScore: 0,
+  };
+  const fits = (candidate: ContextData) => estimateTokens(formatContext(candidate)) <= maxTokens;
+
+  for (const excerpt of context.manualExcerpts) {
+    const withExcerpt = { ...packed, manualExcerpts: [...packed.manualExcerpts, excerpt] };
+    if (fits(withExcerpt)) {
+      packed.manualExcerpts.push(excerpt);
+      continue;
+    }
+
+    const available =
+      maxTokens - estimateTokens(formatContext(withExcerpt)) + estimateTokens(excerpt.excerpt);
+    if (available >= MIN_EXCERPT_TOKENS) {
+      const truncated = { ...excerpt, excerpt: truncateToTokens(excerpt.excerpt, available - 1) };
+      if (fits({ ...packed, manualExcerpts: [...packed.manualExcerpts, truncated] })) {
+        packed.manualExcerpts.push(truncated);
+      }
+    }
+  }
+
+  for (const history of context.chatHistory) {
+    if (fits({ ...packed, chatHistory: [...packed.chatHistory, history] })) {
+      packed.chatHistory.push(history);
+    }
+  }
+
+  packed.relevanceScore = scoreContext(packed);
+  return packed;
+}
+
+/**
+ * Builds the system prompt and message list for one chat turn within budget
+ *
+ * Retrieved context is packed first, up to maxContextTokens. The remaining
+ * budget goes to the most recent conversation turns, so the prompt for turn
+ * fifty costs about the same as the prompt for turn five. The new user
+ * message is always sent, even if it alone exceeds the budget.
+ */
+export function packPrompt(options: PackPromptOptions): PackedPrompt {
+  const { systemPrompt, conversation, userMessage, formatContext, scoreContext } = options;
+  const budget = options.budget ?? DEFAULT_PROMPT_BUDGET;
+
+  const baseTokens = estimateTokens(systemPrompt) + estimateTokens(userMessage);
+  const contextBudget = Math.max(
+    0,
+    Math.min(budget.maxContextTokens, budget.maxInputTokens - baseTokens),
+  );
+  const context = packContext(options.context, contextBudget, formatContext, scoreContext);
+  const formattedContext = formatContext(context);
+  const system = formattedContext ? `${systemPrompt}\n\n${formattedContext}` : systemPrompt;
+
+  // The caller's conversation may already end with the message being sent
+  const history = [...conversation];
+  const last = history[history.length - 1];
+  if (last && last.sender === 'user' && last.text === userMessage) {
+    history.pop();
+  }
+
+  let remaining = budget.maxInputTokens - estimateTokens(system) - estimateTokens(userMessage);
+  let kept = 0;
+  for (let i = history.length - 1; i >= 0; i--) {
+    const cost = estimateTokens(history[i].text);
+    if (cost > remaining) {
+      break;
+    }
+    remaining -= cost;
+    kept++;
+  }
+
+  const turns = history.slice(history.length - kept);
+  const messages: PromptMessage[] = [];
+  for (const turn of [...turns, { sender: 'user', text: userMessage }]) {
+    const role = turn.sender === 'user' ? 'user' : 'assistant';
+    const previous = messages[messages.length - 1];
+    if (!previous && role === 'assistant') {
+      // The Messages API requires the first message to come from the user
+      continue;
+    }
+    if (previous && previous.role === role) {
+      previous.content += '\n\n' + turn.text;
+    } else {
+      messages.push({ role, content: turn.text });
+    }
+  }
+
+  return {
+    system,
+    messages,
+    context,
+    estimatedTokens:
+      estimateTokens(system) + messages.reduce((sum, m) => sum + estimateTokens(m.content), 0),
+    droppedTurns: history.length - kept,
+  };
+}
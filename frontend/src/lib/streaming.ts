@@ -0,0 +1,96 @@
+/**
+ * Server-sent event parsing for streamed AI responses
+ */
+
+export interface ServerSentEvent {
+  event?: string;
+  data: string;
+}
+
+/**
+ * Reads a server-sent event stream, calling onEvent for each complete event
+ *
+ * Network chunks can end anywhere, including inside a multi-byte character or
+ * between the lines of one event, so text is decoded in streaming mode and
+ * only blank-line terminated events are dispatched.
+ */
+export async function readServerSentEvents(
+  body: ReadableStream<Uint8Array>,
+  onEvent: (event: ServerSentEvent) => void,
+): Promise<void> {
+  const reader = body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+
+  const dispatch = (block: string) => {
+    let event: string | undefined;
+    const data: string[] = [];
+    for (const line of block.split(/\r?\n/)) {
+      if (line.startsWith('event:')) {
+        event = line.slice(6).trim();
+      } else if (line.startsWith('data:')) {
+        data.push(line.slice(5).replace(/^ /, ''));
+      }
+    }
+    if (data.length > 0) {
+      onEvent({ event, data: data.join('\n') });
+    }
+  };
+
+  try {
+    while (true) {
+      const { done, value } = await reader.read();
+      buffer += done ? decoder.decode() : decoder.decode(value, { stream: true });
+
+      let boundary = buffer.search(/\r?\n\r?\n/);
+      while (boundary !== -1) {
+        dispatch(buffer.slice(0, boundary));
+        buffer = buffer.slice(boundary).replace(/^\r?\n\r?\n/, '');
+        boundary = buffer.search(/\r?\n\r?\n/);
+      }
+
+      if (done) {
+        if (buffer.trim()) {
+          dispatch(buffer);
+        }
+        return;
+      }
+    }
+  } catch (error) {
+    // Stop the upstream request instead of leaving it generating unread tokens
+    await reader.cancel().catch(() => undefined);
+    throw error;
+  } finally {
+    reader.releaseLock();
+  }
+}
+
+/**
+ * Collects the text of a streamed Messages API response
+ * @param onText Called with each text delta as it arrives
+ * @returns The full response text
+ * @throws Error if the stream reports an error event
+ */
+export async function readMessageStream(
+  body: ReadableStream<Uint8Array>,
+  onText: (delta: string) => void,
+): Promise<string> {
+  let text = '';
+
+  await readServerSentEvents(body, ({ event, data }) => {
+    if (event === 'ping' || data === '[DONE]') {
+      return;
+    }
+
+    const payload = JSON.parse(data);
+    if (payload.type === 'error') {
+      throw new Error(`Stream error: ${payload.error?.message || 'Unknown error'}`);
+    }
+    if (payload.type === 'content_block_delta' && payload.delta?.type === 'text_delta') {
+      text += payload.delta.text;
+      onText(payload.delta.text);
+    }
+  });
+
+  return text;
+}
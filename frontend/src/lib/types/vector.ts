@@ -10,6 +10,7 @@ export interface Embedding {
   chunk_text: string;
   chunk_metadata: Record<string, any>;
   embedding: number[]; // Vector array
+  content_hash?: string | null; // SHA-256 of the normalized chunk text
   created_at: string;
   updated_at: string;
 }
@@ -37,6 +38,13 @@ export interface VectorSearchParams {
   threshold?: number;
   tenant_id: string;
   document_ids?: string[];
+  machine_id?: string;
+  ef_search?: number; // HNSW candidate list size; higher improves recall at the cost of latency
+  exact_scan_limit?: number; // Filtered candidate sets up to this size are ranked exactly
+}
+
+export interface VectorBatchSearchParams extends Omit<VectorSearchParams, 'query_embedding'> {
+  query_embeddings: number[][];
 }
 
 export interface VectorSearchResult {
@@ -49,6 +57,45 @@ export interface VectorSearchResult {
   section_header?: string;
 }
 
+export interface StoredChunkHash {
+  id: string;
+  chunk_index: number;
+  chunk_type: ChunkType;
+  page_number?: number | null;
+  section_header?: string | null;
+  content_hash: string | null;
+  chunk_text?: string | null;
+  chunk_metadata?: Record<string, any> | null;
+}
+
+export interface BulkInsertOptions {
+  concurrency?: number; // Batches in flight at once
+  returning?: string | false; // Columns to return for inserted rows, or false for none
+  vectorEncoding?: 'json' | 'text'; // 'text' sends vectors as pgvector literals
+  maxPayloadBytes?: number; // Batches are shrunk to stay under this request size
+}
+
+export interface ChunkIngestRow {
+  chunk_index: number;
+  chunk_type: ChunkType;
+  page_number?: number | null;
+  section_header?: string | null;
+  chunk_text: string;
+  chunk_metadata: Record<string, any>;
+  embedding: number[];
+  content_hash?: string | null;
+}
+
+export interface ChunkUpdateRow {
+  id: string;
+  chunk_index: number;
+  chunk_type: ChunkType;
+  page_number?: number | null;
+  section_header?: string | null;
+  chunk_text: string;
+  chunk_metadata: Record<string, any>;
+}
+
 export interface EmbeddingGenerationRequest {
   text: string;
   model?: 'text-embedding-ada-002' | string;
@@ -13,3 +13,36 @@ export interface Document {
   processed_at?: string;
   error_message?: string;
 }
+
+export interface DocumentPage {
+  document_id: string;
+  page_number: number;
+  text: string;
+  char_count: number;
+  error_message?: string | null;
+}
+
+export interface PdfExtractionJob {
+  id: string;
+  document_id: string;
+  status: 'pending' | 'running' | 'completed' | 'failed';
+  total_pages: number | null;
+  next_page: number;
+  pages_extracted: number;
+  error_message?: string | null;
+}
+
+/**
+ * A document matched by search_manuals, with its best matching page
+ */
+export interface ManualSearchHit extends Omit<Document, 'extracted_text'> {
+  page_number: number | null;
+  /** ts_headline excerpt; matched terms are wrapped in <mark></mark> */
+  snippet: string | null;
+  rank: number;
+}
+
+export interface ManualSearchResults {
+  hits: ManualSearchHit[];
+  total: number;
+}
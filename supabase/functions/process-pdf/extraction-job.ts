@@ -0,0 +1,251 @@
+// extraction-job.ts
+import { SupabaseClient } from 'npm:@supabase/supabase-js@2';
+import { openPDF } from './pdf-processor.ts';
+import { ExtractedPage, ExtractionJob } from './types.ts';
+
+// Pages written to document_pages per round trip; the cursor advances after each write
+const PAGE_BATCH_SIZE = 10;
+// Invocations in a row without progress before the job is marked failed
+const MAX_ATTEMPTS = 3;
+// Extra lease time so a slow final write does not let another invocation in
+const LEASE_GRACE_MS = 30_000;
+
+/**
+ * Loads the extraction job for a document, creating it on first use
+ */
+export async function getOrCreateJob(
+  supabase: SupabaseClient,
+  documentId: string,
+  storagePath: string,
+): Promise<ExtractionJob> {
+  const { data: existing, error } = await supabase
+    .from('pdf_extraction_jobs')
+    .select('*')
+    .eq('document_id', documentId)
+    .maybeSingle();
+  if (error) {
+    throw new Error('Failed to load extraction job: ' + error.message);
+  }
+  if (existing) {
+    return existing as ExtractionJob;
+  }
+
+  const { data: job, error: insertError } = await supabase
+    .from('pdf_extraction_jobs')
+    .upsert(
+      { document_id: documentId, storage_path: storagePath },
+      { onConflict: 'document_id', ignoreDuplicates: true },
+    )
+    .select()
+    .maybeSingle();
+  if (insertError) {
+    throw new Error('Failed to create extraction job: ' + insertError.message);
+  }
+  if (job) {
+    return job as ExtractionJob;
+  }
+
+  // A concurrent invocation created the job first
+  return getOrCreateJob(supabase, documentId, storagePath);
+}
+
+/**
+ * Resets a document's extraction job to page 1 and deletes its extracted pages
+ * @returns The reset job, or null if an invocation holds a live lease on it
+ */
+export async function restartJob(
+  supabase: SupabaseClient,
+  documentId: string,
+  storagePath: string,
+): Promise<ExtractionJob | null> {
+  const { data, error } = await supabase
+    .rpc('restart_pdf_extraction_job', {
+      p_document_id: documentId,
+      p_storage_path: storagePath,
+    })
+    .maybeSingle();
+  if (error) {
+    throw new Error('Failed to restart extraction job: ' + error.message);
+  }
+  return data as ExtractionJob | null;
+}
+
+/**
+ * Claims the job for this invocation until the lease expires
+ *
+ * The attempt is counted as part of the claim, before any work starts, so an
+ * invocation that is killed or runs out of time while opening the PDF still
+ * counts towards MAX_ATTEMPTS. Saving pages resets the count.
+ * @returns The claimed job, or null if another invocation holds the lease
+ */
+async function claimJob(
+  supabase: SupabaseClient,
+  job: ExtractionJob,
+  leaseMs: number,
+): Promise<ExtractionJob | null> {
+  const now = new Date();
+  const { data, error } = await supabase
+    .from('pdf_extraction_jobs')
+    .update({
+      status: 'running',
+      invocations: job.invocations + 1,
+      attempts: job.attempts + 1,
+      lease_expires_at: new Date(now.getTime() + leaseMs).toISOString(),
+      started_at: job.started_at ?? now.toISOString(),
+    })
+    .eq('id', job.id)
+    .or(`lease_expires_at.is.null,lease_expires_at.lt.${now.toISOString()}`)
+    .select()
+    .maybeSingle();
+  if (error) {
+    throw new Error('Failed to claim extraction job: ' + error.message);
+  }
+  return data as ExtractionJob | null;
+}
+
+/**
+ * Writes a batch of pages and advances the resume cursor past them
+ */
+async function savePages(
+  supabase: SupabaseClient,
+  job: ExtractionJob,
+  pages: ExtractedPage[],
+): Promise<ExtractionJob> {
+  const { error } = await supabase.from('document_pages').upsert(
+    pages.map((page) => ({
+      document_id: job.document_id,
+      page_number: page.page_number,
+      text: page.text,
+      char_count: page.text.length,
+      error_message: page.error ?? null,
+    })),
+    { onConflict: 'document_id,page_number' },
+  );
+  if (error) {
+    throw new Error('Failed to save pages: ' + error.message);
+  }
+
+  const update = {
+    next_page: pages[pages.length - 1].page_number + 1,
+    pages_extracted: job.pages_extracted + pages.length,
+    attempts: 0,
+  };
+  const { error: jobError } = await supabase
+    .from('pdf_extraction_jobs')
+    .update(update)
+    .eq('id', job.id);
+  if (jobError) {
+    throw new Error('Failed to record extraction progress: ' + jobError.message);
+  }
+  return { ...job, ...update };
+}
+
+/**
+ * Extracts pages from the job's cursor until the document ends or the deadline passes
+ *
+ * Progress is persisted every PAGE_BATCH_SIZE pages, so an invocation that
+ * is killed loses at most one batch. The returned job is 'running' when the
+ * deadline stopped extraction early and another invocation should continue.
+ * @returns The updated job, or null if another invocation is already running it
+ */
+export async function runExtractionJob(
+  supabase: SupabaseClient,
+  job: ExtractionJob,
+  deadline: number,
+): Promise<ExtractionJob | null> {
+  if (job.status === 'completed') {
+    return job;
+  }
+
+  const claimed = await claimJob(supabase, job, deadline - Date.now() + LEASE_GRACE_MS);
+  if (!claimed) {
+    return null;
+  }
+  job = claimed;
+
+  if (job.attempts > MAX_ATTEMPTS) {
+    const update = {
+      status: 'failed',
+      lease_expires_at: null,
+      error_message:
+        job.error_message ?? `No pages extracted in ${MAX_ATTEMPTS} consecutive invocations`,
+    };
+    await supabase.from('pdf_extraction_jobs').update(update).eq('id', job.id);
+    return { ...job, ...update } as ExtractionJob;
+  }
+
+  try {
+    const pdf = await openPDF(supabase, job.storage_path);
+    try {
+      if (job.total_pages === null) {
+        job = { ...job, total_pages: pdf.pageCount, file_size: pdf.fileSize };
+        await supabase
+          .from('pdf_extraction_jobs')
+          .update({ total_pages: pdf.pageCount, file_size: pdf.fileSize })
+          .eq('id', job.id);
+      }
+
+      let batch: ExtractedPage[] = [];
+      let pageNumber = job.next_page;
+      while (pageNumber <= pdf.pageCount && Date.now() < deadline) {
+        batch.push(await pdf.extractPage(pageNumber));
+        pageNumber++;
+
+        if (batch.length >= PAGE_BATCH_SIZE) {
+          job = await savePages(supabase, job, batch);
+          batch = [];
+        }
+      }
+      if (batch.length > 0) {
+        job = await savePages(supabase, job, batch);
+      }
+    } finally {
+      await pdf.close();
+    }
+
+    const done = job.next_page > (job.total_pages ?? 0);
+    const update = done
+      ? { status: 'completed', completed_at: new Date().toISOString(), lease_expires_at: null }
+      : { lease_expires_at: null };
+    await supabase.from('pdf_extraction_jobs').update(update).eq('id', job.id);
+    return { ...job, ...update } as ExtractionJob;
+  } catch (err) {
+    console.error('PDF extraction failed:', err);
+    const update = {
+      status: job.attempts >= MAX_ATTEMPTS ? 'failed' : 'running',
+      lease_expires_at: null,
+      error_message: err instanceof Error ? err.message : String(err),
+    };
+    await supabase.from('pdf_extraction_jobs').update(update).eq('id', job.id);
+    return { ...job, ...update } as ExtractionJob;
+  }
+}
+
+/**
+ * Joins the stored pages of a document in page order
+ */
+export async function loadExtractedText(
+  supabase: SupabaseClient,
+  documentId: string,
+): Promise<string> {
+  const texts: string[] = [];
+  const pageSize = 500;
+
+  for (let from = 0; ; from += pageSize) {
+    const { data, error } = await supabase
+      .from('document_pages')
+      .select('text')
+      .eq('document_id', documentId)
+      .order('page_number')
+      .range(from, from + pageSize - 1);
+    if (error) {
+      throw new Error('Failed to load extracted pages: ' + error.message);
+    }
+    texts.push(...(data ?? []).map((page: { text: string }) => page.text));
+    if (!data || data.length < pageSize) {
+      break;
+    }
+  }
+
+  return texts.join('\n\n');
+}
@@ -1,8 +1,31 @@
 import { createClient } from 'npm:@supabase/supabase-js@2';
-import { processPDF } from './pdf-processor.ts';
-import { ProcessPDFRequest } from './types.ts';
+import { getOrCreateJob, loadExtractedText, restartJob, runExtractionJob } from './extraction-job.ts';
+import { ExtractionJob, ExtractionProgress, ProcessPDFRequest } from './types.ts';
+
+// Time spent extracting before handing over to a fresh invocation; kept well
+// below the edge function wall-clock limit to leave room for the final writes
+const TIME_BUDGET_MS = Number(Deno.env.get('PDF_EXTRACTION_TIME_BUDGET_MS') ?? 100_000);
+
+declare const EdgeRuntime: { waitUntil(promise: Promise<unknown>): void } | undefined;
+
+/**
+ * Compares two secrets without leaking where they differ through timing
+ */
+function secretsEqual(a: string, b: string): boolean {
+  const left = new TextEncoder().encode(a);
+  const right = new TextEncoder().encode(b);
+  if (left.length !== right.length || left.length === 0) {
+    return false;
+  }
+  let diff = 0;
+  for (let i = 0; i < left.length; i++) {
+    diff |= left[i] ^ right[i];
+  }
+  return diff === 0;
+}
 
 Deno.serve(async (req: Request) => {
+  const startedAt = Date.now();
   const headers = {
     'Access-Control-Allow-Origin': '*',
     'Access-Control-Allow-Methods': 'POST, OPTIONS',
@@ -19,45 +42,133 @@ Deno.serve(async (req: Request) => {
       return new Response(JSON.stringify({ error: 'Method not allowed' }), { status: 405, headers });
     }
     const body = await req.json();
-    const { storage_path, document_id } = body as ProcessPDFRequest;
+    const { storage_path, document_id, restart } = body as ProcessPDFRequest;
     if (!storage_path || !document_id) {
       return new Response(JSON.stringify({ error: 'Missing required fields' }), { status: 400, headers });
     }
 
-    // Auth context for RLS
     const supabaseUrl = Deno.env.get('SUPABASE_URL') ?? '';
     const anonKey = Deno.env.get('SUPABASE_ANON_KEY') ?? '';
     const serviceRoleKey = Deno.env.get('SUPABASE_SERVICE_ROLE_KEY') ?? '';
     const authHeader = req.headers.get('Authorization') || '';
+    if (!authHeader) {
+      return new Response(JSON.stringify({ error: 'Unauthorized' }), { status: 401, headers });
+    }
+
+    // Writes go through the service role: users may only read jobs and pages
     const supabase = createClient(supabaseUrl, serviceRoleKey, {
+      auth: { persistSession: false },
+    });
+
+    // Continuations are signed with the service role key rather than the user's
+    // token, which may expire before a long extraction finishes
+    const token = authHeader.replace(/^Bearer\s+/i, '');
+    const isContinuation = secretsEqual(token, serviceRoleKey);
+
+    // Otherwise the caller's client checks, through RLS, that they can read the document
+    const userClient = createClient(supabaseUrl, anonKey, {
       global: { headers: { Authorization: authHeader } },
     });
+    const { data: document, error: documentError } = await (isContinuation ? supabase : userClient)
+      .from('documents')
+      .select('id, storage_path, uploader_id')
+      .eq('id', document_id)
+      .maybeSingle();
+    if (documentError || !document) {
+      return new Response(JSON.stringify({ error: 'Document not found' }), { status: 404, headers });
+    }
+    if (!document.storage_path) {
+      return new Response(JSON.stringify({ error: 'Document has no stored file' }), { status: 400, headers });
+    }
+
+    // The PDF is read from the document's own storage path, not the one in the request
+    const storagePath: string = document.storage_path;
+
+    let job: ExtractionJob;
+    if (restart && !isContinuation) {
+      // Restarting deletes extracted pages, so only the uploader or an admin may do it
+      const { data: userData } = await userClient.auth.getUser(token);
+      const user = userData?.user;
+      if (!user || (user.id !== document.uploader_id && user.app_metadata?.role !== 'admin')) {
+        return new Response(JSON.stringify({ error: 'Only the uploader or an admin can restart extraction' }), {
+          status: 403,
+          headers,
+        });
+      }
+
+      const restarted = await restartJob(supabase, document_id, storagePath);
+      if (!restarted) {
+        return new Response(JSON.stringify({ error: 'Extraction is already running' }), { status: 409, headers });
+      }
+      job = restarted;
+    } else {
+      job = await getOrCreateJob(supabase, document_id, storagePath);
+    }
 
     // Set processing status to 'processing'
     await supabase.from('documents').update({ processing_status: 'processing' }).eq('id', document_id);
 
-    // Process the PDF
-    const result = await processPDF(storage_path);
+    const result = await runExtractionJob(supabase, job, startedAt + TIME_BUDGET_MS);
+
+    if (!result) {
+      // Another invocation holds the job; report its progress
+      const progress: ExtractionProgress = {
+        jobId: job.id,
+        status: job.status,
+        pagesExtracted: job.pages_extracted,
+        totalPages: job.total_pages,
+        nextPage: job.next_page,
+        continuing: true,
+      };
+      return new Response(JSON.stringify(progress), { status: 202, headers });
+    }
+
+    const progress: ExtractionProgress = {
+      jobId: result.id,
+      status: result.status,
+      pagesExtracted: result.pages_extracted,
+      totalPages: result.total_pages,
+      nextPage: result.next_page,
+      continuing: result.status === 'running',
+      error: result.error_message ?? undefined,
+    };
+
+    if (result.status === 'running') {
+      // Continue from the cursor in a fresh invocation with a full time budget
+      const next = fetch(`${supabaseUrl}/functions/v1/process-pdf`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json', Authorization: `Bearer ${serviceRoleKey}` },
+        body: JSON.stringify({ storage_path: storagePath, document_id }),
+      }).catch((error) => console.error('Failed to schedule extraction continuation:', error));
+      if (typeof EdgeRuntime !== 'undefined') {
+        EdgeRuntime.waitUntil(next);
+      }
+      return new Response(JSON.stringify(progress), { status: 202, headers });
+    }
 
     // Update the documents table with results
     const updateData: Record<string, unknown> = {
-      extracted_text: result.extractedText,
-      page_count: result.pageCount,
-      file_size: result.fileSize,
-      processed_at: result.processedAt,
-      processing_status: result.error ? 'failed' : 'completed',
+      page_count: result.total_pages ?? 0,
+      file_size: result.file_size ?? 0,
+      processed_at: new Date().toISOString(),
+      processing_status: result.status,
     };
-    if (result.error) {
-      updateData['error_message'] = result.error;
+    if (result.status === 'completed') {
+      updateData['extracted_text'] = await loadExtractedText(supabase, document_id);
+    } else {
+      updateData['error_message'] = result.error_message;
     }
     await supabase.from('documents').update(updateData).eq('id', document_id);
 
-    if (result.error) {
-      return new Response(JSON.stringify({ error: result.error }), { status: 500, headers });
+    if (result.status === 'failed') {
+      return new Response(JSON.stringify({ error: result.error_message, ...progress }), {
+        status: 500,
+        headers,
+      });
     }
-    return new Response(JSON.stringify({ message: 'PDF processed', ...result }), { status: 200, headers });
+    return new Response(JSON.stringify({ message: 'PDF processed', ...progress }), { status: 200, headers });
   } catch (error) {
     console.error('Error in process-pdf handler:', error);
     return new Response(JSON.stringify({ error: 'Internal server error' }), { status: 500, headers });
   }
-}); 
\ No newline at end of file
+});
@@ -1,45 +1,73 @@
 // pdf-processor.ts
-import { createClient } from 'npm:@supabase/supabase-js@2';
-import pdfParse from 'npm:pdf-parse';
+import { SupabaseClient } from 'npm:@supabase/supabase-js@2';
+import * as pdfjs from 'npm:pdfjs-dist@4.10.38/legacy/build/pdf.mjs';
+// Registers the worker on globalThis so pdf.js parses in this isolate
+import 'npm:pdfjs-dist@4.10.38/legacy/build/pdf.worker.mjs';
+import { ExtractedPage } from './types.ts';
 
-export async function processPDF(storagePath: string): Promise<{
-  extractedText: string;
+// Bytes fetched per HTTP range request; only the ranges a page needs are downloaded
+const RANGE_CHUNK_SIZE = 256 * 1024;
+const SIGNED_URL_TTL_SECONDS = 15 * 60;
+
+export interface OpenedPDF {
   pageCount: number;
   fileSize: number;
-  processedAt: string;
-  error?: string;
-}> {
-  try {
-    const supabaseUrl = Deno.env.get('SUPABASE_URL') ?? '';
-    const serviceRoleKey = Deno.env.get('SUPABASE_SERVICE_ROLE_KEY') ?? '';
-    if (!supabaseUrl || !serviceRoleKey) {
-      throw new Error('Missing Supabase credentials');
-    }
-    const supabase = createClient(supabaseUrl, serviceRoleKey);
-    // Download the PDF file from storage
-    const { data, error } = await supabase.storage.from('documents').download(storagePath);
-    if (error || !data) {
-      throw new Error('Failed to download PDF: ' + (error?.message || 'Unknown error'));
-    }
-    // Read the file as ArrayBuffer
-    const buffer = await data.arrayBuffer();
-    const uint8 = new Uint8Array(buffer);
-    // Extract text using pdf-parse
-    const parsed = await pdfParse(uint8);
-    return {
-      extractedText: parsed.text,
-      pageCount: parsed.numpages,
-      fileSize: uint8.byteLength,
-      processedAt: new Date().toISOString(),
-    };
-  } catch (err) {
-    console.error('PDF processing failed:', err);
-    return {
-      extractedText: '',
-      pageCount: 0,
-      fileSize: 0,
-      processedAt: new Date().toISOString(),
-      error: err instanceof Error ? err.message : String(err),
-    };
+  extractPage(pageNumber: number): Promise<ExtractedPage>;
+  close(): Promise<void>;
+}
+
+/**
+ * Opens a PDF from storage for page-by-page extraction
+ *
+ * The file is read through HTTP range requests on a signed URL instead of
+ * being downloaded into memory, so only the objects referenced by the pages
+ * being extracted are fetched.
+ */
+export async function openPDF(supabase: SupabaseClient, storagePath: string): Promise<OpenedPDF> {
+  const { data, error } = await supabase.storage
+    .from('documents')
+    .createSignedUrl(storagePath, SIGNED_URL_TTL_SECONDS);
+  if (error || !data) {
+    throw new Error('Failed to access PDF: ' + (error?.message || 'Unknown error'));
   }
-} 
\ No newline at end of file
+
+  const doc = await pdfjs.getDocument({
+    url: data.signedUrl,
+    rangeChunkSize: RANGE_CHUNK_SIZE,
+    disableAutoFetch: true,
+    disableStream: true,
+    isEvalSupported: false,
+    useSystemFonts: false,
+  }).promise;
+  const { length } = await doc.getDownloadInfo();
+
+  return {
+    pageCount: doc.numPages,
+    fileSize: length,
+    async extractPage(pageNumber: number): Promise<ExtractedPage> {
+      try {
+        const page = await doc.getPage(pageNumber);
+        const content = await page.getTextContent();
+        let text = '';
+        for (const item of content.items) {
+          if ('str' in item) {
+            text += item.str + (item.hasEOL ? '\n' : ' ');
+          }
+        }
+        page.cleanup();
+        return { page_number: pageNumber, text: text.trim() };
+      } catch (err) {
+        // A damaged page should not fail the whole document
+        console.error(`Failed to extract page ${pageNumber}:`, err);
+        return {
+          page_number: pageNumber,
+          text: '',
+          error: err instanceof Error ? err.message : String(err),
+        };
+      }
+    },
+    async close() {
+      await doc.destroy();
+    },
+  };
+}
@@ -2,6 +2,8 @@
 export interface ProcessPDFRequest {
   storage_path: string;
   document_id: string;
+  /** Restart extraction from page 1 instead of resuming; uploader or admin only */
+  restart?: boolean;
 }
 
 export interface ProcessPDFResponse {
@@ -10,4 +12,40 @@ export interface ProcessPDFResponse {
   fileSize: number;
   processedAt: string;
   error?: string;
-} 
\ No newline at end of file
+}
+
+export type ExtractionJobStatus = 'pending' | 'running' | 'completed' | 'failed';
+
+export interface ExtractionJob {
+  id: string;
+  document_id: string;
+  storage_path: string;
+  status: ExtractionJobStatus;
+  total_pages: number | null;
+  next_page: number;
+  pages_extracted: number;
+  file_size: number | null;
+  invocations: number;
+  attempts: number;
+  lease_expires_at: string | null;
+  error_message: string | null;
+  started_at: string | null;
+  completed_at: string | null;
+}
+
+export interface ExtractedPage {
+  page_number: number;
+  text: string;
+  error?: string;
+}
+
+export interface ExtractionProgress {
+  jobId: string;
+  status: ExtractionJobStatus;
+  pagesExtracted: number;
+  totalPages: number | null;
+  nextPage: number;
+  /** True when another invocation has been scheduled to continue the job */
+  continuing: boolean;
+  error?: string;
+}
@@ -0,0 +1,197 @@
+-- Migration: Tenant-scoped vector similarity search
+-- Date: 2025-01-20
+-- Purpose: Replace the ivfflat index with HNSW and add match_embeddings RPC functions
+
+-- Replace ivfflat with HNSW: no training step, better recall at low latency,
+-- and recall can be tuned per query through hnsw.ef_search
+DROP INDEX IF EXISTS embeddings_embedding_idx;
+
+CREATE INDEX IF NOT EXISTS embeddings_embedding_hnsw_idx ON embeddings
+USING hnsw (embedding vector_cosine_ops)
+WITH (m = 16, ef_construction = 64);
+
+-- Composite index used to narrow candidates to a tenant's documents before ranking
+CREATE INDEX IF NOT EXISTS embeddings_tenant_document_idx ON embeddings(tenant_id, document_id);
+
+-- Similarity search scoped to a tenant and optionally to documents or a machine
+--
+-- When the filtered candidate set is small (at most exact_scan_limit rows) the
+-- candidates are ranked exactly, which gives perfect recall and avoids the
+-- HNSW graph returning mostly rows from other tenants. Larger candidate sets
+-- use the HNSW index with the requested ef_search; on pgvector >= 0.8 an
+-- iterative scan keeps walking the graph until enough rows pass the filters.
+--
+-- Chunks at a negative chunk_index are staged by a re-ingest that has not been
+-- applied yet (see apply_document_chunk_changes) and are never returned.
+CREATE OR REPLACE FUNCTION match_embeddings(
+    query_embedding vector(1536),
+    p_tenant_id UUID,
+    match_count INTEGER DEFAULT 10,
+    match_threshold FLOAT DEFAULT 0,
+    p_document_ids UUID[] DEFAULT NULL,
+    p_machine_id UUID DEFAULT NULL,
+    ef_search INTEGER DEFAULT 40,
+    exact_scan_limit INTEGER DEFAULT 10000
+)
+RETURNS TABLE (
+    chunk_id UUID,
+    chunk_text TEXT,
+    chunk_metadata JSONB,
+    document_id UUID,
+    similarity_score FLOAT,
+    page_number INTEGER,
+    section_header TEXT
+)
+LANGUAGE plpgsql
+STABLE
+SECURITY INVOKER
+AS $$
+DECLARE
+    document_filter UUID[] := p_document_ids;
+    candidate_count INTEGER;
+BEGIN
+    IF p_machine_id IS NOT NULL THEN
+        SELECT COALESCE(array_agg(d.id), '{}')
+        INTO document_filter
+        FROM documents d
+        WHERE d.machine_id = p_machine_id
+        AND (p_document_ids IS NULL OR d.id = ANY(p_document_ids));
+    END IF;
+
+    -- Count at most exact_scan_limit + 1 rows so large tenants stay cheap to check
+    SELECT COUNT(*)
+    INTO candidate_count
+    FROM (
+        SELECT 1
+        FROM embeddings e
+        WHERE e.tenant_id = p_tenant_id
+        AND (document_filter IS NULL OR e.document_id = ANY(document_filter))
+        AND NOT EXISTS (
+            SELECT 1 FROM document_chunks s WHERE s.id = e.chunk_id AND s.chunk_index < 0
+        )
+        LIMIT exact_scan_limit + 1
+    ) candidates;
+
+    IF candidate_count <= exact_scan_limit THEN
+        RETURN QUERY
+        WITH candidates AS MATERIALIZED (
+            SELECT e.chunk_id, e.chunk_text, e.chunk_metadata, e.document_id, e.embedding
+            FROM embeddings e
+            WHERE e.tenant_id = p_tenant_id
+            AND (document_filter IS NULL OR e.document_id = ANY(document_filter))
+            AND NOT EXISTS (
+                SELECT 1 FROM document_chunks s WHERE s.id = e.chunk_id AND s.chunk_index < 0
+            )
+        )
+        SELECT
+            c.chunk_id,
+            c.chunk_text,
+            c.chunk_metadata,
+            c.document_id,
+            (1 - (c.embedding <=> query_embedding))::FLOAT AS similarity_score,
+            dc.page_number,
+            dc.section_header
+        FROM candidates c
+        LEFT JOIN document_chunks dc ON dc.id = c.chunk_id
+        WHERE 1 - (c.embedding <=> query_embedding) >= match_threshold
+        ORDER BY c.embedding <=> query_embedding
+        LIMIT match_count;
+        RETURN;
+    END IF;
+
+    PERFORM set_config('hnsw.ef_search', GREATEST(ef_search, match_count)::TEXT, true);
+
+    BEGIN
+        PERFORM set_config('hnsw.iterative_scan', 'relaxed_order', true);
+    EXCEPTION WHEN OTHERS THEN
+        -- Iterative scans need pgvector >= 0.8; older versions filter within ef_search
+        NULL;
+    END;
+
+    RETURN QUERY
+    SELECT
+        ranked.chunk_id,
+        ranked.chunk_text,
+        ranked.chunk_metadata,
+        ranked.document_id,
+        ranked.similarity_score,
+        dc.page_number,
+        dc.section_header
+    FROM (
+        SELECT
+            e.chunk_id,
+            e.chunk_text,
+            e.chunk_metadata,
+            e.document_id,
+            (1 - (e.embedding <=> query_embedding))::FLOAT AS similarity_score
+        FROM embeddings e
+        WHERE e.tenant_id = p_tenant_id
+        AND (document_filter IS NULL OR e.document_id = ANY(document_filter))
+        AND NOT EXISTS (
+            SELECT 1 FROM document_chunks s WHERE s.id = e.chunk_id AND s.chunk_index < 0
+        )
+        ORDER BY e.embedding <=> query_embedding
+        LIMIT match_count
+    ) ranked
+    LEFT JOIN document_chunks dc ON dc.id = ranked.chunk_id
+    WHERE ranked.similarity_score >= match_threshold
+    -- Relaxed iterative scans may return rows slightly out of order
+    ORDER BY ranked.similarity_score DESC;
+END;
+$$;
+
+-- Answers several query vectors in one round trip
+--
+-- Each vector is answered by match_embeddings, so staged chunks are excluded here too.
+--
+-- query_embeddings is a JSON array of vectors, e.g. [[0.1, ...], [0.2, ...]];
+-- query_index is the 1-based position of the query vector in that array.
+CREATE OR REPLACE FUNCTION match_embeddings_batch(
+    query_embeddings JSONB,
+    p_tenant_id UUID,
+    match_count INTEGER DEFAULT 10,
+    match_threshold FLOAT DEFAULT 0,
+    p_document_ids UUID[] DEFAULT NULL,
+    p_machine_id UUID DEFAULT NULL,
+    ef_search INTEGER DEFAULT 40,
+    exact_scan_limit INTEGER DEFAULT 10000
+)
+RETURNS TABLE (
+    query_index INTEGER,
+    chunk_id UUID,
+    chunk_text TEXT,
+    chunk_metadata JSONB,
+    document_id UUID,
+    similarity_score FLOAT,
+    page_number INTEGER,
+    section_header TEXT
+)
+LANGUAGE sql
+STABLE
+SECURITY INVOKER
+AS $$
+    SELECT
+        q.ordinality::INTEGER AS query_index,
+        m.chunk_id,
+        m.chunk_text,
+        m.chunk_metadata,
+        m.document_id,
+        m.similarity_score,
+        m.page_number,
+        m.section_header
+    FROM jsonb_array_elements(query_embeddings) WITH ORDINALITY AS q(value, ordinality)
+    CROSS JOIN LATERAL match_embeddings(
+        (q.value::TEXT)::vector(1536),
+        p_tenant_id,
+        match_count,
+        match_threshold,
+        p_document_ids,
+        p_machine_id,
+        ef_search,
+        exact_scan_limit
+    ) m
+    ORDER BY q.ordinality, m.similarity_score DESC;
+$$;
+
+COMMENT ON FUNCTION match_embeddings IS 'Tenant-scoped cosine similarity search over embeddings with tunable HNSW ef_search';
+COMMENT ON FUNCTION match_embeddings_batch IS 'Runs match_embeddings for a JSON array of query vectors in one call';
@@ -0,0 +1,13 @@
+-- Migration: Content-addressed embeddings
+-- Date: 2025-01-21
+-- Purpose: Store a hash of the normalized chunk text so re-ingestion can reuse vectors
+
+-- SHA-256 of the chunk text after cleanForEmbedding; NULL for rows ingested before this migration
+ALTER TABLE embeddings ADD COLUMN IF NOT EXISTS content_hash TEXT;
+
+-- Lookup of stored vectors by content within a tenant
+CREATE INDEX IF NOT EXISTS embeddings_tenant_content_hash_idx
+ON embeddings(tenant_id, content_hash)
+WHERE content_hash IS NOT NULL;
+
+COMMENT ON COLUMN embeddings.content_hash IS 'SHA-256 of the normalized chunk text used to reuse embeddings across re-ingestion';
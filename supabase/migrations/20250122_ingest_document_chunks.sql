@@ -0,0 +1,97 @@
+-- Migration: Transactional bulk ingest of chunks and embeddings
+-- Date: 2025-01-22
+-- Purpose: Write document_chunks and embeddings rows in one round trip and one transaction
+
+-- Re-links previous_chunk_id / next_chunk_id for every chunk of a document by chunk_index
+CREATE OR REPLACE FUNCTION link_document_chunks(p_document_id UUID)
+RETURNS VOID
+LANGUAGE sql
+SECURITY INVOKER
+AS $$
+    UPDATE document_chunks dc
+    SET previous_chunk_id = links.previous_id,
+        next_chunk_id = links.next_id
+    FROM (
+        SELECT
+            d.id,
+            prev.id AS previous_id,
+            nxt.id AS next_id
+        FROM document_chunks d
+        LEFT JOIN document_chunks prev
+            ON prev.document_id = d.document_id AND prev.chunk_index = d.chunk_index - 1
+        LEFT JOIN document_chunks nxt
+            ON nxt.document_id = d.document_id AND nxt.chunk_index = d.chunk_index + 1
+        WHERE d.document_id = p_document_id
+    ) links
+    WHERE dc.id = links.id
+    AND (
+        dc.previous_chunk_id IS DISTINCT FROM links.previous_id
+        OR dc.next_chunk_id IS DISTINCT FROM links.next_id
+    );
+$$;
+
+-- Inserts a batch of chunks with their embeddings
+--
+-- Batches of one document may run concurrently, and a batch cannot see rows of
+-- batches that have not committed, so links are not set here: callers run
+-- link_document_chunks once after every batch has committed.
+--
+-- p_chunks is a JSON array of objects with chunk_index, chunk_type, page_number,
+-- section_header, chunk_text, chunk_metadata, embedding and content_hash.
+-- embedding may be a pgvector text literal ("[0.1,0.2,...]") or a JSON array.
+-- Returns the number of chunks written.
+CREATE OR REPLACE FUNCTION ingest_document_chunks(
+    p_tenant_id UUID,
+    p_document_id UUID,
+    p_chunks JSONB
+)
+RETURNS INTEGER
+LANGUAGE plpgsql
+SECURITY INVOKER
+AS $$
+DECLARE
+    inserted_count INTEGER;
+BEGIN
+    WITH input AS (
+        SELECT *
+        FROM jsonb_to_recordset(p_chunks) AS c(
+            chunk_index INTEGER,
+            chunk_type VARCHAR(50),
+            page_number INTEGER,
+            section_header TEXT,
+            chunk_text TEXT,
+            chunk_metadata JSONB,
+            embedding TEXT,
+            content_hash TEXT
+        )
+    ),
+    new_chunks AS (
+        INSERT INTO document_chunks (
+            tenant_id, document_id, chunk_index, chunk_type, page_number, section_header
+        )
+        SELECT p_tenant_id, p_document_id, chunk_index, chunk_type, page_number, section_header
+        FROM input
+        RETURNING id, chunk_index
+    )
+    INSERT INTO embeddings (
+        tenant_id, document_id, chunk_id, chunk_text, chunk_metadata, embedding, content_hash
+    )
+    SELECT
+        p_tenant_id,
+        p_document_id,
+        n.id,
+        i.chunk_text,
+        COALESCE(i.chunk_metadata, '{}'),
+        i.embedding::vector(1536),
+        i.content_hash
+    FROM new_chunks n
+    JOIN input i ON i.chunk_index = n.chunk_index;
+
+    GET DIAGNOSTICS inserted_count = ROW_COUNT;
+
+    RETURN inserted_count;
+END;
+$$;
+
+COMMENT ON FUNCTION link_document_chunks IS 'Sets previous_chunk_id and next_chunk_id from chunk_index order';
+COMMENT ON FUNCTION ingest_document_chunks IS 'Inserts chunks and their embeddings for a document in one transaction';
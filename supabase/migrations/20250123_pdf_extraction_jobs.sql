@@ -0,0 +1,107 @@
+-- Migration: Page-level, resumable PDF extraction
+-- Date: 2025-01-23
+-- Purpose: Persist extracted text per page and track extraction progress across invocations
+
+-- Extracted text of each PDF page
+CREATE TABLE IF NOT EXISTS document_pages (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    document_id UUID NOT NULL REFERENCES documents(id) ON DELETE CASCADE,
+    page_number INTEGER NOT NULL CHECK (page_number > 0),
+    text TEXT NOT NULL DEFAULT '',
+    char_count INTEGER NOT NULL DEFAULT 0,
+    error_message TEXT, -- Set when the page could not be extracted; text is then empty
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    updated_at TIMESTAMPTZ DEFAULT NOW(),
+    UNIQUE(document_id, page_number)
+);
+
+-- One extraction job per document; next_page is the resume cursor
+CREATE TABLE IF NOT EXISTS pdf_extraction_jobs (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    document_id UUID NOT NULL UNIQUE REFERENCES documents(id) ON DELETE CASCADE,
+    storage_path TEXT NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'pending', -- 'pending', 'running', 'completed', 'failed'
+    total_pages INTEGER,
+    next_page INTEGER NOT NULL DEFAULT 1,
+    pages_extracted INTEGER NOT NULL DEFAULT 0,
+    file_size BIGINT,
+    invocations INTEGER NOT NULL DEFAULT 0,
+    attempts INTEGER NOT NULL DEFAULT 0, -- Consecutive invocations that saved no pages
+    lease_expires_at TIMESTAMPTZ, -- Held by the invocation currently extracting
+    error_message TEXT,
+    started_at TIMESTAMPTZ,
+    completed_at TIMESTAMPTZ,
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS pdf_extraction_jobs_status_idx ON pdf_extraction_jobs(status);
+
+CREATE TRIGGER update_document_pages_updated_at BEFORE UPDATE ON document_pages
+    FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+
+CREATE TRIGGER update_pdf_extraction_jobs_updated_at BEFORE UPDATE ON pdf_extraction_jobs
+    FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+
+-- Users can read pages and progress of documents they can read. There are no
+-- write policies: process-pdf checks document access with the caller's token
+-- and then writes these rows with a separate service-role client.
+ALTER TABLE document_pages ENABLE ROW LEVEL SECURITY;
+ALTER TABLE pdf_extraction_jobs ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Document pages follow document access" ON document_pages
+    FOR SELECT
+    USING (EXISTS (SELECT 1 FROM documents d WHERE d.id = document_pages.document_id));
+
+CREATE POLICY "Extraction jobs follow document access" ON pdf_extraction_jobs
+    FOR SELECT
+    USING (EXISTS (SELECT 1 FROM documents d WHERE d.id = pdf_extraction_jobs.document_id));
+
+-- Resets a document's extraction job to page 1 and deletes its extracted pages
+--
+-- The job row is locked for the duration, so an invocation claiming the job
+-- waits and then starts from the reset cursor; it cannot save pages that are
+-- about to be deleted. Returns no row while another invocation holds a live
+-- lease, since restarting then would overlap two extractions.
+CREATE OR REPLACE FUNCTION restart_pdf_extraction_job(
+    p_document_id UUID,
+    p_storage_path TEXT
+)
+RETURNS SETOF pdf_extraction_jobs
+LANGUAGE plpgsql
+SECURITY INVOKER
+AS $$
+DECLARE
+    lease TIMESTAMPTZ;
+BEGIN
+    SELECT lease_expires_at
+    INTO lease
+    FROM pdf_extraction_jobs
+    WHERE document_id = p_document_id
+    FOR UPDATE;
+    IF lease > NOW() THEN
+        RETURN;
+    END IF;
+
+    DELETE FROM document_pages WHERE document_id = p_document_id;
+
+    RETURN QUERY
+    INSERT INTO pdf_extraction_jobs AS j (document_id, storage_path)
+    VALUES (p_document_id, p_storage_path)
+    ON CONFLICT (document_id) DO UPDATE
+    SET storage_path = EXCLUDED.storage_path,
+        status = 'pending',
+        total_pages = NULL,
+        next_page = 1,
+        pages_extracted = 0,
+        attempts = 0,
+        lease_expires_at = NULL,
+        error_message = NULL,
+        completed_at = NULL
+    RETURNING j.*;
+END;
+$$;
+
+COMMENT ON TABLE document_pages IS 'Per-page extracted PDF text, written incrementally by process-pdf';
+COMMENT ON TABLE pdf_extraction_jobs IS 'Progress and resume cursor of page-level PDF extraction';
+COMMENT ON FUNCTION restart_pdf_extraction_job IS 'Resets page-level extraction of a document unless an invocation is running it';
@@ -0,0 +1,169 @@
+-- Migration: Indexed full-text search over manuals
+-- Date: 2025-01-24
+-- Purpose: Stored tsvector columns with GIN indexes and a ranked, paginated search RPC
+
+-- Page text is indexed per page, so hits carry a page number and no single
+-- tsvector has to hold a whole manual (tsvectors are limited to 1MB). The
+-- columns are generated, so they stay current as process-pdf writes pages.
+ALTER TABLE document_pages
+    ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (to_tsvector('english', left(text, 1000000))) STORED;
+
+CREATE INDEX IF NOT EXISTS document_pages_search_idx ON document_pages USING gin (search_vector);
+
+-- Filenames are split on separators so "hydraulic_press_manual.pdf" matches "press"
+ALTER TABLE documents
+    ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        to_tsvector('english', regexp_replace(coalesce(filename, ''), '[_.\-]+', ' ', 'g'))
+    ) STORED;
+
+CREATE INDEX IF NOT EXISTS documents_search_idx ON documents USING gin (search_vector);
+CREATE INDEX IF NOT EXISTS documents_machine_uploaded_idx ON documents(machine_id, uploaded_at DESC);
+
+-- Documents processed before page-level extraction only have extracted_text;
+-- store it as a single page so they are searchable until they are reprocessed
+INSERT INTO document_pages (document_id, page_number, text, char_count)
+SELECT d.id, 1, d.extracted_text, length(d.extracted_text)
+FROM documents d
+WHERE d.extracted_text IS NOT NULL
+AND NOT EXISTS (SELECT 1 FROM document_pages p WHERE p.document_id = d.id)
+ON CONFLICT (document_id, page_number) DO NOTHING;
+
+-- Turns what the user typed into a prefix query, so results update while typing:
+-- 'hydraulic pres' becomes 'hydraul':* & 'pres':*
+CREATE OR REPLACE FUNCTION manual_search_query(search_text TEXT)
+RETURNS tsquery
+LANGUAGE sql
+IMMUTABLE
+AS $$
+    SELECT to_tsquery('english', string_agg(quote_literal(word) || ':*', ' & '))
+    FROM regexp_split_to_table(lower(coalesce(search_text, '')), '[^[:alnum:]]+') AS word
+    WHERE word <> '';
+$$;
+
+-- Escapes LIKE metacharacters so user input only matches literally
+CREATE OR REPLACE FUNCTION like_escape(value TEXT)
+RETURNS TEXT
+LANGUAGE sql
+IMMUTABLE
+AS $$
+    SELECT replace(replace(replace(value, '\', '\\'), '%', '\%'), '_', '\_');
+$$;
+
+-- Ranked manual search for one machine, one row per matching document
+--
+-- Each document is represented by its best matching page. Filename matches
+-- (whole words, or a substring of the name) rank above body text matches.
+-- ts_headline is only evaluated for the rows of the requested page of
+-- results, and full extracted text is never returned. total_count is the
+-- number of matching documents before pagination. A blank search_text
+-- returns no rows; callers list documents without searching instead.
+CREATE OR REPLACE FUNCTION search_manuals(
+    p_machine_id UUID,
+    search_text TEXT,
+    match_limit INTEGER DEFAULT 20,
+    match_offset INTEGER DEFAULT 0,
+    uploaded_after TIMESTAMPTZ DEFAULT NULL,
+    filename_suffix TEXT DEFAULT NULL
+)
+RETURNS TABLE (
+    id UUID,
+    machine_id UUID,
+    uploader_id UUID,
+    filename TEXT,
+    storage_path TEXT,
+    uploaded_at TIMESTAMPTZ,
+    processing_status TEXT,
+    page_count INTEGER,
+    error_message TEXT,
+    page_number INTEGER,
+    snippet TEXT,
+    rank REAL,
+    total_count BIGINT
+)
+LANGUAGE sql
+STABLE
+SECURITY INVOKER
+AS $$
+    -- A blank search leaves both query and name_pattern NULL, which match
+    -- nothing; '%%' would otherwise match every document
+    WITH q AS (
+        SELECT
+            manual_search_query(search_text) AS query,
+            '%' || like_escape(NULLIF(trim(search_text), '')) || '%' AS name_pattern
+    ),
+    machine_documents AS MATERIALIZED (
+        SELECT d.*
+        FROM documents d
+        WHERE d.machine_id = p_machine_id
+        AND (uploaded_after IS NULL OR d.uploaded_at >= uploaded_after)
+        AND (filename_suffix IS NULL OR d.filename ILIKE '%' || like_escape(filename_suffix))
+    ),
+    page_hits AS (
+        SELECT DISTINCT ON (p.document_id)
+            p.document_id,
+            p.page_number,
+            ts_rank_cd(p.search_vector, q.query) AS page_rank
+        FROM document_pages p
+        JOIN machine_documents d ON d.id = p.document_id
+        CROSS JOIN q
+        WHERE p.search_vector @@ q.query
+        ORDER BY p.document_id, page_rank DESC, p.page_number
+    ),
+    ranked AS (
+        SELECT
+            d.id,
+            d.machine_id,
+            d.uploader_id,
+            d.filename,
+            d.storage_path,
+            d.uploaded_at,
+            d.processing_status,
+            d.page_count,
+            d.error_message,
+            ph.page_number,
+            (COALESCE(ph.page_rank, 0)
+                + CASE WHEN d.search_vector @@ q.query OR d.filename ILIKE q.name_pattern
+                    THEN 1 ELSE 0 END)::REAL AS rank,
+            COUNT(*) OVER () AS total_count
+        FROM machine_documents d
+        CROSS JOIN q
+        LEFT JOIN page_hits ph ON ph.document_id = d.id
+        WHERE ph.document_id IS NOT NULL
+        OR d.search_vector @@ q.query
+        OR d.filename ILIKE q.name_pattern
+        ORDER BY rank DESC, d.uploaded_at DESC
+        LIMIT match_limit
+        OFFSET match_offset
+    )
+    SELECT
+        r.id,
+        r.machine_id,
+        r.uploader_id,
+        r.filename::TEXT,
+        r.storage_path::TEXT,
+        r.uploaded_at,
+        r.processing_status::TEXT,
+        r.page_count::INTEGER,
+        r.error_message::TEXT,
+        r.page_number,
+        CASE WHEN p.text IS NOT NULL THEN
+            ts_headline(
+                'english',
+                p.text,
+                q.query,
+                'StartSel=<mark>, StopSel=</mark>, MinWords=10, MaxWords=30, MaxFragments=2, FragmentDelimiter=" … "'
+            )
+        END AS snippet,
+        r.rank,
+        r.total_count
+    FROM ranked r
+    CROSS JOIN q
+    LEFT JOIN document_pages p ON p.document_id = r.id AND p.page_number = r.page_number
+    ORDER BY r.rank DESC, r.uploaded_at DESC;
+$$;
+
+COMMENT ON FUNCTION like_escape IS 'Escapes LIKE/ILIKE metacharacters in user input';
+COMMENT ON FUNCTION manual_search_query IS 'Builds an all-words prefix tsquery from free-text search input';
+COMMENT ON FUNCTION search_manuals IS 'Ranked, paginated full-text search over a machine''s manuals with page-level snippets';
@@ -0,0 +1,80 @@
+-- Migration: In-place re-ingest of document chunks
+-- Date: 2025-01-25
+-- Purpose: Apply a re-ingest's deletes, moves and staged inserts in one transaction
+
+-- Moving a kept chunk to a new chunk_index can briefly collide with another
+-- chunk's index, so uniqueness is checked at commit inside the apply function
+ALTER TABLE document_chunks
+    DROP CONSTRAINT IF EXISTS document_chunks_document_id_chunk_index_key;
+ALTER TABLE document_chunks
+    ADD CONSTRAINT document_chunks_document_id_chunk_index_key
+    UNIQUE (document_id, chunk_index) DEFERRABLE INITIALLY IMMEDIATE;
+
+-- Finishes a re-ingest of a document
+--
+-- New chunks are first written by ingest_document_chunks at a staging index of
+-- -(chunk_index + 1), so they never collide with live rows. Staged rows are
+-- committed before this function runs, but match_embeddings skips negative
+-- indexes, so search never returns them. This function then, in one
+-- transaction: deletes stale chunks (their embeddings cascade), rewrites kept
+-- chunks in place, moves staged chunks to their final index and re-links
+-- neighbours. Until it commits, search sees the previous version of the
+-- document. If a re-ingest is interrupted, its staged rows stay hidden and
+-- are deleted by the next re-ingest of the document.
+--
+-- p_updates is a JSON array of objects with id, chunk_index, chunk_type,
+-- page_number, section_header, chunk_text and chunk_metadata.
+CREATE OR REPLACE FUNCTION apply_document_chunk_changes(
+    p_document_id UUID,
+    p_delete_ids UUID[],
+    p_updates JSONB
+)
+RETURNS VOID
+LANGUAGE plpgsql
+SECURITY INVOKER
+AS $$
+BEGIN
+    SET CONSTRAINTS document_chunks_document_id_chunk_index_key DEFERRED;
+
+    DELETE FROM document_chunks
+    WHERE document_id = p_document_id
+    AND id = ANY(COALESCE(p_delete_ids, '{}'));
+
+    UPDATE document_chunks dc
+    SET chunk_index = u.chunk_index,
+        chunk_type = u.chunk_type,
+        page_number = u.page_number,
+        section_header = u.section_header,
+        updated_at = NOW()
+    FROM jsonb_to_recordset(COALESCE(p_updates, '[]')) AS u(
+        id UUID,
+        chunk_index INTEGER,
+        chunk_type VARCHAR(50),
+        page_number INTEGER,
+        section_header TEXT
+    )
+    WHERE dc.id = u.id
+    AND dc.document_id = p_document_id;
+
+    UPDATE embeddings e
+    SET chunk_text = u.chunk_text,
+        chunk_metadata = COALESCE(u.chunk_metadata, '{}')
+    FROM jsonb_to_recordset(COALESCE(p_updates, '[]')) AS u(
+        id UUID,
+        chunk_text TEXT,
+        chunk_metadata JSONB
+    )
+    WHERE e.chunk_id = u.id
+    AND e.document_id = p_document_id;
+
+    UPDATE document_chunks
+    SET chunk_index = -chunk_index - 1,
+        updated_at = NOW()
+    WHERE document_id = p_document_id
+    AND chunk_index < 0;
+
+    PERFORM link_document_chunks(p_document_id);
+END;
+$$;
+
+COMMENT ON FUNCTION apply_document_chunk_changes IS 'Deletes, rewrites and unstages chunks of a re-ingested document in one transaction';
@@ -7,8 +7,23 @@
 -- Step 2: Drop tables (cascading will remove dependent objects)
 DROP TABLE IF EXISTS embeddings CASCADE;
 DROP TABLE IF EXISTS document_chunks CASCADE;
+DROP TABLE IF EXISTS document_pages CASCADE;
+DROP TABLE IF EXISTS pdf_extraction_jobs CASCADE;
+
+-- documents itself is kept; only the search column added by these migrations is removed
+ALTER TABLE IF EXISTS documents DROP COLUMN IF EXISTS search_vector;
+DROP INDEX IF EXISTS documents_machine_uploaded_idx;
 
 -- Step 3: Drop functions
+DROP FUNCTION IF EXISTS search_manuals CASCADE;
+DROP FUNCTION IF EXISTS manual_search_query CASCADE;
+DROP FUNCTION IF EXISTS like_escape CASCADE;
+DROP FUNCTION IF EXISTS restart_pdf_extraction_job CASCADE;
+DROP FUNCTION IF EXISTS apply_document_chunk_changes CASCADE;
+DROP FUNCTION IF EXISTS ingest_document_chunks CASCADE;
+DROP FUNCTION IF EXISTS link_document_chunks CASCADE;
+DROP FUNCTION IF EXISTS match_embeddings_batch CASCADE;
+DROP FUNCTION IF EXISTS match_embeddings CASCADE;
 DROP FUNCTION IF EXISTS update_updated_at_column() CASCADE;
 
 -- Step 4: Drop the pgvector extension